@@ -1,23 +1,48 @@
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Header, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.responses import StreamingResponse, JSONResponse
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import InsertOne, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from gridfs.errors import NoFile
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 import os
 import uuid
+from collections import OrderedDict, Counter
+from functools import lru_cache
 import logging
 import pandas as pd
+import openpyxl
+import openpyxl.styles
+import openpyxl.utils
 import io
 from docx import Document
+from lxml import etree
 from docx.shared import Inches
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas as pdf_canvas
 import pdfplumber
 import PyPDF2
 import re
+import unicodedata
 import io
+import json
+import hashlib
+import zipfile
+import tempfile
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -94,6 +119,7 @@ class Customer(BaseModel):
     email: str
     address: str
     equipments: List[Dict[str, Any]] = []
+    company_name_key: Optional[str] = None  # normalize_company_name(company_name), indexed
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CustomerCreate(BaseModel):
@@ -142,6 +168,7 @@ class EquipmentTemplate(BaseModel):
     # Backward compatibility field
     total_items: Optional[int] = None
     
+    version: int = 1  # Her içerik değişikliğinde artırılır; eski sürümler equipment_template_versions'da
     created_by: str
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -182,6 +209,9 @@ class Inspection(BaseModel):
     approval_notes: Optional[str] = None  # Teknik yönetici notları
     approved_by: Optional[str] = None  # Onaylayan teknik yöneticinin ID'si
     approved_at: Optional[datetime] = None  # Onaylanma tarihi
+    version: int = 0  # Her yazma işleminde artırılır (offline sync için)
+    template_id: Optional[str] = None  # Denetimin oluşturulduğu şablon
+    template_version: Optional[int] = None  # ve o şablonun sürümü (sabitlenir)
     created_by: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -198,6 +228,25 @@ class InspectionCreate(BaseModel):
     inspector_id: str
     planned_date: datetime
 
+class InspectionBatchItem(BaseModel):
+    customer_id: str
+    equipment_keys: Optional[List[str]] = None  # customers.equipments anahtarları; None = tüm ekipmanlar
+    inspector_id: Optional[str] = None  # Boşsa batch varsayılanı
+    planned_date: Optional[datetime] = None
+
+class InspectionBatchCreate(BaseModel):
+    items: List[InspectionBatchItem]
+    inspector_id: str
+    planned_date: datetime
+    inspection_type: str = "PERİYODİK"
+    notes: str = ""
+
+class InspectionBatchResult(BaseModel):
+    requested: int  # İstenen (müşteri, ekipman) çiftleri
+    created: int
+    skipped: List[Dict[str, Any]] = []
+    inspections: List[Inspection] = []
+
 class InspectionUpdate(BaseModel):
     status: Optional[str] = None
     report_data: Optional[Dict[str, Any]] = None
@@ -210,9 +259,22 @@ class BulkImportResult(BaseModel):
     total_rows: int
     successful_imports: int
     failed_imports: int
+    unchanged_rows: int = 0  # Önceki içe aktarımla aynı olduğu için atlanan satırlar
     errors: List[Dict[str, Any]] = []
     warnings: List[str] = []
 
+class BulkImportDiff(BaseModel):
+    dry_run: bool = True
+    total_rows: int
+    new_customers: int
+    new_equipments: int
+    unchanged_rows: int
+    skipped_rows: int
+    new_customer_list: List[Dict[str, Any]] = []
+    new_equipment_list: List[Dict[str, Any]] = []
+    warnings: List[str] = []
+    duration_ms: float
+
 class BulkImportItem(BaseModel):
     muayene_alani: Optional[str] = None
     muayene_alt_alani: Optional[str] = None
@@ -405,6 +467,152 @@ async def delete_user(user_id: str, current_user: User = Depends(require_role(Us
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
 
+# ===================== CUSTOMER NAME KEYS =====================
+
+# Bump whenever normalize_company_name changes - stored keys of other versions are rebuilt at startup
+COMPANY_NAME_KEY_VERSION = "3"
+
+# Turkish letters folded to their ASCII base so "İNŞAAT", "inşaat" and "INSAAT" agree
+TURKISH_CASEFOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i", "Ç": "c", "ç": "c", "Ğ": "g", "ğ": "g",
+    "Ö": "o", "ö": "o", "Ş": "s", "ş": "s", "Ü": "u", "ü": "u"
+})
+
+# Legal forms dropped from the end of a name (as token sequences after punctuation removal)
+COMPANY_LEGAL_SUFFIXES = sorted([
+    ("ltd",), ("ltd", "sti"), ("limited",), ("limited", "sirketi"), ("sti",),
+    ("as",), ("a", "s"), ("anonim", "sirketi"), ("koll", "sti"), ("kollektif", "sirketi"),
+    ("kom", "sti"), ("komandit", "sirketi"), ("inc",), ("llc",), ("gmbh",)
+], key=len, reverse=True)
+
+# "San. ve Tic." is dropped only right before a legal form; on its own it names the trade
+COMPANY_TRADE_SUFFIXES = sorted([
+    ("san", "ve", "tic"), ("san", "tic"), ("sanayi", "ve", "ticaret"), ("sanayi", "ticaret")
+], key=len, reverse=True)
+
+def strip_company_suffix(tokens: list, suffixes: list) -> bool:
+    """Remove the longest of suffixes from the end of tokens, never the whole name"""
+    for suffix in suffixes:
+        if len(tokens) > len(suffix) and tuple(tokens[-len(suffix):]) == suffix:
+            del tokens[-len(suffix):]
+            return True
+    return False
+
+@lru_cache(maxsize=65536)
+def normalize_company_name(name: str) -> str:
+    """
+    Dedup key of a company name: Turkish-aware casefold to ASCII, punctuation removed and
+    trailing legal forms ("Ltd. Şti.", "A.Ş.") stripped, together with a "San. ve Tic."
+    right before them. "ABC İnşaat Ltd. Şti." and "ABC INSAAT LTD STI" both give
+    "abc insaat"; "Demir Sanayi" and "Demir Ticaret" keep their trade words.
+    A name with no Latin letters or digits left (e.g. "ООО Ромашка") is not folded: its
+    key is "=" + the exact name, so such names only match themselves.
+    """
+    text = unicodedata.normalize("NFKD", (name or "").translate(TURKISH_CASEFOLD).lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    tokens = re.sub(r"[^0-9a-z]+", " ", text).split()
+    
+    legal_form = False
+    while strip_company_suffix(tokens, COMPANY_LEGAL_SUFFIXES):
+        legal_form = True
+    if legal_form:
+        strip_company_suffix(tokens, COMPANY_TRADE_SUFFIXES)
+    if not tokens:
+        exact = " ".join((name or "").split())
+        return f"={exact}" if exact else ""
+    return " ".join(tokens)
+
+def company_name_key_fields(company_name: str) -> dict:
+    return {"company_name_key": normalize_company_name(company_name), "company_name_key_version": COMPANY_NAME_KEY_VERSION}
+
+async def ensure_company_name_keys():
+    """Index company_name_key and (re)compute it for customers written before it or with another version (run at startup)"""
+    await db.customers.create_index("company_name_key")
+    requests = []
+    updated = 0
+    async for customer in db.customers.find(
+        {"company_name_key_version": {"$ne": COMPANY_NAME_KEY_VERSION}}, {"_id": 0, "id": 1, "company_name": 1}
+    ):
+        requests.append(UpdateOne({"id": customer["id"]}, {"$set": company_name_key_fields(customer.get("company_name") or "")}))
+        if len(requests) == BULK_IMPORT_WRITE_CHUNK:
+            await db.customers.bulk_write(requests, ordered=False)
+            updated += len(requests)
+            requests = []
+    if requests:
+        await db.customers.bulk_write(requests, ordered=False)
+        updated += len(requests)
+    if updated:
+        print(f"✅ Customer name keys: computed for {updated} customers")
+
+class CompanyNameIndex:
+    """
+    Trigram index over company name keys for near-duplicate candidates. Only names sharing
+    a trigram with the query are scored, and trigrams common to more than block_limit names
+    (e.g. from "insaat") are left out of candidate generation so a lookup stays small.
+    """
+
+    def __init__(self, block_limit: int = 2000):
+        self.block_limit = block_limit
+        self.postings = {}  # trigram -> set of customer ids
+        self.entries = {}  # customer id -> (company name, trigram count)
+
+    @staticmethod
+    def trigrams(key: str) -> set:
+        padded = f"  {key} "
+        return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+    def add(self, customer_id: str, company_name: str, key: Optional[str] = None):
+        grams = self.trigrams(key if key is not None else normalize_company_name(company_name))
+        self.entries[customer_id] = (company_name, len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(customer_id)
+
+    def candidates(self, company_name: str, limit: int = 5, min_similarity: float = 0.5) -> list:
+        """[(Dice similarity, customer id, company name)], best first"""
+        grams = self.trigrams(normalize_company_name(company_name))
+        shared = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting and len(posting) <= self.block_limit:
+                shared.update(posting)
+        
+        results = []
+        for customer_id, _ in shared.items():
+            entry_name, entry_size = self.entries[customer_id]
+            # Exact overlap, including the blocked trigrams left out above
+            common = sum(1 for gram in grams if customer_id in self.postings.get(gram, ()))
+            similarity = 2 * common / (len(grams) + entry_size)
+            if similarity >= min_similarity:
+                results.append((round(similarity, 3), customer_id, entry_name))
+        results.sort(key=lambda result: (-result[0], result[2]))
+        return results[:limit]
+
+COMPANY_NAME_INDEX_TTL_SECONDS = int(os.getenv("COMPANY_NAME_INDEX_TTL_SECONDS", "300"))
+_company_name_index = {"index": None, "built_at": 0.0}
+
+def invalidate_company_name_index():
+    _company_name_index["index"] = None
+
+async def get_company_name_index() -> CompanyNameIndex:
+    """The in-memory name index, rebuilt after local customer writes or when older than the TTL"""
+    index = _company_name_index["index"]
+    if index is not None and time.monotonic() - _company_name_index["built_at"] < COMPANY_NAME_INDEX_TTL_SECONDS:
+        return index
+    index = CompanyNameIndex()
+    async for customer in db.customers.find({}, {"_id": 0, "id": 1, "company_name": 1, "company_name_key": 1}):
+        index.add(customer["id"], customer.get("company_name") or "", customer.get("company_name_key"))
+    _company_name_index.update(index=index, built_at=time.monotonic())
+    return index
+
+@app.get("/api/customers/similar")
+async def find_similar_customers(name: str, limit: int = 5, current_user: User = Depends(get_current_user)):
+    """Mevcut müşteriler arasında verilen ada benzeyen (olası mükerrer) kayıtlar"""
+    index = await get_company_name_index()
+    return [
+        {"id": customer_id, "company_name": company_name, "similarity": similarity}
+        for similarity, customer_id, company_name in index.candidates(name, limit=min(limit, 50))
+    ]
+
 # ===================== CUSTOMER MANAGEMENT =====================
 
 @app.post("/api/customers", response_model=Customer)
@@ -412,8 +620,10 @@ async def create_customer(customer: CustomerCreate, current_user: User = Depends
     customer_dict = customer.dict()
     customer_dict["id"] = str(uuid.uuid4())
     customer_dict["created_at"] = datetime.utcnow()
+    customer_dict.update(company_name_key_fields(customer.company_name))
     
     await db.customers.insert_one(customer_dict)
+    invalidate_company_name_index()
     return Customer(**customer_dict)
 
 @app.get("/api/customers", response_model=List[Customer])
@@ -432,10 +642,11 @@ async def get_customer(customer_id: str, current_user: User = Depends(get_curren
 async def update_customer(customer_id: str, customer_update: CustomerCreate, current_user: User = Depends(require_role(UserRole.PLANLAMA_UZMANI))):
     result = await db.customers.update_one(
         {"id": customer_id},
-        {"$set": customer_update.dict()}
+        {"$set": {**customer_update.dict(), **company_name_key_fields(customer_update.company_name)}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Customer not found")
+    invalidate_company_name_index()
     
     updated_customer = await db.customers.find_one({"id": customer_id})
     return Customer(**updated_customer)
@@ -445,13 +656,515 @@ async def delete_customer(customer_id: str, current_user: User = Depends(require
     result = await db.customers.delete_one({"id": customer_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Customer not found")
+    invalidate_company_name_index()
     return {"message": "Customer deleted successfully"}
 
 # ===================== BULK IMPORT =====================
 
-@app.post("/api/customers/bulk-import", response_model=BulkImportResult)
+BULK_IMPORT_COLUMNS = [
+    'Muayene Alanı',
+    'Muayene Alt Alanı',
+    'Muayene Türü',
+    'Referans',
+    'Muayene Tarihi',
+    'Zorunlu Alan ya da Gönüllü Alan',
+    'Müşteri Adı',
+    'Müşteri Adresi',
+    'Denetçi Adı',
+    'Denetçinin Lokasyonu',
+    'Rapor Onay Tarihi',
+    'Raporu Onaylayan Teknik Yönetici'
+]
+
+# Cell values that count as empty after stripping
+BULK_IMPORT_NULL_VALUES = ['', 'nan', '-']
+
+# Equipment field -> import column
+BULK_IMPORT_EQUIPMENT_FIELDS = {
+    "muayene_alani": 'Muayene Alanı',
+    "muayene_alt_alani": 'Muayene Alt Alanı',
+    "muayene_turu": 'Muayene Türü',
+    "referans": 'Referans',
+    "muayene_tarihi": 'Muayene Tarihi',
+    "zorunlu_alan": 'Zorunlu Alan ya da Gönüllü Alan',
+    "denetci_adi": 'Denetçi Adı',
+    "denetci_lokasyonu": 'Denetçinin Lokasyonu',
+    "rapor_onay_tarihi": 'Rapor Onay Tarihi',
+    "rapor_onaylayan": 'Raporu Onaylayan Teknik Yönetici'
+}
+
+def clean_import_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Column-wise str/strip with blank, 'nan' and '-' turned into None (object columns)"""
+    cleaned = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # Same text str() gives for a Timestamp cell
+            text = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            text = series.astype(str)
+        text = text.str.strip()
+        cleaned[column] = text.astype(object).where(series.notna() & ~text.isin(BULK_IMPORT_NULL_VALUES), None)
+    return pd.DataFrame(cleaned, index=df.index)
+
+BULK_IMPORT_WRITE_CHUNK = int(os.getenv("BULK_IMPORT_WRITE_CHUNK", "1000"))
+
+def equipment_key(equipment: dict) -> str:
+    """Deterministic id of an imported equipment entry: its inspection area and sub-area"""
+    identity = json.dumps([equipment.get("muayene_alani"), equipment.get("muayene_alt_alani")], ensure_ascii=False)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+def equipment_merge_operation(customer_id: str, equipment: dict) -> UpdateOne:
+    """
+    Append an equipment entry unless the customer already has it, as one atomic and
+    constant-size write. Keyed entries are compared by key; entries written before keys
+    existed by their area/sub-area fields. $push needs an array, which
+    ensure_customer_equipment_arrays guarantees for older documents.
+    """
+    return UpdateOne(
+        {
+            "id": customer_id,
+            "equipments": {"$type": "array", "$not": {"$elemMatch": {"$or": [
+                {"key": equipment["key"]},
+                {
+                    "key": {"$exists": False},
+                    "muayene_alani": equipment.get("muayene_alani"),
+                    "muayene_alt_alani": equipment.get("muayene_alt_alani")
+                }
+            ]}}}
+        },
+        {"$push": {"equipments": equipment}}
+    )
+
+async def ensure_customer_equipment_arrays():
+    """Replace a missing or null equipments field with an empty list (run at startup)"""
+    result = await db.customers.update_many({"equipments": {"$not": {"$type": "array"}}}, {"$set": {"equipments": []}})
+    if result.modified_count:
+        print(f"✅ Customer equipments: initialized for {result.modified_count} customers")
+
+async def imported_equipment_keys(customer_ids: list, import_id: str) -> set:
+    """(customer id, equipment key) of the entries this import pushed"""
+    added = set()
+    async for customer in db.customers.find(
+        {"id": {"$in": customer_ids}}, {"_id": 0, "id": 1, "equipments.key": 1, "equipments.import_id": 1}
+    ):
+        for equipment in customer.get("equipments") or []:
+            if equipment.get("import_id") == import_id:
+                added.add((customer["id"], equipment.get("key")))
+    return added
+
+def prepare_import_rows(df: pd.DataFrame) -> tuple:
+    """
+    Normalize an import sheet in bulk. Returns (rows, warnings): rows are
+    (row number, customer name, address, equipment info or {}) for importable rows and
+    warnings are (row number, message) for the rows skipped for a missing name/address.
+    """
+    cleaned = clean_import_frame(df)
+    row_numbers = df.index + 2  # Excel row: 1-based plus the header row
+
+    missing_name = cleaned['Müşteri Adı'].isna()
+    missing_address = cleaned['Müşteri Adresi'].isna() & ~missing_name
+    warnings = [(row, f"Satır {row}: Müşteri adı boş, atlanıyor") for row in row_numbers[missing_name.to_numpy()]]
+    warnings += [(row, f"Satır {row}: Müşteri adresi boş, atlanıyor") for row in row_numbers[missing_address.to_numpy()]]
+
+    importable = ~(missing_name | missing_address)
+    has_equipment = (cleaned['Muayene Alanı'].notna() | cleaned['Muayene Alt Alanı'].notna())[importable]
+    selected = cleaned.loc[importable]
+    equipment_columns = [selected[column].tolist() for column in BULK_IMPORT_EQUIPMENT_FIELDS.values()]
+    equipment_fields = list(BULK_IMPORT_EQUIPMENT_FIELDS)
+
+    rows = []
+    for position, (row, name, address, with_equipment) in enumerate(zip(
+        row_numbers[importable.to_numpy()], selected['Müşteri Adı'], selected['Müşteri Adresi'], has_equipment
+    )):
+        equipment_info = (
+            {field: values[position] for field, values in zip(equipment_fields, equipment_columns)}
+            if with_equipment else {}
+        )
+        rows.append((int(row), name, address, equipment_info))
+    return rows, warnings
+
+async def prefetch_import_customers(names, customers: dict):
+    """
+    Load the customers named in an import into the resolution state with one indexed $in
+    query on the normalized name key; the state is keyed by that key too
+    """
+    missing = [key for key in {normalize_company_name(name) for name in names} if key not in customers]
+    if not missing:
+        return
+    async for customer in db.customers.find(
+        {"company_name_key": {"$in": missing}},
+        {"_id": 0, "id": 1, "company_name": 1, "company_name_key": 1,
+         "equipments.key": 1, "equipments.muayene_alani": 1, "equipments.muayene_alt_alani": 1}
+    ):
+        customers.setdefault(customer["company_name_key"], {
+            "id": customer["id"],
+            "company_name": customer["company_name"],
+            "equipment_keys": {eq.get("key") or equipment_key(eq) for eq in customer.get("equipments") or []},
+            "pending": None
+        })
+
+def plan_customer_import(rows: list, customers: dict, imported_by: str, import_id: Optional[str] = None) -> tuple:
+    """
+    Hash join import rows against the prefetched customers without touching the database.
+    Returns (pending writes, unchanged row numbers, warnings). Pending writes are
+    {"op", "document"? | "merge"?, "rows": [(row number, warning or None, data)]} in sheet
+    order and customers is updated as if they were applied, so it can be carried over to
+    later chunks. Equipment entries are tagged with import_id when one is given.
+    """
+    unchanged = []
+    warnings = []
+    pending = []
+
+    for row_number, customer_name, customer_address, equipment_info in rows:
+        data = {"company_name": customer_name, "address": customer_address, **equipment_info}
+        if equipment_info:
+            equipment_info = {"key": equipment_key(equipment_info), **equipment_info}
+            if import_id:
+                equipment_info["import_id"] = import_id
+        name_key = normalize_company_name(customer_name)
+        customer = customers.get(name_key)
+
+        if customer is None:
+            # Later rows of the same company are folded into this insert
+            customer_data = {
+                "id": str(uuid.uuid4()),
+                "company_name": customer_name,
+                "contact_person": customer_name,  # Default to company name
+                "phone": "",  # Will be empty, can be updated later
+                "email": "",  # Will be empty, can be updated later
+                "address": customer_address,
+                "equipments": [equipment_info] if equipment_info else [],
+                **company_name_key_fields(customer_name),
+                "created_at": datetime.utcnow(),
+                "import_source": "bulk_import",
+                "imported_by": imported_by,
+                "imported_at": datetime.utcnow()
+            }
+            write = {"op": InsertOne(customer_data), "document": customer_data, "rows": [(row_number, None, data)]}
+            pending.append(write)
+            customers[name_key] = {
+                "id": customer_data["id"],
+                "company_name": customer_name,
+                "equipment_keys": {equipment_info["key"]} if equipment_info else set(),
+                "pending": write
+            }
+            continue
+
+        if customer["company_name"] != customer_name:
+            warnings.append((row_number, f"Satır {row_number}: '{customer_name}' mevcut müşteri '{customer['company_name']}' ile eşleştirildi"))
+
+        if not equipment_info:
+            unchanged.append(row_number)
+            continue
+
+        key = equipment_info["key"]
+        if key in customer["equipment_keys"]:
+            warnings.append((row_number, f"Satır {row_number}: Müşteri ve ekipman bilgisi zaten mevcut"))
+            unchanged.append(row_number)
+            continue
+
+        customer["equipment_keys"].add(key)
+        added = f"Satır {row_number}: Müşteri mevcut, yeni ekipman bilgisi eklendi"
+        if customer["pending"] is not None:
+            customer["pending"]["document"]["equipments"].append(equipment_info)
+            customer["pending"]["rows"].append((row_number, added, data))
+        else:
+            # A concurrent import that added the same entry first makes this a no-op
+            pending.append({
+                "op": equipment_merge_operation(customer["id"], equipment_info),
+                "merge": (customer["id"], key),
+                "rows": [(row_number, added, data)]
+            })
+
+    return pending, unchanged, warnings
+
+async def write_customer_import(rows: list, imported_by: str) -> tuple:
+    """
+    Resolve import rows against existing customers with one prefetch and write the result
+    with chunked unordered bulk_write calls. Returns (successful row count, errors, warnings);
+    every error and warning names the sheet row it came from.
+    """
+    # One $in query instead of a find_one per row
+    customers = {}
+    import_id = str(uuid.uuid4())
+    await prefetch_import_customers([name for _, name, _, _ in rows], customers)
+    pending, unchanged, warnings = plan_customer_import(rows, customers, imported_by, import_id)
+
+    successful = len(unchanged)
+    errors = []
+
+    for start in range(0, len(pending), BULK_IMPORT_WRITE_CHUNK):
+        chunk = pending[start:start + BULK_IMPORT_WRITE_CHUNK]
+        failures = {}
+        modified = 0
+        try:
+            result = await db.customers.bulk_write([write["op"] for write in chunk], ordered=False)
+            modified = result.modified_count
+        except BulkWriteError as e:
+            failures = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+            modified = e.details.get("nModified", 0)
+        except Exception as e:
+            failures = {index: str(e) for index in range(len(chunk))}
+
+        # Every $push that matched modified its customer; when some did not, a concurrent
+        # import added those entries first and this import's tag tells them apart
+        merges = [write["merge"] for index, write in enumerate(chunk) if "merge" in write and index not in failures]
+        added = set(merges)
+        if modified < len(merges):
+            added = await imported_equipment_keys(list({customer_id for customer_id, _ in merges}), import_id)
+
+        for index, write in enumerate(chunk):
+            for row_number, warning, data in write["rows"]:
+                if index in failures:
+                    errors.append({"row": row_number, "error": failures[index], "data": data})
+                    continue
+                successful += 1
+                if "merge" in write and write["merge"] not in added:
+                    warning = f"Satır {row_number}: Müşteri ve ekipman bilgisi zaten mevcut"
+                if warning:
+                    warnings.append((row_number, warning))
+
+    if pending:
+        invalidate_company_name_index()
+    errors.sort(key=lambda error: error["row"])
+    return successful, errors, warnings
+
+# ===================== IMPORT LEDGER =====================
+
+# Every finished import records its file hash and the content hashes of the rows it wrote.
+# A re-upload of the same file is answered from the ledger alone when no row of it failed;
+# otherwise, and for an edited version of a file (same name), only the rows whose content
+# is new are processed.
+IMPORT_LEDGER_MAX_ROWS = int(os.getenv("IMPORT_LEDGER_MAX_ROWS", "200000"))  # row hashes kept per import
+
+def import_row_hash(row: tuple) -> str:
+    """Content hash of a prepared import row; the sheet row number is not part of it"""
+    _, customer_name, customer_address, equipment_info = row
+    content = json.dumps([customer_name, customer_address, equipment_info], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+async def find_import_ledger(file_hash: str, filename: str, imported_by: str) -> Optional[dict]:
+    """
+    The latest finished import of this exact file or, failing that, the uploader's own latest
+    import of a file with the same name (everyone fills in the same downloaded template)
+    """
+    projection = {"_id": 0, "file_hash": 1, "total_rows": 1, "rows": 1, "failed_rows": 1, "row_hashes": 1}
+    latest = [("created_at", -1)]
+    ledger = await db.import_ledger.find_one({"complete": True, "file_hash": file_hash}, projection, sort=latest)
+    if ledger is None:
+        ledger = await db.import_ledger.find_one(
+            {"complete": True, "filename": filename, "imported_by": imported_by}, projection, sort=latest
+        )
+    return ledger
+
+def import_ledger_covers(ledger: Optional[dict], file_hash: str) -> bool:
+    """True when the ledger entry is for this exact file and every data row of it went through"""
+    return bool(ledger) and ledger["file_hash"] == file_hash and ledger.get("failed_rows") == 0
+
+async def write_customer_import_delta(rows: list, imported_by: str, previous_hashes: set) -> tuple:
+    """
+    write_customer_import for the rows whose content hash is not in previous_hashes.
+    Returns (successful, errors, warnings, unchanged row count, hashes to record); failed
+    rows are left out of the recorded hashes so the next upload retries them.
+    """
+    hashes = [import_row_hash(row) for row in rows]
+    changed = [row for row, row_hash in zip(rows, hashes) if row_hash not in previous_hashes]
+    successful, errors, warnings = await write_customer_import(changed, imported_by) if changed else (0, [], [])
+    failed = {error["row"] for error in errors}
+    recorded = [row_hash for row, row_hash in zip(rows, hashes) if row[0] not in failed]
+    return successful, errors, warnings, len(rows) - len(changed), recorded
+
+def import_ledger_entry(file_hash: str, filename: str, imported_by: str) -> dict:
+    return {"file_hash": file_hash, "filename": filename, "imported_by": imported_by, "created_at": datetime.utcnow()}
+
+async def record_import_ledger(ledger_id: str, file_hash: str, filename: str, imported_by: str, total_rows: int, failed_rows: int, row_hashes: list):
+    await db.import_ledger.insert_one({
+        "id": ledger_id,
+        **import_ledger_entry(file_hash, filename, imported_by),
+        "total_rows": total_rows,
+        "failed_rows": failed_rows,
+        "rows": len(row_hashes),
+        "row_hashes": row_hashes[:IMPORT_LEDGER_MAX_ROWS],
+        "complete": True
+    })
+
+async def append_import_ledger(ledger_id: str, file_hash: str, filename: str, imported_by: str, row_hashes: list):
+    """
+    Add a chunk's row hashes to a ledger entry that is still being written (background jobs).
+    Called only after the chunk's progress is committed, so a chunk is never counted twice.
+    """
+    await db.import_ledger.update_one(
+        {"id": ledger_id},
+        {
+            "$setOnInsert": {**import_ledger_entry(file_hash, filename, imported_by), "complete": False},
+            "$push": {"row_hashes": {"$each": row_hashes, "$slice": IMPORT_LEDGER_MAX_ROWS}},
+            "$inc": {"rows": len(row_hashes)}
+        },
+        upsert=True
+    )
+
+async def complete_import_ledger(ledger_id: str, total_rows: int, failed_rows: int):
+    await db.import_ledger.update_one(
+        {"id": ledger_id},
+        {"$set": {"complete": True, "total_rows": total_rows, "failed_rows": failed_rows}}
+    )
+
+async def ensure_import_ledger_indexes():
+    await db.import_ledger.create_index([("file_hash", 1), ("created_at", -1)])
+    await db.import_ledger.create_index([("filename", 1), ("imported_by", 1), ("created_at", -1)])
+
+# Upload files are spooled to disk and read in chunks of this many data rows
+IMPORT_READ_CHUNK_ROWS = int(os.getenv("IMPORT_READ_CHUNK_ROWS", "2000"))
+IMPORT_SPOOL_BLOCK_BYTES = 1024 * 1024
+
+async def spool_upload(file: UploadFile) -> tuple:
+    """Copy an upload to a temporary file block by block; returns (path, sha256). The caller removes the file"""
+    suffix = os.path.splitext(file.filename)[1]
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+        while block := await file.read(IMPORT_SPOOL_BLOCK_BYTES):
+            spool.write(block)
+            digest.update(block)
+    return spool.name, digest.hexdigest()
+
+def import_frame_columns(header) -> list:
+    # Check if we have the expected columns, if not use first 12 columns
+    if len(header) < 12:
+        raise ValueError("Excel dosyasında en az 12 sütun olmalı")
+    return BULK_IMPORT_COLUMNS[:len(header)]
+
+def iter_import_frames(path: str, filename: str, chunk_rows: Optional[int] = None, skip_rows: int = 0):
+    """
+    Read a spooled Excel/CSV sheet as (DataFrame, position) chunks of at most chunk_rows
+    data rows without loading the whole file. Frame indexes are 0-based data row numbers,
+    so prepare_import_rows reports sheet rows as before; position is the number of data
+    rows consumed so far and can be passed back as skip_rows to continue after a chunk.
+    """
+    chunk_rows = chunk_rows or IMPORT_READ_CHUNK_ROWS
+    if filename.endswith('.csv'):
+        columns = import_frame_columns(pd.read_csv(path, nrows=0).columns)
+        # Cells stay text so every chunk reads the same regardless of its dtype inference
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str):
+            if chunk.empty:
+                continue
+            position = int(chunk.index[-1]) + 1
+            if position <= skip_rows:
+                continue
+            chunk = chunk.loc[chunk.index >= skip_rows]
+            chunk.columns = columns
+            yield chunk, position
+        return
+    
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        header = list(header)
+        while header and header[-1] is None:
+            header.pop()
+        columns = import_frame_columns(header)
+        
+        batch, index = [], []
+        sheet_row = skip_rows + 1
+        for sheet_row, values in enumerate(sheet.iter_rows(min_row=skip_rows + 2, values_only=True), start=skip_rows + 2):
+            values = values[:len(columns)]
+            if all(value is None for value in values):
+                continue  # blank or formatting-only rows
+            batch.append(values + (None,) * (len(columns) - len(values)))
+            index.append(sheet_row - 2)  # sheet row 2 is data row 0
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=columns, index=index), sheet_row - 1
+                batch, index = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=index), sheet_row - 1
+    finally:
+        workbook.close()
+
+def estimate_import_rows(path: str, filename: str) -> Optional[int]:
+    """Data row count without parsing: CSV line count, XLSX sheet dimension"""
+    if filename.endswith('.csv'):
+        lines = 0
+        last = b"\n"
+        with open(path, "rb") as spool:
+            while block := spool.read(IMPORT_SPOOL_BLOCK_BYTES):
+                lines += block.count(b"\n")
+                last = block[-1:]
+        if last != b"\n":
+            lines += 1
+        return max(lines - 1, 0)
+    
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+    finally:
+        workbook.close()
+    return max(max_row - 1, 0) if max_row else None
+
+# Rows listed per change kind in a dry run response; the counts always cover the whole file
+BULK_IMPORT_DIFF_LIST_LIMIT = int(os.getenv("BULK_IMPORT_DIFF_LIST_LIMIT", "200"))
+
+async def diff_customer_import(path: str, filename: str) -> BulkImportDiff:
+    """
+    What importing a spooled sheet would change, without writing: new customers, equipment
+    entries that would be added and rows that change nothing. Each chunk prefetches only the
+    company names not seen yet and is joined in memory against the customers resolved so far,
+    including the ones earlier chunks would create.
+    """
+    started = time.perf_counter()
+    customers = {}
+    total_rows = 0
+    new_customers = []
+    new_equipments = []
+    unchanged_rows = 0
+    row_warnings = []
+
+    frames = iter_import_frames(path, filename)
+    try:
+        while (frame := await asyncio.to_thread(next, frames, None)) is not None:
+            df, _ = frame
+            total_rows += len(df)
+            rows, skip_warnings = prepare_import_rows(df)
+            row_warnings += skip_warnings
+            await prefetch_import_customers([name for _, name, _, _ in rows], customers)
+            pending, unchanged, _ = plan_customer_import(rows, customers, None)
+            unchanged_rows += len(unchanged)
+
+            for write in pending:
+                if "document" in write:
+                    row_number, _, data = write["rows"][0]
+                    new_customers.append({"row": row_number, "company_name": data["company_name"], "address": data["address"]})
+                for row_number, _, data in write["rows"]:
+                    if "muayene_alani" in data:
+                        new_equipments.append({
+                            "row": row_number,
+                            "company_name": data["company_name"],
+                            "muayene_alani": data["muayene_alani"],
+                            "muayene_alt_alani": data["muayene_alt_alani"]
+                        })
+    finally:
+        frames.close()
+
+    new_equipments.sort(key=lambda change: change["row"])
+    row_warnings.sort(key=lambda warning: warning[0])
+    return BulkImportDiff(
+        total_rows=total_rows,
+        new_customers=len(new_customers),
+        new_equipments=len(new_equipments),
+        unchanged_rows=unchanged_rows,
+        skipped_rows=len(row_warnings),
+        new_customer_list=new_customers[:BULK_IMPORT_DIFF_LIST_LIMIT],
+        new_equipment_list=new_equipments[:BULK_IMPORT_DIFF_LIST_LIMIT],
+        warnings=[message for _, message in row_warnings],
+        duration_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+
+@app.post("/api/customers/bulk-import", response_model=Union[BulkImportResult, BulkImportDiff])
 async def bulk_import_customers(
     file: UploadFile = File(...),
+    background: bool = False,
+    dry_run: bool = False,
+    force: bool = False,
     current_user: User = Depends(require_role(UserRole.PLANLAMA_UZMANI))
 ):
     """
@@ -460,147 +1173,97 @@ async def bulk_import_customers(
     D: Referans, E: Muayene Tarihi, F: Zorunlu/Gönüllü Alan, G: Müşteri Adı, 
     H: Müşteri Adresi, I: Denetçi Adı, J: Denetçi Lokasyonu, 
     K: Rapor Onay Tarihi, L: Raporu Onaylayan Teknik Yönetici
+    
+    background=true: dosya bir import job'ı olarak kaydedilir ve hemen 202 + job id döner;
+    ilerleme GET /api/jobs/{job_id} ile izlenir.
+    
+    dry_run=true: hiçbir şey yazılmaz; yeni müşteriler, eklenecek ekipmanlar ve değişmeyen
+    satırların özeti (BulkImportDiff) döner.
+    
+    Aynı dosyanın (ya da aynı adlı dosyanın önceki halinin) tekrar yüklenmesinde daha önce
+    içe aktarılmış satırlar import ledger'a göre atlanır; force=true ile tüm satırlar işlenir.
     """
     
     # File type validation
     if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
         raise HTTPException(status_code=400, detail="Sadece Excel (.xlsx, .xls) veya CSV dosyaları kabul edilir")
     
+    if dry_run:
+        path = None
+        try:
+            path, _ = await spool_upload(file)
+            diff = await diff_customer_import(path, file.filename)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Dosya işleme hatası: {str(e)}")
+        finally:
+            if path:
+                os.remove(path)
+        return diff
+    
+    if background:
+        job = await create_import_job(file, current_user.id, force)
+        start_import_job(job["id"])
+        return JSONResponse(status_code=202, content={
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": f"/api/jobs/{job['id']}"
+        })
+    
+    path = None
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Parse Excel/CSV
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(file_content))
-        else:
-            df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl')
+        # Spool the upload and import it chunk by chunk so memory does not grow with the file
+        path, file_hash = await spool_upload(file)
         
-        # Define expected columns
-        expected_columns = [
-            'Muayene Alanı',
-            'Muayene Alt Alanı', 
-            'Muayene Türü',
-            'Referans',
-            'Muayene Tarihi',
-            'Zorunlu Alan ya da Gönüllü Alan',
-            'Müşteri Adı',
-            'Müşteri Adresi',
-            'Denetçi Adı',
-            'Denetçinin Lokasyonu',
-            'Rapor Onay Tarihi',
-            'Raporu Onaylayan Teknik Yönetici'
-        ]
+        # One ledger lookup decides what a re-upload can skip
+        ledger = None if force else await find_import_ledger(file_hash, file.filename, current_user.id)
+        if import_ledger_covers(ledger, file_hash):
+            return BulkImportResult(
+                total_rows=ledger["total_rows"],
+                successful_imports=0,
+                failed_imports=0,
+                unchanged_rows=ledger["rows"],
+                warnings=["Bu dosya daha önce içe aktarıldı, değişen satır yok"]
+            )
+        previous_hashes = set(ledger["row_hashes"]) if ledger else set()
         
-        # Check if we have the expected columns, if not use first 12 columns
-        if len(df.columns) >= 12:
-            df.columns = expected_columns[:len(df.columns)]
-        else:
-            raise HTTPException(status_code=400, detail="Excel dosyasında en az 12 sütun olmalı")
+        frames = iter_import_frames(path, file.filename)
         
-        # Initialize counters
-        total_rows = len(df)
+        total_rows = 0
         successful_imports = 0
-        failed_imports = 0
+        unchanged_rows = 0
         errors = []
-        warnings = []
-        
-        # Process each row
-        for index, row in df.iterrows():
-            try:
-                # Skip empty rows or rows without customer name
-                customer_name = str(row.get('Müşteri Adı', '')).strip()
-                customer_address = str(row.get('Müşteri Adresi', '')).strip()
-                
-                if not customer_name or customer_name == 'nan' or customer_name == '-':
-                    warnings.append(f"Satır {index + 2}: Müşteri adı boş, atlanıyor")
-                    continue
-                
-                if not customer_address or customer_address == 'nan' or customer_address == '-':
-                    warnings.append(f"Satır {index + 2}: Müşteri adresi boş, atlanıyor") 
-                    continue
-                
-                # Clean and prepare data
-                def clean_value(val):
-                    if pd.isna(val) or str(val).strip() in ['', 'nan', '-']:
-                        return None
-                    return str(val).strip()
-                
-                # Check if customer already exists
-                existing_customer = await db.customers.find_one({"company_name": customer_name})
-                
-                equipment_info = {}
-                muayene_alani = clean_value(row.get('Muayene Alanı'))
-                muayene_alt_alani = clean_value(row.get('Muayene Alt Alanı'))
-                
-                if muayene_alani or muayene_alt_alani:
-                    equipment_info = {
-                        "muayene_alani": muayene_alani,
-                        "muayene_alt_alani": muayene_alt_alani,
-                        "muayene_turu": clean_value(row.get('Muayene Türü')),
-                        "referans": clean_value(row.get('Referans')),
-                        "muayene_tarihi": clean_value(row.get('Muayene Tarihi')),
-                        "zorunlu_alan": clean_value(row.get('Zorunlu Alan ya da Gönüllü Alan')),
-                        "denetci_adi": clean_value(row.get('Denetçi Adı')),
-                        "denetci_lokasyonu": clean_value(row.get('Denetçinin Lokasyonu')),
-                        "rapor_onay_tarihi": clean_value(row.get('Rapor Onay Tarihi')),
-                        "rapor_onaylayan": clean_value(row.get('Raporu Onaylayan Teknik Yönetici'))
-                    }
-                
-                if existing_customer:
-                    # Update existing customer with new equipment info if provided
-                    if equipment_info:
-                        existing_equipments = existing_customer.get('equipments', [])
-                        
-                        # Check if similar equipment already exists
-                        equipment_exists = False
-                        for eq in existing_equipments:
-                            if (eq.get('muayene_alani') == equipment_info.get('muayene_alani') and 
-                                eq.get('muayene_alt_alani') == equipment_info.get('muayene_alt_alani')):
-                                equipment_exists = True
-                                break
-                        
-                        if not equipment_exists:
-                            existing_equipments.append(equipment_info)
-                            await db.customers.update_one(
-                                {"id": existing_customer["id"]},
-                                {"$set": {"equipments": existing_equipments}}
-                            )
-                            warnings.append(f"Satır {index + 2}: Müşteri mevcut, yeni ekipman bilgisi eklendi")
-                        else:
-                            warnings.append(f"Satır {index + 2}: Müşteri ve ekipman bilgisi zaten mevcut")
-                else:
-                    # Create new customer
-                    customer_data = {
-                        "id": str(uuid.uuid4()),
-                        "company_name": customer_name,
-                        "contact_person": customer_name,  # Default to company name
-                        "phone": "",  # Will be empty, can be updated later
-                        "email": "",  # Will be empty, can be updated later
-                        "address": customer_address,
-                        "equipments": [equipment_info] if equipment_info else [],
-                        "created_at": datetime.utcnow(),
-                        "import_source": "bulk_import",
-                        "imported_by": current_user.id,
-                        "imported_at": datetime.utcnow()
-                    }
-                    
-                    await db.customers.insert_one(customer_data)
+        row_warnings = []
+        row_hashes = []
+        try:
+            while (frame := await asyncio.to_thread(next, frames, None)) is not None:
+                df, _ = frame
+                total_rows += len(df)
                 
-                successful_imports += 1
-                    
-            except Exception as e:
-                failed_imports += 1
-                errors.append({
-                    "row": index + 2,
-                    "error": str(e),
-                    "data": dict(row) if hasattr(row, 'to_dict') else str(row)
-                })
+                # Cleaning and skip checks run column-wise; then one prefetch and batched writes
+                rows, skip_warnings = prepare_import_rows(df)
+                successful, chunk_errors, write_warnings, unchanged, hashes = await write_customer_import_delta(
+                    rows, current_user.id, previous_hashes
+                )
+                successful_imports += successful
+                unchanged_rows += unchanged
+                errors += chunk_errors
+                row_warnings += skip_warnings + write_warnings
+                row_hashes += hashes
+        finally:
+            frames.close()
+        failed_imports = len(errors)
+        
+        await record_import_ledger(str(uuid.uuid4()), file_hash, file.filename, current_user.id, total_rows, failed_imports, row_hashes)
+        
+        # Warnings in sheet order
+        row_warnings.sort(key=lambda warning: warning[0])
+        warnings = [message for _, message in row_warnings]
         
         result = BulkImportResult(
             total_rows=total_rows,
             successful_imports=successful_imports,
             failed_imports=failed_imports,
+            unchanged_rows=unchanged_rows,
             errors=errors,
             warnings=warnings
         )
@@ -609,91 +1272,321 @@ async def bulk_import_customers(
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Dosya işleme hatası: {str(e)}")
+    finally:
+        if path:
+            os.remove(path)
 
-@app.get("/api/customers/bulk-import/template")
-async def download_bulk_import_template(current_user: User = Depends(require_role(UserRole.PLANLAMA_UZMANI))):
-    """Bulk import için Excel template'ini indirme endpoint'i"""
-    
-    # Template headers
-    headers = [
-        'Muayene Alanı',
-        'Muayene Alt Alanı', 
-        'Muayene Türü',
-        'Referans',
-        'Muayene Tarihi',
-        'Zorunlu Alan ya da Gönüllü Alan',
-        'Müşteri Adı',
-        'Müşteri Adresi',
-        'Denetçi Adı',
-        'Denetçinin Lokasyonu',
-        'Rapor Onay Tarihi',
-        'Raporu Onaylayan Teknik Yönetici'
-    ]
-    
-    # Sample data
-    sample_data = [
-        [
-            'Kaldırma ve İndirme Ekipmanları',
-            'CARASKAL',
-            'PERİYODİK',
-            'TSE EN 280',
-            '2025-01-15',
-            'Zorunlu Alan',
-            'ABC İnşaat Ltd. Şti.',
-            'İstanbul, Türkiye',
-            'Mehmet Yılmaz',
-            'İstanbul',
-            '2025-01-20',
-            'Ali Koç'
-        ],
-        [
-            'İş Güvenliği Ekipmanları',
-            'İSKELE',
-            'İLK MONTAJ',
-            'TS 498',
-            '2025-02-10',
-            'Gönüllü Alan',
-            'XYZ Yapı A.Ş.',
-            'Ankara, Türkiye',
-            'Ayşe Demir',
-            'Ankara',
-            '',
-            ''
-        ]
-    ]
-    
-    # Create DataFrame
-    df = pd.DataFrame(sample_data, columns=headers)
+# ===================== IMPORT JOBS =====================
+
+# Background imports keep their state in db.jobs and the uploaded file in the job_files GridFS
+# bucket until they finish. A worker holds a job through a lease it renews after every chunk,
+# so a job left behind by a stopped process is picked up again from its last committed chunk.
+IMPORT_JOB_CHUNK_ROWS = int(os.getenv("IMPORT_JOB_CHUNK_ROWS", "500"))
+IMPORT_JOB_LEASE_SECONDS = int(os.getenv("IMPORT_JOB_LEASE_SECONDS", "120"))
+IMPORT_JOB_MAX_MESSAGES = int(os.getenv("IMPORT_JOB_MAX_MESSAGES", "1000"))
+IMPORT_JOB_ACTIVE_STATUSES = ["queued", "running"]
+
+# References to running job tasks so they are not garbage collected mid-run
+_import_job_tasks = set()
+
+def job_files_bucket() -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name="job_files")
+
+async def create_import_job(file: UploadFile, imported_by: str, force: bool = False) -> dict:
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "type": "customer_import",
+        "status": "queued",
+        "filename": file.filename,
+        "created_by": imported_by,
+        "created_at": now,
+        "updated_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "total_rows": None,  # estimated when the job starts, exact once it completes
+        "processed_rows": 0,  # data rows consumed; a resumed run continues from here
+        "successful_imports": 0,
+        "failed_imports": 0,
+        "unchanged_rows": 0,
+        "errors": [],
+        "warnings": [],
+        "error": None,
+        "file_hash": None,
+        "force": force,  # True: ignore the import ledger
+        "run_id": None,
+        "run_started_at": None,
+        "run_start_rows": 0,
+        "lease_until": None
+    }
     
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Müşteri Listesi')
+    # The file is stored before the job exists so a resumable job always has its upload
+    upload = job_files_bucket().open_upload_stream_with_id(job["id"], file.filename)
+    digest = hashlib.sha256()
+    while block := await file.read(IMPORT_SPOOL_BLOCK_BYTES):
+        await upload.write(block)
+        digest.update(block)
+    await upload.close()
+    job["file_hash"] = digest.hexdigest()
+    
+    await db.jobs.insert_one(dict(job))
+    return job
+
+async def spool_job_file(job_id: str, filename: str) -> str:
+    """Copy a job's stored upload to a temporary file; the caller removes it"""
+    download = await job_files_bucket().open_download_stream(job_id)
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1], delete=False) as spool:
+        while block := await download.readchunk():
+            spool.write(block)
+    return spool.name
+
+async def claim_import_job(job_id: str) -> Optional[dict]:
+    """Take the lease of an active job; None when it is finished or another worker holds it"""
+    now = datetime.utcnow()
+    run_id = str(uuid.uuid4())
+    job = await db.jobs.find_one_and_update(
+        {
+            "id": job_id,
+            "status": {"$in": IMPORT_JOB_ACTIVE_STATUSES},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+        },
+        {"$set": {
+            "status": "running",
+            "run_id": run_id,
+            "run_started_at": now,
+            "lease_until": now + timedelta(seconds=IMPORT_JOB_LEASE_SECONDS),
+            "updated_at": now
+        }},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        return None
+    
+    # Rate and ETA of this run are measured from where it started
+    start = {"run_start_rows": job["processed_rows"]}
+    if job.get("started_at") is None:
+        start["started_at"] = now
+    await db.jobs.update_one({"id": job_id, "run_id": run_id}, {"$set": start})
+    job.update(start)
+    return job
+
+async def record_import_job_progress(job: dict, update: dict) -> bool:
+    """Apply a progress update and renew the lease; False once the lease went to another worker"""
+    now = datetime.utcnow()
+    update.setdefault("$set", {}).update({
+        "updated_at": now,
+        "lease_until": now + timedelta(seconds=IMPORT_JOB_LEASE_SECONDS)
+    })
+    result = await db.jobs.update_one({"id": job["id"], "run_id": job["run_id"]}, update)
+    return result.matched_count == 1
+
+def capped_push(values: list) -> dict:
+    return {"$each": values, "$slice": IMPORT_JOB_MAX_MESSAGES}
+
+async def run_import_job(job_id: str):
+    """Process a job chunk by chunk; waits out the lease of a worker that stopped holding it"""
+    job = await claim_import_job(job_id)
+    while job is None:
+        current = await db.jobs.find_one({"id": job_id}, {"_id": 0, "status": 1, "lease_until": 1})
+        if not current or current["status"] not in IMPORT_JOB_ACTIVE_STATUSES:
+            return
+        wait = (current["lease_until"] - datetime.utcnow()).total_seconds() if current.get("lease_until") else 0
+        await asyncio.sleep(max(wait, 0) + 1)
+        job = await claim_import_job(job_id)
+    
+    path = None
+    try:
+        # One ledger lookup decides what a re-upload can skip
+        ledger = None
+        if not job.get("force") and job.get("file_hash"):
+            ledger = await find_import_ledger(job["file_hash"], job["filename"], job["created_by"])
         
-        # Get workbook and worksheet
-        workbook = writer.book
-        worksheet = writer.sheets['Müşteri Listesi']
+        if import_ledger_covers(ledger, job["file_hash"]):
+            finished = {
+                "total_rows": ledger["total_rows"],
+                "processed_rows": ledger["total_rows"],
+                "unchanged_rows": ledger["rows"],
+                "warnings": ["Bu dosya daha önce içe aktarıldı, değişen satır yok"]
+            }
+        else:
+            previous_hashes = set(ledger["row_hashes"]) if ledger else set()
+            path = await spool_job_file(job_id, job["filename"])
+            if job["total_rows"] is None:
+                total_rows = await asyncio.to_thread(estimate_import_rows, path, job["filename"])
+                if not await record_import_job_progress(job, {"$set": {"total_rows": total_rows}}):
+                    return
+            
+            # A resumed job skips the data rows its committed chunks already consumed
+            frames = iter_import_frames(path, job["filename"], IMPORT_JOB_CHUNK_ROWS, job["processed_rows"])
+            processed_rows = job["processed_rows"]
+            failed_rows = job["failed_imports"]
+            try:
+                while (frame := await asyncio.to_thread(next, frames, None)) is not None:
+                    df, processed_rows = frame
+                    rows, skip_warnings = prepare_import_rows(df)
+                    successful, errors, write_warnings, unchanged, hashes = await write_customer_import_delta(
+                        rows, job["created_by"], previous_hashes
+                    )
+                    warnings = sorted(skip_warnings + write_warnings, key=lambda warning: warning[0])
+                    if not await record_import_job_progress(job, {
+                        "$set": {"processed_rows": processed_rows},
+                        "$inc": {"successful_imports": successful, "failed_imports": len(errors), "unchanged_rows": unchanged},
+                        "$push": {"errors": capped_push(errors), "warnings": capped_push([message for _, message in warnings])}
+                    }):
+                        return
+                    failed_rows += len(errors)
+                    # The job's ledger entry shares its id and only counts once the job completes
+                    await append_import_ledger(job_id, job["file_hash"], job["filename"], job["created_by"], hashes)
+            finally:
+                frames.close()
+            
+            await complete_import_ledger(job_id, processed_rows, failed_rows)
+            finished = {"processed_rows": processed_rows, "total_rows": processed_rows}
         
-        # Adjust column widths
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+        status, error = "completed", None
+    except Exception as e:
+        logging.exception(f"Import job {job_id} failed")
+        status, error, finished = "failed", str(e), {}
+    finally:
+        if path:
+            os.remove(path)
     
-    output.seek(0)
+    finished.update({"status": status, "error": error, "finished_at": datetime.utcnow(), "lease_until": None})
+    if await record_import_job_progress(job, {"$set": finished}):
+        try:
+            await job_files_bucket().delete(job_id)
+        except Exception as e:
+            logging.warning(f"Import job {job_id}: stored upload not removed: {e}")
+
+def start_import_job(job_id: str):
+    task = asyncio.create_task(run_import_job(job_id))
+    _import_job_tasks.add(task)
+    task.add_done_callback(_import_job_tasks.discard)
+
+async def resume_import_jobs():
+    """Restart jobs left queued or running by a previous process (run at startup)"""
+    await db.jobs.create_index("id", unique=True)
+    resumed = 0
+    async for job in db.jobs.find({"status": {"$in": IMPORT_JOB_ACTIVE_STATUSES}}, {"_id": 0, "id": 1}):
+        start_import_job(job["id"])
+        resumed += 1
+    if resumed:
+        print(f"✅ Import jobs: resuming {resumed} unfinished jobs")
+
+def import_job_progress(job: dict, now: Optional[datetime] = None) -> dict:
+    """Public view of a job with the throughput and ETA of its current run"""
+    now = job.get("finished_at") or now or datetime.utcnow()
+    rows_per_second = None
+    eta_seconds = None
+    if job.get("run_started_at"):
+        elapsed = (now - job["run_started_at"]).total_seconds()
+        done = job["processed_rows"] - job.get("run_start_rows", 0)
+        if elapsed > 0:
+            rows_per_second = round(done / elapsed, 1)
+        if job["status"] == "completed":
+            eta_seconds = 0
+        elif rows_per_second and job.get("total_rows") is not None:
+            eta_seconds = round(max(job["total_rows"] - job["processed_rows"], 0) / rows_per_second, 1)
+    
+    progress = None
+    if job["status"] == "completed" or job.get("total_rows") == 0:
+        progress = 100.0
+    elif job.get("total_rows"):
+        progress = round(min(100 * job["processed_rows"] / job["total_rows"], 100.0), 1)
+    
+    hidden = {"_id", "run_id", "run_start_rows", "lease_until"}
+    view = {key: value for key, value in job.items() if key not in hidden}
+    view.update({"progress": progress, "rows_per_second": rows_per_second, "eta_seconds": eta_seconds})
+    return view
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job or (current_user.role != UserRole.ADMIN and job["created_by"] != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return import_job_progress(job)
+
+BULK_IMPORT_TEMPLATE_FILENAME = "musteri_listesi_template.xlsx"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Sample data
+BULK_IMPORT_TEMPLATE_SAMPLE_ROWS = [
+    [
+        'Kaldırma ve İndirme Ekipmanları',
+        'CARASKAL',
+        'PERİYODİK',
+        'TSE EN 280',
+        '2025-01-15',
+        'Zorunlu Alan',
+        'ABC İnşaat Ltd. Şti.',
+        'İstanbul, Türkiye',
+        'Mehmet Yılmaz',
+        'İstanbul',
+        '2025-01-20',
+        'Ali Koç'
+    ],
+    [
+        'İş Güvenliği Ekipmanları',
+        'İSKELE',
+        'İLK MONTAJ',
+        'TS 498',
+        '2025-02-10',
+        'Gönüllü Alan',
+        'XYZ Yapı A.Ş.',
+        'Ankara, Türkiye',
+        'Ayşe Demir',
+        'Ankara',
+        '',
+        ''
+    ]
+]
+
+# The template never changes while the process runs, so it is built once
+_bulk_import_template: Optional[bytes] = None
+
+def build_bulk_import_template() -> bytes:
+    """The import template workbook: header row, sample rows and column widths from the text lengths"""
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.title = 'Müşteri Listesi'
+    worksheet.append(BULK_IMPORT_COLUMNS)
+    for cell in worksheet[1]:
+        cell.font = openpyxl.styles.Font(bold=True)
+    for row in BULK_IMPORT_TEMPLATE_SAMPLE_ROWS:
+        worksheet.append(row)
+    
+    # Adjust column widths
+    for index, column in enumerate(zip(BULK_IMPORT_COLUMNS, *BULK_IMPORT_TEMPLATE_SAMPLE_ROWS), start=1):
+        max_length = max(len(value) for value in column)
+        worksheet.column_dimensions[openpyxl.utils.get_column_letter(index)].width = min(max_length + 2, 50)
     
-    return {
-        "message": "Template hazırlandı",
-        "filename": "musteri_listesi_template.xlsx",
-        "content": output.getvalue().hex()  # Send as hex string
-    }
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def bulk_import_template() -> bytes:
+    global _bulk_import_template
+    if _bulk_import_template is None:
+        _bulk_import_template = build_bulk_import_template()
+    return _bulk_import_template
+
+def iter_bytes(content: bytes, block_size: int = 64 * 1024):
+    for start in range(0, len(content), block_size):
+        yield content[start:start + block_size]
+
+@app.get("/api/customers/bulk-import/template")
+async def download_bulk_import_template(current_user: User = Depends(require_role(UserRole.PLANLAMA_UZMANI))):
+    """Bulk import için Excel template'ini indirme endpoint'i (xlsx dosyası olarak)"""
+    content = bulk_import_template()
+    return StreamingResponse(
+        iter_bytes(content),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{BULK_IMPORT_TEMPLATE_FILENAME}"',
+            "Content-Length": str(len(content))
+        }
+    )
 
 # ===================== EQUIPMENT TEMPLATES =====================
 
@@ -806,6 +1699,76 @@ def get_caraskal_template():
         "categories": caraskal_categories
     }
 
+# ===================== TEMPLATE VERSIONS =====================
+
+TEMPLATE_VERSION_CACHE_SIZE = 128
+# Bookkeeping fields that are not part of a template's content
+TEMPLATE_VERSION_META_FIELDS = ("_id", "version", "updated_at")
+
+_template_version_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+
+def template_diff(previous: dict, current: dict) -> dict:
+    """Compact top-level diff: new values of changed/added fields and names of removed ones"""
+    changed = {
+        key: value for key, value in current.items()
+        if key not in TEMPLATE_VERSION_META_FIELDS and previous.get(key) != value  # absent == None
+    }
+    removed = [key for key in previous if key not in TEMPLATE_VERSION_META_FIELDS and key not in current]
+    return {"changed": changed, "removed": removed}
+
+async def record_template_version(template: dict, previous: Optional[dict] = None, created_by: Optional[str] = None):
+    """Store a template version once; an existing (template_id, version) entry is never overwritten"""
+    snapshot = {key: value for key, value in template.items() if key != "_id"}
+    version = snapshot.get("version", 1)
+    await db.equipment_template_versions.update_one(
+        {"template_id": snapshot["id"], "version": version},
+        {"$setOnInsert": {
+            "template_id": snapshot["id"],
+            "version": version,
+            "snapshot": snapshot,
+            "diff": template_diff(previous, snapshot) if previous else None,
+            "created_by": created_by or snapshot.get("created_by"),
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+async def get_template_version(template_id: str, version: int) -> Optional[dict]:
+    """A template as it was at `version`; versions are immutable so they are cached without invalidation"""
+    key = (template_id, version)
+    template = _template_version_cache.get(key)
+    if template is not None:
+        _template_version_cache.move_to_end(key)
+        return template
+
+    entry = await db.equipment_template_versions.find_one(
+        {"template_id": template_id, "version": version}, {"_id": 0, "snapshot": 1}
+    )
+    if entry:
+        template = entry["snapshot"]
+    else:
+        # Versions are snapshotted before their first change, so an unchanged template is
+        # still stored only in equipment_templates
+        live = await db.equipment_templates.find_one({"id": template_id}, {"_id": 0})
+        if live and live.get("version", 1) == version:
+            template = live
+    if template is None:
+        return None
+
+    _template_version_cache[key] = template
+    if len(_template_version_cache) > TEMPLATE_VERSION_CACHE_SIZE:
+        _template_version_cache.popitem(last=False)
+    return template
+
+async def get_inspection_template(inspection: dict) -> Optional[dict]:
+    """The template version an inspection was created against; older inspections use the active template"""
+    if inspection.get("template_id") and inspection.get("template_version"):
+        template = await get_template_version(inspection["template_id"], inspection["template_version"])
+        if template:
+            return template
+    equipment_type = (inspection.get("equipment_info") or {}).get("equipment_type", "CARASKAL")
+    return await db.equipment_templates.find_one({"equipment_type": equipment_type, "is_active": True})
+
 # ===================== TEMPLATE MANAGEMENT API =====================
 
 @app.post("/api/equipment-templates", response_model=EquipmentTemplate)
@@ -820,6 +1783,7 @@ async def create_equipment_template(
     
     template_dict = template.dict()
     template_dict["id"] = str(uuid.uuid4())
+    template_dict["version"] = 1
     template_dict["created_by"] = current_user.id
     template_dict["is_active"] = True
     template_dict["created_at"] = datetime.utcnow()
@@ -846,18 +1810,51 @@ async def update_equipment_template(
     template_update: EquipmentTemplateCreate,
     current_user: User = Depends(require_role(UserRole.ADMIN))
 ):
-    existing = await db.equipment_templates.find_one({"id": template_id})
+    existing = await db.equipment_templates.find_one({"id": template_id}, {"_id": 0})
     if not existing:
         raise HTTPException(status_code=404, detail="Template not found")
     
+    # Keep the current content reachable for inspections pinned to it before overwriting
+    await record_template_version(existing)
+    
+    current_version = existing.get("version", 1)
     update_data = template_update.dict()
     update_data["updated_at"] = datetime.utcnow()
+    update_data["version"] = current_version + 1
+    
+    # Only move forward from the version we snapshotted; a concurrent update wins otherwise
+    version_filter = {"version": current_version} if "version" in existing else {"version": {"$exists": False}}
+    updated_template = await db.equipment_templates.find_one_and_update(
+        {"id": template_id, **version_filter},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_template:
+        raise HTTPException(status_code=409, detail="Template was changed by another request, reload and try again")
     
-    await db.equipment_templates.update_one({"id": template_id}, {"$set": update_data})
-    
-    updated_template = await db.equipment_templates.find_one({"id": template_id})
+    await record_template_version(updated_template, previous=existing, created_by=current_user.id)
     return EquipmentTemplate(**updated_template)
 
+@app.get("/api/equipment-templates/{template_id}/versions")
+async def get_equipment_template_versions(template_id: str, current_user: User = Depends(get_current_user)):
+    """Version history of a template (diffs only; fetch a single version for its full content)"""
+    template = await db.equipment_templates.find_one({"id": template_id}, {"_id": 0, "version": 1})
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    versions = await db.equipment_template_versions.find(
+        {"template_id": template_id}, {"_id": 0, "snapshot": 0}
+    ).sort("version", -1).to_list(1000)
+    return {"template_id": template_id, "current_version": template.get("version", 1), "versions": versions}
+
+@app.get("/api/equipment-templates/{template_id}/versions/{version}", response_model=EquipmentTemplate)
+async def get_equipment_template_version(template_id: str, version: int, current_user: User = Depends(get_current_user)):
+    template = await get_template_version(template_id, version)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template version not found")
+    return EquipmentTemplate(**template)
+
 @app.delete("/api/equipment-templates/{template_id}")
 async def delete_equipment_template(
     template_id: str,
@@ -874,7 +1871,7 @@ async def delete_equipment_template(
 class InspectionFormResult(BaseModel):
     item_id: int
     category: str
-    value: str  # "U", "UD", "UY"
+    value: str  # "U", "UD", "U.Y"
     comment: Optional[str] = None
 
 class InspectionFormData(BaseModel):
@@ -886,11 +1883,194 @@ class InspectionFormData(BaseModel):
     notes: Optional[str] = None  # Notlar
     conclusion: Optional[str] = None  # Sonuç (UYGUN/SAKINCALI)
 
-# ===================== DYNAMIC FORM BUILDER API =====================
+# ===================== FORM VALIDATION =====================
 
-@app.get("/api/inspections/{inspection_id}/form")
-async def get_inspection_form(inspection_id: str, current_user: User = Depends(get_current_user)):
-    # Get inspection details
+DROPDOWN_OPTIONS = ["U", "UD", "U.Y"]
+DROPDOWN_ALIASES = {"UY": "U.Y"}  # Eski istemciler "UY" gönderiyor
+FORM_VALIDATOR_CACHE_SIZE = 256
+
+def normalize_dropdown_value(value):
+    """The stored spelling of a dropdown answer; legacy aliases map to their option"""
+    return DROPDOWN_ALIASES.get(value, value) if isinstance(value, str) else value
+
+def normalize_form_data_values(form_data: dict) -> dict:
+    """Normalize the values of a {item_id: {value, comment}} form_data map"""
+    return {
+        item_id: dict(entry, value=normalize_dropdown_value(entry["value"]))
+        if isinstance(entry, dict) and "value" in entry else entry
+        for item_id, entry in (form_data or {}).items()
+    }
+
+class CompiledFormValidator:
+    """Template control items flattened once into an item id -> rule lookup"""
+
+    __slots__ = ("rules", "required_ids")
+
+    def __init__(self, template: dict):
+        self.rules = {}
+        self.required_ids = set()
+
+        items = []
+        for category in template.get("categories") or []:
+            for item in category.get("items", []):
+                items.append((item, category.get("code")))
+        if not items:
+            # Uploaded templates may only carry the flat control_items list
+            items = [(item, item.get("category")) for item in template.get("control_items") or []]
+
+        for item, category_code in items:
+            try:
+                item_id = int(item["id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            input_type = item.get("input_type") or ("dropdown" if item.get("has_dropdown", True) else "text")
+            allowed = frozenset(DROPDOWN_OPTIONS) if input_type == "dropdown" else None
+            required = item.get("required", True)
+            self.rules[item_id] = (item.get("category") or category_code, input_type, allowed, required)
+            if required:
+                self.required_ids.add(item_id)
+
+    def validate(self, form_results: list) -> List[Dict[str, Any]]:
+        """Check a submission in a single pass; returns structured errors (empty when valid)"""
+        errors = []
+        seen = set()
+        rules = self.rules
+
+        for result in form_results:
+            if isinstance(result, dict):
+                item_id, category, value = result.get("item_id"), result.get("category"), result.get("value")
+            else:
+                item_id, category, value = result.item_id, result.category, result.value
+
+            rule = rules.get(item_id)
+            if rule is None:
+                errors.append({"item_id": item_id, "code": "unknown_item", "message": "Şablonda olmayan kontrol maddesi"})
+                continue
+            if item_id in seen:
+                errors.append({"item_id": item_id, "code": "duplicate_item", "message": "Kontrol maddesi birden fazla gönderildi"})
+                continue
+            seen.add(item_id)
+
+            expected_category, input_type, allowed, required = rule
+            if expected_category and category != expected_category:
+                errors.append({
+                    "item_id": item_id, "code": "category_mismatch",
+                    "message": f"Kategori {expected_category} olmalı", "expected": expected_category
+                })
+
+            value = normalize_dropdown_value(value)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                if required:
+                    errors.append({"item_id": item_id, "code": "missing_required", "message": "Zorunlu kontrol maddesi boş"})
+            elif allowed is not None:
+                if value not in allowed:
+                    errors.append({
+                        "item_id": item_id, "code": "invalid_value",
+                        "message": f"Geçersiz değer: {value}", "allowed": DROPDOWN_OPTIONS
+                    })
+            elif input_type == "number":
+                try:
+                    float(str(value).replace(",", "."))
+                except ValueError:
+                    errors.append({"item_id": item_id, "code": "invalid_value", "message": f"Sayısal değer bekleniyor: {value}"})
+
+        for item_id in sorted(self.required_ids - seen):
+            errors.append({"item_id": item_id, "code": "missing_required", "message": "Zorunlu kontrol maddesi eksik"})
+
+        return errors
+
+_form_validator_cache: "OrderedDict[tuple, CompiledFormValidator]" = OrderedDict()
+
+def form_validator_cache_key(template: dict) -> tuple:
+    return (template.get("id"), template.get("version"), template.get("updated_at"))
+
+def get_form_validator(template: dict) -> CompiledFormValidator:
+    """Compiled validator for a template version, built on first use and kept in an LRU cache"""
+    key = form_validator_cache_key(template)
+    validator = _form_validator_cache.get(key)
+    if validator is not None:
+        _form_validator_cache.move_to_end(key)
+        return validator
+
+    validator = CompiledFormValidator(template)
+    _form_validator_cache[key] = validator
+    if len(_form_validator_cache) > FORM_VALIDATOR_CACHE_SIZE:
+        _form_validator_cache.popitem(last=False)
+    return validator
+
+async def get_form_validator_for_equipment(equipment_type: str) -> Optional[CompiledFormValidator]:
+    """Look up the active template version and only load the full template on a cache miss"""
+    template_ref = await db.equipment_templates.find_one(
+        {"equipment_type": equipment_type, "is_active": True},
+        {"_id": 0, "id": 1, "version": 1, "updated_at": 1}
+    )
+    if not template_ref:
+        return None
+
+    validator = _form_validator_cache.get(form_validator_cache_key(template_ref))
+    if validator is not None:
+        _form_validator_cache.move_to_end(form_validator_cache_key(template_ref))
+        return validator
+
+    template = await db.equipment_templates.find_one({"id": template_ref["id"]})
+    return get_form_validator(template) if template else None
+
+async def get_form_validator_for_inspection(inspection: dict) -> Optional[CompiledFormValidator]:
+    """Validate against the template version the inspection is pinned to"""
+    if inspection.get("template_id") and inspection.get("template_version"):
+        template = await get_template_version(inspection["template_id"], inspection["template_version"])
+        if template:
+            return get_form_validator(template)
+    equipment_type = inspection["equipment_info"].get("equipment_type", "CARASKAL")
+    return await get_form_validator_for_equipment(equipment_type)
+
+# ===================== DYNAMIC FORM BUILDER API =====================
+
+# Fields returned by form saves in minimal mode - everything else was sent by the client
+MINIMAL_INSPECTION_PROJECTION = {
+    "_id": 0, "id": 1, "version": 1, "status": 1, "updated_at": 1, "completed_at": 1,
+    "report_data.last_saved": 1, "report_data.saved_by": 1
+}
+
+def wants_minimal_response(prefer: Optional[str], minimal: bool) -> bool:
+    """RFC 7240 `Prefer: return=minimal` header or the equivalent ?minimal=true flag"""
+    if minimal:
+        return True
+    for preference in (prefer or "").split(","):
+        # A preference may carry parameters: "return=minimal; handling=lenient"
+        name, _, value = preference.split(";", 1)[0].partition("=")
+        if name.strip().lower() == "return" and value.strip().strip('"').lower() == "minimal":
+            return True
+    return False
+
+async def apply_form_update(inspection_id: str, update: dict, message: str, minimal: bool, response: Response):
+    """Write a form update and answer with either the full inspection or just the server-side delta"""
+    # The body depends on the Prefer header, caches must not mix the two shapes
+    response.headers["Vary"] = "Prefer"
+    if not minimal:
+        await db.inspections.update_one({"id": inspection_id}, update)
+        updated_inspection = await db.inspections.find_one({"id": inspection_id})
+        return {"message": message, "inspection": Inspection(**updated_inspection)}
+
+    # One round trip: the write returns the new version instead of a follow-up read
+    delta = await db.inspections.find_one_and_update(
+        {"id": inspection_id},
+        update,
+        projection=MINIMAL_INSPECTION_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not delta:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    response.headers["Preference-Applied"] = "return=minimal"
+    report_data = delta.pop("report_data", None) or {}
+    delta["version"] = delta.get("version", 0)
+    delta["last_saved"] = report_data.get("last_saved")
+    delta["saved_by"] = report_data.get("saved_by")
+    return {"message": message, "inspection": delta}
+
+@app.get("/api/inspections/{inspection_id}/form")
+async def get_inspection_form(inspection_id: str, current_user: User = Depends(get_current_user)):
+    # Get inspection details
     query = {"id": inspection_id}
     if current_user.role == UserRole.DENETCI:
         query["inspector_id"] = current_user.id
@@ -904,9 +2084,9 @@ async def get_inspection_form(inspection_id: str, current_user: User = Depends(g
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    # Get equipment template
+    # Get equipment template - the version the inspection was created against
     equipment_type = inspection["equipment_info"].get("equipment_type", "CARASKAL")
-    template = await db.equipment_templates.find_one({"equipment_type": equipment_type, "is_active": True})
+    template = await get_inspection_template(inspection)
     if not template:
         raise HTTPException(status_code=404, detail="Equipment template not found")
     
@@ -961,6 +2141,9 @@ async def get_inspection_form(inspection_id: str, current_user: User = Depends(g
 async def save_inspection_form(
     inspection_id: str,
     form_data: InspectionFormData,
+    response: Response,
+    minimal: bool = False,
+    prefer: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     # Check authorization
@@ -968,7 +2151,9 @@ async def save_inspection_form(
     if current_user.role == UserRole.DENETCI:
         query["inspector_id"] = current_user.id
     
-    inspection = await db.inspections.find_one(query)
+    inspection = await db.inspections.find_one(
+        query, {"_id": 0, "id": 1, "equipment_info": 1, "template_id": 1, "template_version": 1}
+    )
     if not inspection:
         raise HTTPException(status_code=404, detail="Inspection not found")
     
@@ -976,22 +2161,40 @@ async def save_inspection_form(
     if not form_data.form_results:
         raise HTTPException(status_code=400, detail="Form results cannot be empty")
     
+    # Store the canonical option so readers of report_data never see legacy aliases
+    for result in form_data.form_results:
+        result.value = normalize_dropdown_value(result.value)
+    
+    validator = await get_form_validator_for_inspection(inspection)
+    if validator:
+        validation_errors = validator.validate(form_data.form_results)
+        if validation_errors:
+            raise HTTPException(
+                status_code=400,
+                detail={"message": "Form validation failed", "errors": validation_errors}
+            )
+    
     # Update inspection with form data
     update_data = {
         "report_data": form_data.dict(),
         "updated_at": datetime.utcnow()
     }
     
-    await db.inspections.update_one({"id": inspection_id}, {"$set": update_data})
-    
-    # Get updated inspection
-    updated_inspection = await db.inspections.find_one({"id": inspection_id})
-    return {"message": "Form saved successfully", "inspection": Inspection(**updated_inspection)}
+    return await apply_form_update(
+        inspection_id,
+        {"$set": update_data, "$inc": {"version": 1}},
+        "Form saved successfully",
+        wants_minimal_response(prefer, minimal),
+        response
+    )
 
 @app.put("/api/inspections/{inspection_id}/form")
 async def update_inspection_form(
     inspection_id: str,
     form_data: dict,
+    response: Response,
+    minimal: bool = False,
+    prefer: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """Update inspection form data with enhanced Phase 6.2 & 6.3 features"""
@@ -1000,14 +2203,14 @@ async def update_inspection_form(
     if current_user.role == UserRole.DENETCI:
         query["inspector_id"] = current_user.id
     
-    inspection = await db.inspections.find_one(query)
+    inspection = await db.inspections.find_one(query, {"_id": 0, "id": 1})
     if not inspection:
         raise HTTPException(status_code=404, detail="Inspection not found")
     
     # Prepare update data
     update_data = {
         "report_data": {
-            "form_data": form_data.get("form_data", {}),
+            "form_data": normalize_form_data_values(form_data.get("form_data", {})),
             "general_info": form_data.get("general_info", {}),
             "equipment_info": form_data.get("equipment_info", {}),
             "photos": form_data.get("photos", {}),
@@ -1024,11 +2227,265 @@ async def update_inspection_form(
         update_data["status"] = "rapor_yazildi"
         update_data["completed_at"] = form_data.get("completed_at", datetime.utcnow().isoformat())
     
-    await db.inspections.update_one({"id": inspection_id}, {"$set": update_data})
-    
-    # Get updated inspection
-    updated_inspection = await db.inspections.find_one({"id": inspection_id})
-    return {"message": "Form updated successfully", "inspection": Inspection(**updated_inspection)}
+    return await apply_form_update(
+        inspection_id,
+        {"$set": update_data, "$inc": {"version": 1}},
+        "Form updated successfully",
+        wants_minimal_response(prefer, minimal),
+        response
+    )
+
+# ===================== OFFLINE SYNC =====================
+
+SYNC_MAX_OPERATIONS = 1000
+SYNC_SECTIONS = ("form_data", "general_info", "equipment_info", "photos")
+SYNC_SCALARS = ("is_draft", "completion_percentage")
+
+class SyncOperation(BaseModel):
+    op_id: str  # İstemcinin kuyruktaki işlem kimliği
+    inspection_id: str
+    last_saved: datetime  # İşlemin cihazda kaydedildiği zaman
+    form_data: Dict[str, Any] = {}
+    general_info: Dict[str, Any] = {}
+    equipment_info: Dict[str, Any] = {}
+    photos: Dict[str, Any] = {}
+    is_draft: Optional[bool] = None
+    completion_percentage: Optional[float] = None
+
+class SyncRequest(BaseModel):
+    operations: List[SyncOperation]
+
+class SyncOperationResult(BaseModel):
+    op_id: str
+    inspection_id: str
+    status: str  # applied, partial, conflict, invalid, not_found
+    applied: List[str] = []
+    rejected: List[str] = []
+    invalid: List[str] = []  # unsafe field keys; never applied, retrying does not help
+
+class SyncResponse(BaseModel):
+    results: List[SyncOperationResult]
+    versions: Dict[str, Dict[str, Any]]
+
+def _as_naive_utc(value) -> Optional[datetime]:
+    """Normalize ISO strings / aware datetimes to the naive UTC datetimes used in the database"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = (value - value.utcoffset()).replace(tzinfo=None)
+    return value
+
+def _flatten_field_stamps(stamps: Dict[str, Any], prefix: str = "") -> Dict[str, datetime]:
+    """report_data.field_saved_at is stored nested; flatten it to dotted field paths"""
+    flat = {}
+    for key, value in (stamps or {}).items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten_field_stamps(value, f"{path}."))
+        else:
+            stamp = _as_naive_utc(value)
+            if stamp:
+                flat[path] = stamp
+    return flat
+
+def _set_nested(target: dict, path: str, value):
+    section, _, key = path.partition(".")
+    if key:
+        target.setdefault(section, {})[key] = value
+    else:
+        target[section] = value
+
+def _sync_operation_fields(operation: SyncOperation) -> List[tuple]:
+    """List (field_path, value) pairs carried by a queued operation"""
+    fields = []
+    for section in SYNC_SECTIONS:
+        values = getattr(operation, section)
+        if section == "form_data":
+            values = normalize_form_data_values(values)
+        for key, value in values.items():
+            fields.append((f"{section}.{key}", value))
+    for scalar in SYNC_SCALARS:
+        value = getattr(operation, scalar)
+        if value is not None:
+            fields.append((scalar, value))
+    return fields
+
+def resolve_sync_operations(operations: List[SyncOperation], inspections: Dict[str, dict], user_id: str, sync_id: str):
+    """
+    Merge queued offline operations against the current inspections, field by field.
+    A field is applied when the operation's last_saved is not older than the field's
+    last server write; otherwise the server value wins. Returns per-operation results
+    (in request order) and {inspection_id: UpdateOne}, one $set/$inc per touched inspection,
+    guarded by the version the merge was computed against and tagged with report_data.sync_id.
+    """
+    now = datetime.utcnow()
+    results = {}
+    field_stamps = {}
+    pending = {}
+
+    # Apply operations oldest first so later device edits win within the batch too
+    ordered = sorted(enumerate(operations), key=lambda pair: _as_naive_utc(pair[1].last_saved))
+    for index, operation in ordered:
+        inspection = inspections.get(operation.inspection_id)
+        if inspection is None:
+            results[index] = SyncOperationResult(
+                op_id=operation.op_id, inspection_id=operation.inspection_id, status="not_found"
+            )
+            continue
+
+        report_data = inspection.get("report_data") or {}
+        if operation.inspection_id not in field_stamps:
+            field_stamps[operation.inspection_id] = _flatten_field_stamps(report_data.get("field_saved_at"))
+        stamps = field_stamps[operation.inspection_id]
+        fallback_stamp = _as_naive_utc(report_data.get("last_saved"))
+        op_stamp = _as_naive_utc(operation.last_saved)
+
+        applied, rejected, invalid = [], [], []
+        changes = pending.setdefault(operation.inspection_id, {})
+        for path, value in _sync_operation_fields(operation):
+            if any(part == "" or "." in part or part.startswith("$") for part in path.split(".", 1)):
+                invalid.append(path)
+                continue
+            server_stamp = stamps.get(path, fallback_stamp)
+            if server_stamp is not None and op_stamp < server_stamp:
+                rejected.append(path)
+                continue
+            changes[path] = value
+            stamps[path] = op_stamp
+            applied.append(path)
+
+        if applied:
+            status_value = "partial" if rejected or invalid else "applied"
+        else:
+            status_value = "conflict" if rejected else "invalid"
+        results[index] = SyncOperationResult(
+            op_id=operation.op_id,
+            inspection_id=operation.inspection_id,
+            status=status_value,
+            applied=applied,
+            rejected=rejected,
+            invalid=invalid
+        )
+
+    updates = {}
+    for inspection_id, changes in pending.items():
+        if not changes:
+            continue
+
+        inspection = inspections[inspection_id]
+        stamps = field_stamps[inspection_id]
+        latest_stamp = max(stamps[path] for path in changes)
+        meta = {
+            "last_saved": latest_stamp.isoformat(),
+            "saved_by": user_id,
+            "sync_id": sync_id
+        }
+
+        if inspection.get("report_data") is None:
+            # report_data is null - dotted paths cannot be created under it, write it whole
+            report_data = dict(meta, field_saved_at={})
+            for path, value in changes.items():
+                _set_nested(report_data, path, value)
+                _set_nested(report_data["field_saved_at"], path, stamps[path])
+            set_data = {"report_data": report_data}
+        else:
+            set_data = {f"report_data.{key}": value for key, value in meta.items()}
+            for path, value in changes.items():
+                set_data[f"report_data.{path}"] = value
+                set_data[f"report_data.field_saved_at.{path}"] = stamps[path]
+
+        set_data["updated_at"] = now
+        if changes.get("is_draft") is False:
+            set_data["status"] = "rapor_yazildi"
+            set_data["completed_at"] = latest_stamp.isoformat()
+
+        version = inspection.get("version")
+        version_filter = {"version": version} if version is not None else {"version": {"$exists": False}}
+        updates[inspection_id] = UpdateOne(
+            {"id": inspection_id, **version_filter},
+            {"$set": set_data, "$inc": {"version": 1}}
+        )
+
+    return [results[index] for index in range(len(operations))], updates
+
+@app.post("/api/sync", response_model=SyncResponse)
+async def sync_offline_operations(
+    sync_request: SyncRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Replay a batch of queued offline form edits across many inspections in one round trip"""
+    operations = sync_request.operations
+    if len(operations) > SYNC_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Maximum {SYNC_MAX_OPERATIONS} operations can be synced at once")
+
+    inspection_ids = list({operation.inspection_id for operation in operations})
+    query = {"id": {"$in": inspection_ids}}
+    if current_user.role == UserRole.DENETCI:
+        query["inspector_id"] = current_user.id
+
+    # Only the conflict-resolution metadata is needed, not the full report_data
+    pipeline = [
+        {"$match": query},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "version": 1,
+            "last_saved": "$report_data.last_saved",
+            "field_saved_at": "$report_data.field_saved_at",
+            "report_missing": {"$eq": [{"$ifNull": ["$report_data", None]}, None]}
+        }}
+    ]
+    inspections = {}
+    async for row in db.inspections.aggregate(pipeline):
+        inspections[row["id"]] = {
+            "id": row["id"],
+            "version": row.get("version"),
+            "report_data": None if row.get("report_missing") else {
+                "last_saved": row.get("last_saved"),
+                "field_saved_at": row.get("field_saved_at")
+            }
+        }
+
+    # Every update is tagged with this request's sync id, so the read below tells which
+    # version-guarded updates lost against a write made since the read above
+    sync_id = str(uuid.uuid4())
+    results, updates = resolve_sync_operations(operations, inspections, current_user.id, sync_id)
+    matched = len(updates)
+    if updates:
+        outcome = await db.inspections.bulk_write(list(updates.values()), ordered=False)
+        matched = outcome.matched_count
+
+    versions = {}
+    if inspections:
+        fresh = await db.inspections.find(
+            {"id": {"$in": list(inspections)}},
+            {"_id": 0, "id": 1, "version": 1, "status": 1, "updated_at": 1, "report_data.sync_id": 1}
+        ).to_list(None)
+        if matched < len(updates):
+            landed = {
+                inspection["id"] for inspection in fresh
+                if (inspection.get("report_data") or {}).get("sync_id") == sync_id
+            }
+            for result in results:
+                if result.inspection_id in updates and result.inspection_id not in landed and result.applied:
+                    result.rejected = result.applied + result.rejected
+                    result.applied = []
+                    result.status = "conflict"
+        versions = {
+            inspection["id"]: {
+                "version": inspection.get("version", 0),
+                "status": inspection.get("status"),
+                "updated_at": inspection.get("updated_at")
+            }
+            for inspection in fresh
+        }
+
+    return SyncResponse(results=results, versions=versions)
 
 @app.get("/api/equipment-templates/{equipment_type}/form-structure")
 async def get_equipment_form_structure(equipment_type: str, current_user: User = Depends(get_current_user)):
@@ -1055,7 +2512,7 @@ async def get_equipment_form_structure(equipment_type: str, current_user: User =
                     "input_type": item["input_type"],
                     "has_comment": item["has_comment"],
                     "required": item["required"],
-                    "options": ["U", "UD", "U.Y"] if item["input_type"] == "dropdown" else None
+                    "options": DROPDOWN_OPTIONS if item["input_type"] == "dropdown" else None
                 }
                 for item in category["items"]
             ]
@@ -1075,6 +2532,7 @@ async def initialize_caraskal_template(current_user: User = Depends(require_role
     caraskal_data = get_caraskal_template()
     template_dict = caraskal_data.copy()
     template_dict["id"] = str(uuid.uuid4())
+    template_dict["version"] = 1
     template_dict["created_by"] = current_user.id
     template_dict["is_active"] = True
     template_dict["created_at"] = datetime.utcnow()
@@ -1085,6 +2543,12 @@ async def initialize_caraskal_template(current_user: User = Depends(require_role
 
 # ===================== INSPECTION MANAGEMENT =====================
 
+# Inspections in these states block another one for the same customer and equipment
+ACTIVE_INSPECTION_STATUSES = ["beklemede", "devam_ediyor", "rapor_yazildi"]
+
+INSPECTION_BATCH_MAX_PAIRS = int(os.getenv("INSPECTION_BATCH_MAX_PAIRS", "5000"))
+INSPECTION_BATCH_WRITE_CHUNK = int(os.getenv("INSPECTION_BATCH_WRITE_CHUNK", "1000"))
+
 @app.post("/api/inspections", response_model=Inspection)
 async def create_inspection(inspection: InspectionCreate, current_user: User = Depends(require_role(UserRole.PLANLAMA_UZMANI))):
     # Check for duplicate inspection (same customer + equipment combination)
@@ -1097,7 +2561,7 @@ async def create_inspection(inspection: InspectionCreate, current_user: User = D
             "customer_id": inspection.customer_id,
             "equipment_info.serial_number": equipment_serial,
             "equipment_info.equipment_type": equipment_type,
-            "status": {"$in": ["beklemede", "devam_ediyor", "rapor_yazildi"]}  # Only check active inspections
+            "status": {"$in": ACTIVE_INSPECTION_STATUSES}  # Only check active inspections
         })
         
         if existing_inspection:
@@ -1113,9 +2577,158 @@ async def create_inspection(inspection: InspectionCreate, current_user: User = D
     inspection_dict["updated_at"] = datetime.utcnow()
     inspection_dict["status"] = "beklemede"
     
+    # Pin the current template version so later template edits don't change this inspection's form
+    template_ref = await db.equipment_templates.find_one(
+        {"equipment_type": equipment_type or "CARASKAL", "is_active": True},
+        {"_id": 0, "id": 1, "version": 1}
+    )
+    if template_ref:
+        inspection_dict["template_id"] = template_ref["id"]
+        inspection_dict["template_version"] = template_ref.get("version", 1)
+    
     await db.inspections.insert_one(inspection_dict)
     return Inspection(**inspection_dict)
 
+def equipment_inspection_info(equipment: dict, inspection_type: str, notes: str) -> dict:
+    """equipment_info of an inspection planned for a customer equipment record (same fields the planning form sends)"""
+    return {
+        "equipment_type": equipment.get("equipment_type") or equipment.get("muayene_alt_alani") or "Genel Ekipman",
+        "serial_number": equipment.get("serial_number") or "",
+        "capacity": equipment.get("capacity") or "",
+        "manufacturing_year": equipment.get("manufacturing_year") or "",
+        "inspection_type": inspection_type,
+        "notes": notes,
+        "equipment_key": equipment.get("key") or equipment_key(equipment)
+    }
+
+def inspection_identities(customer_id: str, equipment_info: dict) -> list:
+    """
+    What makes two inspections "the same": customer + type + serial number (as in
+    create_inspection) and, for inspections planned from equipment records, customer + key
+    """
+    identities = []
+    if equipment_info.get("serial_number") and equipment_info.get("equipment_type"):
+        identities.append(("serial", customer_id, equipment_info["equipment_type"], equipment_info["serial_number"]))
+    if equipment_info.get("equipment_key"):
+        identities.append(("key", customer_id, equipment_info["equipment_key"]))
+    return identities
+
+async def active_inspection_identities(customer_ids: list) -> set:
+    """Identities of all active inspections of the given customers with one aggregation"""
+    identities = set()
+    async for group in db.inspections.aggregate([
+        {"$match": {"customer_id": {"$in": customer_ids}, "status": {"$in": ACTIVE_INSPECTION_STATUSES}}},
+        {"$group": {"_id": {
+            "customer_id": "$customer_id",
+            "equipment_type": "$equipment_info.equipment_type",
+            "serial_number": "$equipment_info.serial_number",
+            "equipment_key": "$equipment_info.equipment_key"
+        }}}
+    ]):
+        identity = group["_id"]
+        identities.update(inspection_identities(identity["customer_id"], identity))
+    return identities
+
+@app.post("/api/inspections/batch", response_model=InspectionBatchResult)
+async def create_inspections_batch(batch: InspectionBatchCreate, current_user: User = Depends(require_role(UserRole.PLANLAMA_UZMANI))):
+    """
+    Plan inspections for many customer equipment records at once. Customers, active
+    inspections and templates are each read with one query and the new inspections are
+    inserted in bulk; pairs that already have an active inspection are skipped and reported.
+    """
+    customer_ids = list({item.customer_id for item in batch.items})
+    customers = {}
+    async for customer in db.customers.find({"id": {"$in": customer_ids}}, {"_id": 0, "id": 1, "equipments": 1}):
+        customers[customer["id"]] = customer
+    
+    # (item index, customer id, equipment info, inspector, planned date) in request order
+    pairs = []
+    skipped = []
+    requested = 0
+    for index, item in enumerate(batch.items):
+        customer = customers.get(item.customer_id)
+        if customer is None:
+            requested += 1
+            skipped.append({"item": index, "customer_id": item.customer_id, "reason": "customer_not_found"})
+            continue
+        equipments = {}
+        for equipment in customer.get("equipments") or []:
+            equipments.setdefault(equipment.get("key") or equipment_key(equipment), equipment)
+        keys = item.equipment_keys if item.equipment_keys is not None else list(equipments)
+        requested += len(keys)
+        for key in keys:
+            if key not in equipments:
+                skipped.append({"item": index, "customer_id": item.customer_id, "equipment_key": key, "reason": "equipment_not_found"})
+                continue
+            pairs.append((
+                index,
+                item.customer_id,
+                equipment_inspection_info(equipments[key], batch.inspection_type, batch.notes),
+                item.inspector_id or batch.inspector_id,
+                item.planned_date or batch.planned_date
+            ))
+    
+    if len(pairs) > INSPECTION_BATCH_MAX_PAIRS:
+        raise HTTPException(status_code=400, detail=f"Too many inspections in one batch ({len(pairs)} > {INSPECTION_BATCH_MAX_PAIRS})")
+    
+    active = await active_inspection_identities(customer_ids)
+    
+    # Pin the current template version of every equipment type in the batch
+    templates = {}
+    equipment_types = list({equipment_info["equipment_type"] for _, _, equipment_info, _, _ in pairs})
+    async for template in db.equipment_templates.find(
+        {"equipment_type": {"$in": equipment_types}, "is_active": True},
+        {"_id": 0, "id": 1, "version": 1, "equipment_type": 1}
+    ):
+        templates.setdefault(template["equipment_type"], template)
+    
+    documents = []
+    items = []
+    now = datetime.utcnow()
+    for index, customer_id, equipment_info, inspector_id, planned_date in pairs:
+        identities = inspection_identities(customer_id, equipment_info)
+        if any(identity in active for identity in identities):
+            skipped.append({"item": index, "customer_id": customer_id, "equipment_key": equipment_info["equipment_key"], "reason": "active_inspection_exists"})
+            continue
+        active.update(identities)  # the same pair twice in one batch is planned once
+        
+        template_ref = templates.get(equipment_info["equipment_type"])
+        items.append(index)
+        documents.append(Inspection(
+                customer_id=customer_id,
+                equipment_info=equipment_info,
+                inspector_id=inspector_id,
+                planned_date=planned_date,
+                created_by=current_user.id,
+                created_at=now,
+                updated_at=now,
+                template_id=template_ref["id"] if template_ref else None,
+                template_version=template_ref.get("version", 1) if template_ref else None
+        ).dict())
+    
+    created = []
+    for start in range(0, len(documents), INSPECTION_BATCH_WRITE_CHUNK):
+        chunk = documents[start:start + INSPECTION_BATCH_WRITE_CHUNK]
+        failures = {}
+        try:
+            await db.inspections.insert_many(chunk, ordered=False)
+        except BulkWriteError as e:
+            failures = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        for position, document in enumerate(chunk):
+            document.pop("_id", None)
+            if position in failures:
+                skipped.append({"item": items[start + position], "customer_id": document["customer_id"], "reason": "write_failed", "error": failures[position]})
+            else:
+                created.append(Inspection(**document))
+    
+    skipped.sort(key=lambda entry: entry["item"])
+    return InspectionBatchResult(
+        requested=requested,
+        created=len(created),
+        skipped=skipped,
+        inspections=created
+    )
+
 @app.get("/api/inspections", response_model=List[Inspection])
 async def get_inspections(current_user: User = Depends(get_current_user)):
     query = {}
@@ -1170,11 +2783,437 @@ async def approve_inspection(
     else:
         raise HTTPException(status_code=400, detail="Invalid action. Use 'approve' or 'reject'")
     
-    await db.inspections.update_one({"id": inspection_id}, {"$set": update_data})
+    await db.inspections.update_one({"id": inspection_id}, {"$set": update_data, "$inc": {"version": 1}})
     
     updated_inspection = await db.inspections.find_one({"id": inspection_id})
     return Inspection(**updated_inspection)
 
+# ===================== INSPECTION REPORTS (PDF) =====================
+
+# Bump whenever the report layout changes
+REPORT_RENDERER_VERSION = "1"
+# Rendered PDFs stay in memory up to this size, larger ones spill to a temporary file
+REPORT_SPOOL_MEMORY_BYTES = 4 * 1024 * 1024
+REPORT_STREAM_BLOCK_BYTES = 64 * 1024
+
+# A Unicode TTF is needed for ş, ğ, ı and İ; the built-in Helvetica only covers Latin-1
+REPORT_FONT_PATH = os.getenv("REPORT_FONT_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+REPORT_BOLD_FONT_PATH = os.getenv("REPORT_BOLD_FONT_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+_report_fonts: Optional[tuple] = None
+
+def report_fonts() -> tuple:
+    """(regular, bold) font names, registered once"""
+    global _report_fonts
+    if _report_fonts is None:
+        try:
+            pdfmetrics.registerFont(TTFont("ReportSans", REPORT_FONT_PATH))
+            pdfmetrics.registerFont(TTFont("ReportSans-Bold", REPORT_BOLD_FONT_PATH))
+            _report_fonts = ("ReportSans", "ReportSans-Bold")
+        except Exception as e:
+            logging.warning(f"Report font not available ({e}); Turkish characters may not render")
+            _report_fonts = ("Helvetica", "Helvetica-Bold")
+    return _report_fonts
+
+def report_results(report_data: dict) -> dict:
+    """item id -> (value, comment) from either saved form shape (form_results list or form_data map)"""
+    results = {}
+    for result in report_data.get("form_results") or []:
+        results[int(result["item_id"])] = (result.get("value"), result.get("comment"))
+    for item_id, result in (report_data.get("form_data") or {}).items():
+        if isinstance(result, dict) and str(item_id).isdigit():
+            results.setdefault(int(item_id), (result.get("value"), result.get("comment")))
+    # Saves normalize values; reports saved before that may still hold aliases
+    return {
+        item_id: (normalize_dropdown_value(value), comment)
+        for item_id, (value, comment) in results.items()
+    }
+
+def report_control_sections(template: dict) -> list:
+    """[(category title, items)] of a template; flat control_items become one untitled section"""
+    sections = [
+        (f"{category.get('code', '')} - {category.get('name', '')}".strip(" -"), category.get("items", []))
+        for category in template.get("categories") or []
+    ]
+    if not sections and template.get("control_items"):
+        sections = [("", template["control_items"])]
+    return sections
+
+def format_report_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y")
+    return str(value)
+
+def build_report_context(inspection: dict, customer: dict, template: dict, users: dict) -> dict:
+    """Everything the report shows, as plain text, so rendering needs no database access"""
+    report_data = inspection.get("report_data") or {}
+    equipment_info = {**(inspection.get("equipment_info") or {}), **(report_data.get("equipment_info") or {})}
+    results = report_results(report_data)
+    
+    rows = []
+    totals = Counter()
+    for title, items in report_control_sections(template):
+        rows.append({"section": title})
+        for item in items:
+            value, comment = results.get(item.get("id"), (None, None))
+            if value:
+                totals[value] += 1
+            rows.append({"id": item.get("id"), "text": item.get("text", ""), "value": value, "comment": comment or ""})
+    
+    general_info = [
+        ("Müşteri", customer.get("company_name")),
+        ("Adres", customer.get("address")),
+        ("Yetkili", customer.get("contact_person")),
+        ("Planlanan Tarih", format_report_value(inspection.get("planned_date"))),
+        ("Onay Tarihi", format_report_value(inspection.get("approved_at"))),
+    ] + [(key.replace("_", " ").title(), format_report_value(value)) for key, value in (report_data.get("general_info") or {}).items()]
+    
+    inspector = users.get(inspection.get("inspector_id")) or {}
+    approver = users.get(inspection.get("approved_by")) or {}
+    return {
+        "title": f"{template.get('equipment_type') or equipment_info.get('equipment_type', '')} MUAYENE RAPORU".strip(),
+        "report_no": inspection["id"][:8].upper(),
+        "general_info": [(label, format_report_value(value)) for label, value in general_info if value],
+        "equipment_info": [
+            (key.replace("_", " ").title(), format_report_value(value))
+            for key, value in equipment_info.items() if value not in (None, "") and key != "equipment_key"
+        ],
+        "measurement_tools": report_data.get("measurement_tools") or [],
+        "control_rows": rows,
+        "totals": {option: totals.get(option, 0) for option in DROPDOWN_OPTIONS},
+        "defects": report_data.get("defects") or "",
+        "notes": report_data.get("notes") or inspection.get("approval_notes") or "",
+        "conclusion": report_data.get("conclusion") or "",
+        "inspector": inspector.get("full_name", ""),
+        "approver": approver.get("full_name", ""),
+        "approved_at": format_report_value(inspection.get("approved_at"))
+    }
+
+class ReportCanvas:
+    """Top-down writer over a reportlab canvas; starts a new page whenever the next block does not fit"""
+
+    def __init__(self, output, title: str, report_no: str):
+        self.fonts = report_fonts()
+        self.canvas = pdf_canvas.Canvas(output, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle(title)
+        self.width, self.height = A4
+        self.margin = 15 * mm
+        self.title = title
+        self.report_no = report_no
+        self.page = 0
+        self.on_new_page = None  # e.g. repeat a table header
+        self.new_page()
+
+    def new_page(self):
+        if self.page:
+            self._footer()
+            self.canvas.showPage()
+        self.page += 1
+        self.y = self.height - self.margin
+        self.canvas.setFont(self.fonts[1], 12)
+        self.canvas.drawString(self.margin, self.y - 12, self.title)
+        self.canvas.setFont(self.fonts[0], 8)
+        self.canvas.drawRightString(self.width - self.margin, self.y - 12, f"Rapor No: {self.report_no}")
+        self.y -= 20
+        self.canvas.line(self.margin, self.y, self.width - self.margin, self.y)
+        self.y -= 8
+        if self.on_new_page:
+            self.on_new_page()
+
+    def _footer(self):
+        self.canvas.setFont(self.fonts[0], 7)
+        self.canvas.drawRightString(self.width - self.margin, self.margin / 2, f"Sayfa {self.page}")
+
+    def ensure(self, height: float):
+        if self.y - height < self.margin:
+            self.new_page()
+
+    def heading(self, text: str):
+        self.ensure(30)
+        self.y -= 6
+        self.canvas.setFont(self.fonts[1], 10)
+        self.canvas.drawString(self.margin, self.y - 10, text)
+        self.y -= 16
+
+    def paragraph(self, text: str, size: float = 8.5):
+        width = self.width - 2 * self.margin
+        for line in simpleSplit(text or "-", self.fonts[0], size, width):
+            self.ensure(size + 3)
+            self.canvas.setFont(self.fonts[0], size)
+            self.canvas.drawString(self.margin, self.y - size, line)
+            self.y -= size + 3
+
+    def row(self, cells: list, widths: list, bold: bool = False, size: float = 8, shade: bool = False):
+        """One table row; cells wrap inside their column and the row grows to the tallest cell"""
+        font = self.fonts[1] if bold else self.fonts[0]
+        leading = size + 2
+        lines = [simpleSplit(str(cell), font, size, width - 4) or [""] for cell, width in zip(cells, widths)]
+        height = max(len(cell_lines) for cell_lines in lines) * leading + 4
+        self.ensure(height)
+        if shade:
+            self.canvas.setFillGray(0.9)
+            self.canvas.rect(self.margin, self.y - height, sum(widths), height, stroke=0, fill=1)
+            self.canvas.setFillGray(0)
+        self.canvas.setFont(font, size)
+        x = self.margin
+        for cell_lines, width in zip(lines, widths):
+            self.canvas.rect(x, self.y - height, width, height, stroke=1, fill=0)
+            for index, line in enumerate(cell_lines):
+                self.canvas.drawString(x + 2, self.y - 2 - (index + 1) * leading + 2, line)
+            x += width
+        self.y -= height
+
+    def key_values(self, pairs: list):
+        widths = [55 * mm, self.width - 2 * self.margin - 55 * mm]
+        for label, value in pairs:
+            self.row([label, value], widths)
+
+    def finish(self):
+        self._footer()
+        self.canvas.save()
+
+def render_inspection_report(output, context: dict):
+    """Write the inspection report PDF to a binary file object, page by page"""
+    report = ReportCanvas(output, context["title"], context["report_no"])
+    usable = report.width - 2 * report.margin
+    
+    report.heading("1. GENEL BİLGİLER")
+    report.key_values(context["general_info"])
+    
+    report.heading("2. EKİPMAN BİLGİLERİ")
+    report.key_values(context["equipment_info"] or [("Ekipman", "-")])
+    
+    if context["measurement_tools"]:
+        report.heading("3. ÖLÇÜM ALETLERİ")
+        for tool in context["measurement_tools"]:
+            report.paragraph(", ".join(f"{key}: {value}" for key, value in tool.items() if value))
+    
+    report.heading("4. KONTROL LİSTESİ")
+    widths = [10 * mm, usable - 10 * mm - 3 * 11 * mm - 45 * mm, 11 * mm, 11 * mm, 11 * mm, 45 * mm]
+    header = ["No", "Kontrol Maddesi", "U", "UD", "U.Y", "Açıklama"]
+    report.row(header, widths, bold=True, shade=True)
+    report.on_new_page = lambda: report.row(header, widths, bold=True, shade=True)
+    for row in context["control_rows"]:
+        if "section" in row:
+            if row["section"]:
+                report.row([row["section"]], [usable], bold=True, size=8)
+            continue
+        marks = ["X" if row["value"] == option else "" for option in DROPDOWN_OPTIONS]
+        report.row([row["id"], row["text"], *marks, row["comment"]], widths)
+    report.on_new_page = None
+    totals = context["totals"]
+    report.paragraph(f"Uygun (U): {totals['U']}   Uygun Değil (UD): {totals['UD']}   Uygulanamaz (U.Y): {totals['U.Y']}")
+    
+    report.heading("5. KUSUR AÇIKLAMALARI")
+    report.paragraph(context["defects"])
+    if context["notes"]:
+        report.heading("6. NOTLAR")
+        report.paragraph(context["notes"])
+    
+    report.heading("7. SONUÇ")
+    report.paragraph(context["conclusion"], size=10)
+    
+    report.heading("8. İMZALAR")
+    report.ensure(30 * mm)
+    half = usable / 2
+    report.row(["Muayene Eden (Denetçi)", "Onaylayan (Teknik Yönetici)"], [half, half], bold=True, shade=True)
+    report.row([context["inspector"], f"{context['approver']}  {context['approved_at']}".strip()], [half, half])
+    report.row(["İmza:\n\n\n", "İmza:\n\n\n"], [half, half])
+    report.finish()
+
+def iter_report_blocks(report):
+    """Stream a rendered report file object in blocks and close it afterwards"""
+    try:
+        report.seek(0)
+        while block := report.read(REPORT_STREAM_BLOCK_BYTES):
+            yield block
+    finally:
+        report.close()
+
+async def load_report_inspection(inspection_id: str, current_user: User, draft: bool = False) -> dict:
+    """The inspection behind a report; drafts may be rendered before approval"""
+    query = {"id": inspection_id}
+    if current_user.role == UserRole.DENETCI:
+        query["inspector_id"] = current_user.id
+    
+    inspection = await db.inspections.find_one(query, {"_id": 0})
+    if not inspection:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    if inspection["status"] != "onaylandi" and not draft:
+        raise HTTPException(status_code=409, detail="Report is only available for approved inspections")
+    return inspection
+
+async def load_report_context(inspection: dict) -> dict:
+    customer = await db.customers.find_one({"id": inspection["customer_id"]}, {"_id": 0}) or {}
+    template = await get_inspection_template(inspection)
+    if not template:
+        raise HTTPException(status_code=404, detail="Equipment template not found")
+    user_ids = [user_id for user_id in (inspection.get("inspector_id"), inspection.get("approved_by")) if user_id]
+    users = {
+        user["id"]: user
+        async for user in db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "full_name": 1})
+    }
+    context = build_report_context(inspection, customer, template, users)
+    if inspection["status"] != "onaylandi":
+        context["title"] = f"{context['title']} (TASLAK)"
+    return context
+
+# ===================== REPORT CACHE =====================
+
+# Rendered reports are stored in the report_files GridFS bucket, one report_artifacts
+# document each. The key changes with every inspection write and with any change to what
+# the report shows from the customer, the template or the signing users, so an edited
+# report never matches its old artifact; approved artifacts stay until superseded, drafts
+# are evicted least recently used first past REPORT_DRAFT_CACHE_MAX_BYTES.
+REPORT_DRAFT_CACHE_MAX_BYTES = int(os.getenv("REPORT_DRAFT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+def report_files_bucket() -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name="report_files")
+
+def report_cache_key(inspection: dict, context: dict, report_format: str) -> str:
+    updated_at = inspection.get("updated_at")
+    stamp = updated_at.isoformat() if isinstance(updated_at, datetime) else str(updated_at or "")
+    # The rendered text itself, so customer and user edits reach the key too
+    content = hashlib.sha1(json.dumps(context, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    return f"{inspection['id']}:{inspection.get('version', 0)}:{stamp}:{content}:{REPORT_RENDERER_VERSION}:{report_format}"
+
+async def ensure_report_cache_indexes():
+    await db.report_artifacts.create_index("cache_key", unique=True)
+    await db.report_artifacts.create_index([("inspection_id", 1), ("format", 1)])
+    await db.report_artifacts.create_index([("draft", 1), ("last_accessed_at", 1)])
+
+async def delete_report_artifact(artifact: dict):
+    try:
+        await report_files_bucket().delete(artifact["file_id"])
+    except NoFile:
+        pass
+    await db.report_artifacts.delete_one({"cache_key": artifact["cache_key"]})
+
+async def open_cached_report(cache_key: str) -> Optional[tuple]:
+    """(artifact, GridFS download stream) of a stored report, or None"""
+    artifact = await db.report_artifacts.find_one_and_update(
+        {"cache_key": cache_key},
+        {"$set": {"last_accessed_at": datetime.utcnow()}},
+        {"_id": 0}
+    )
+    if not artifact:
+        return None
+    try:
+        return artifact, await report_files_bucket().open_download_stream(artifact["file_id"])
+    except NoFile:
+        # The file was evicted between the lookup and the read
+        await db.report_artifacts.delete_one({"cache_key": cache_key})
+        return None
+
+async def iter_cached_report(download):
+    while block := await download.readchunk():
+        yield block
+
+async def store_report_artifact(inspection: dict, report_format: str, cache_key: str, filename: str, report) -> None:
+    """Store a rendered report file object and drop the artifacts it supersedes"""
+    now = datetime.utcnow()
+    artifact = {
+        "cache_key": cache_key,
+        "inspection_id": inspection["id"],
+        "format": report_format,
+        "draft": inspection["status"] != "onaylandi",
+        "file_id": str(uuid.uuid4()),
+        "filename": filename,
+        "size": report.tell(),
+        "created_at": now,
+        "last_accessed_at": now
+    }
+    
+    upload = report_files_bucket().open_upload_stream_with_id(artifact["file_id"], filename)
+    report.seek(0)
+    while block := report.read(REPORT_STREAM_BLOCK_BYTES):
+        await upload.write(block)
+    await upload.close()
+    try:
+        await db.report_artifacts.insert_one(dict(artifact))
+    except DuplicateKeyError:
+        # A concurrent download stored the same render first
+        await report_files_bucket().delete(artifact["file_id"])
+        return
+    
+    stale = db.report_artifacts.find(
+        {"inspection_id": inspection["id"], "format": report_format, "cache_key": {"$ne": cache_key}},
+        {"_id": 0, "cache_key": 1, "file_id": 1}
+    )
+    async for old in stale:
+        await delete_report_artifact(old)
+    if artifact["draft"]:
+        await evict_draft_reports()
+
+async def evict_draft_reports(max_bytes: Optional[int] = None):
+    """Delete least recently downloaded drafts until the drafts fit in max_bytes"""
+    max_bytes = REPORT_DRAFT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    totals = await db.report_artifacts.aggregate([
+        {"$match": {"draft": True}},
+        {"$group": {"_id": None, "size": {"$sum": "$size"}}}
+    ]).to_list(1)
+    excess = (totals[0]["size"] if totals else 0) - max_bytes
+    if excess <= 0:
+        return
+    
+    oldest = db.report_artifacts.find(
+        {"draft": True}, {"_id": 0, "cache_key": 1, "file_id": 1, "size": 1}
+    ).sort("last_accessed_at", 1)
+    async for artifact in oldest:
+        await delete_report_artifact(artifact)
+        excess -= artifact["size"]
+        if excess <= 0:
+            break
+
+@app.get("/api/inspections/{inspection_id}/report.pdf")
+async def download_inspection_report(
+    inspection_id: str,
+    draft: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Onaylanmış denetimin PDF raporu; draft=true ile onay öncesi taslak"""
+    inspection = await load_report_inspection(inspection_id, current_user, draft)
+    context = await load_report_context(inspection)
+    cache_key = report_cache_key(inspection, context, "pdf")
+    
+    cached = await open_cached_report(cache_key)
+    if cached:
+        artifact, download = cached
+        return StreamingResponse(
+            iter_cached_report(download),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f'attachment; filename="{artifact["filename"]}"',
+                "Content-Length": str(artifact["size"])
+            }
+        )
+    
+    suffix = "" if inspection["status"] == "onaylandi" else "_taslak"
+    filename = f"rapor_{context['report_no']}{suffix}.pdf"
+    report = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MEMORY_BYTES)
+    try:
+        await asyncio.to_thread(render_inspection_report, report, context)
+    except Exception:
+        report.close()
+        raise
+    size = report.tell()
+    
+    # The cache is best-effort: a failed store still serves the rendered report
+    try:
+        await store_report_artifact(inspection, "pdf", cache_key, filename, report)
+    except Exception:
+        logging.exception(f"Report {inspection_id}: rendered report not cached")
+    
+    return StreamingResponse(
+        iter_report_blocks(report),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(size)
+        }
+    )
+
 # ===================== DASHBOARD STATS =====================
 
 # ===================== INSPECTION UPDATE (DENETÇİ) =====================
@@ -1199,7 +3238,7 @@ async def update_inspection(
     if inspection_update.report_data:
         update_data["report_data"] = inspection_update.report_data
     
-    await db.inspections.update_one({"id": inspection_id}, {"$set": update_data})
+    await db.inspections.update_one({"id": inspection_id}, {"$set": update_data, "$inc": {"version": 1}})
     
     updated_inspection = await db.inspections.find_one({"id": inspection_id})
     return Inspection(**updated_inspection)
@@ -1253,313 +3292,585 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     
     return stats
 
-# ===================== STARTUP EVENT =====================
+# ===================== STARTUP EVENT =====================
+
+@app.on_event("startup")
+async def startup_event():
+    # Create default admin user if doesn't exist
+    admin_exists = await db.users.find_one({"username": "admin"})
+    if not admin_exists:
+        admin_user = {
+            "id": str(uuid.uuid4()),
+            "username": "admin",
+            "email": "admin@royalcert.com",
+            "full_name": "System Administrator",
+            "role": UserRole.ADMIN,
+            "password": get_password_hash("admin123"),
+            "is_active": True,
+            "created_at": datetime.utcnow()
+        }
+        await db.users.insert_one(admin_user)
+        print("✅ Default admin user created: admin/admin123")
+    
+    # Initialize Caraskal template if doesn't exist
+    caraskal_exists = await db.equipment_templates.find_one({"equipment_type": "CARASKAL"})
+    if not caraskal_exists:
+        admin_user = await db.users.find_one({"role": UserRole.ADMIN})
+        if admin_user:
+            caraskal_data = get_caraskal_template()
+            template_dict = caraskal_data.copy()
+            template_dict["id"] = str(uuid.uuid4())
+            template_dict["version"] = 1
+            template_dict["created_by"] = admin_user["id"]
+            template_dict["is_active"] = True
+            template_dict["created_at"] = datetime.utcnow()
+            template_dict["updated_at"] = datetime.utcnow()
+            
+            await db.equipment_templates.insert_one(template_dict)
+            print("✅ Caraskal template initialized automatically")
+    
+    await db.equipment_template_versions.create_index([("template_id", 1), ("version", 1)], unique=True)
+    await purge_stale_template_parse_cache()
+    await ensure_company_name_keys()
+    await ensure_customer_equipment_arrays()
+    await ensure_import_ledger_indexes()
+    await ensure_report_cache_indexes()
+    await resume_import_jobs()
+
+# ===================== KEYWORD REGISTRY =====================
+
+# Equipment type -> filename/heading keywords (upper case). Earlier types win when keywords
+# of several types occur, so keep more specific types first.
+EQUIPMENT_TYPE_KEYWORDS = {
+    "FORKLIFT": ["FORKLIFT", "FORK", "LİFT"],
+    "CARASKAL": ["CARASKAL", "CARAS", "ASKAL"],
+    "ISKELE": ["ISKELE", "İSKELE", "SCAFF"],
+    "VINC": ["VINC", "VİNÇ", "CRANE", "KRİK"],
+    "ASANSÖR": ["ASANSÖR", "ASANSOR", "ELEVATOR", "ELEVATÖR", "LIFT"],
+    "YANGIN_SÖNDÜRME": ["YANGIN", "SÖNDÜRME", "FIRE", "SPRINKLER", "SULU"],
+    "KAZAN": ["KAZAN", "BOILER", "BUHAR"],
+    "TANK": ["TANK", "DEPO", "REZERVUAR"],
+    "BASINCLI_KABI": ["BASINCLI", "KABI", "PRESSURE", "VESSEL"]
+}
+
+TEMPLATE_TYPE_KEYWORDS = {
+    "REPORT": ["RAPOR", "REPORT"]
+}
+
+# Header/label words that disqualify a numbered line as a control item
+CONTROL_ITEM_SKIP_WORDS = [
+    'GENEL', 'BİLGİLER', 'MUAYENE', 'KONTROL', 'ETİKET', 'TEST', 'FORM', 'RAPOR',
+    'BAŞLIK', 'TABLE', 'DEĞER', 'DURUM', 'TARİH', 'NO', 'ADI', 'KODU', 'MARKASI',
+    'TİPİ', 'SERİ', 'İMAL', 'YIL', 'KAPASITE', 'YÜKSEKLIK', 'MESAFE', 'ÖLÇÜM',
+    'DEĞERLENDİRME', 'AÇIKLAMA', 'NOT'
+]
+
+# Same idea for table cells in the table fallback of extract_control_items
+CONTROL_TABLE_SKIP_WORDS = [
+    'GENEL', 'BİLGİLER', 'MUAYENE', 'TEST', 'ETİKET', 'KONTROL', 'FORM', 'RAPOR', 'TABLE',
+    'BAŞLIK', 'NO', 'ADI', 'KODU', 'DURUM', 'TARİH'
+]
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over (keyword, label) pairs: a single left-to-right pass over a
+    text reports every keyword occurrence, however many keywords are registered.
+    """
+    __slots__ = ("goto", "fail", "output")
+
+    def __init__(self, pairs):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for keyword, label in pairs:
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] += ((keyword, label),)
+
+        # Breadth-first failure links; each state also reports the keywords of its fallback
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] += self.output[self.fail[next_state]]
+                queue.append(next_state)
+
+    def iter_matches(self, text: str):
+        """Yield (end index, keyword, label) for every occurrence in text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, label in output[state]:
+                yield index, keyword, label
+
+class KeywordClassifier:
+    """A label -> keywords registry compiled into one automaton; texts are upper-cased first"""
+
+    def __init__(self, registry: Dict[str, List[str]]):
+        self.rank = {label: rank for rank, label in enumerate(registry)}
+        self.automaton = KeywordAutomaton(
+            (keyword, label) for label, keywords in registry.items() for keyword in keywords
+        )
+
+    def labels(self, text: str) -> set:
+        return {label for _, _, label in self.automaton.iter_matches(text.upper())}
+
+    def classify(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Highest-ranked label with a keyword in text"""
+        labels = self.labels(text)
+        return min(labels, key=self.rank.__getitem__) if labels else default
+
+    def matches_any(self, text: str) -> bool:
+        for _ in self.automaton.iter_matches(text.upper()):
+            return True
+        return False
+
+equipment_type_classifier = KeywordClassifier(EQUIPMENT_TYPE_KEYWORDS)
+template_type_classifier = KeywordClassifier(TEMPLATE_TYPE_KEYWORDS)
+control_item_skip_words = KeywordClassifier({"skip": CONTROL_ITEM_SKIP_WORDS})
+control_table_skip_words = KeywordClassifier({"skip": CONTROL_TABLE_SKIP_WORDS})
+
+def detect_equipment_type(text: str) -> str:
+    return equipment_type_classifier.classify(text, "UNKNOWN")
+
+def detect_template_type(text: str) -> str:
+    return template_type_classifier.classify(text, "FORM")
+
+# ===================== TEMPLATE UPLOAD & WORD PARSING =====================
+
+# Single-pass tokenizer: numbered control item (zero-width, only at the start of the text so
+# placeholders on the same line are still found) plus every placeholder syntax
+TEMPLATE_TOKEN_PATTERN = re.compile(
+    r'\A(?=(?P<item_num>\d+)[.\)]?\s*(?P<item_text>.+))'  # 1. Kontrol maddesi
+    r'|\{\{(?P<curly>[^}]+)\}\}'                           # {{field_name}}
+    r'|(?P<underscore>__{3,})'                              # ______ (underscores)
+    r'|\[(?P<square>[^\]]+)\]'                              # [field_name]
+    r'|\$\{(?P<dollar>[^}]+)\}'                              # ${field_name}
+)
+
+# Field name keyword -> field type; earlier entries win when several keywords occur
+FIELD_TYPE_KEYWORDS = {
+    "tarih": "date", "date": "date",
+    "email": "email", "eposta": "email",
+    "telefon": "tel", "phone": "tel",
+    "sayi": "number", "number": "number", "adet": "number",
+}
+_FIELD_TYPE_RANK = {keyword: rank for rank, keyword in enumerate(FIELD_TYPE_KEYWORDS)}
+_FIELD_TYPE_PATTERN = re.compile("|".join(re.escape(keyword) for keyword in FIELD_TYPE_KEYWORDS))
+
+CONTROL_ITEM_CATEGORIES = "ABCDEF"  # 1-10 A, 11-20 B ... 51-60 F, above G
+
+def classify_field_type(field_name: str) -> str:
+    keywords = _FIELD_TYPE_PATTERN.findall(field_name.lower())
+    if not keywords:
+        return "text"
+    return FIELD_TYPE_KEYWORDS[min(keywords, key=_FIELD_TYPE_RANK.__getitem__)]
+
+def control_item_category(item_num: int) -> str:
+    index = max(0, (item_num - 1) // 10)
+    return CONTROL_ITEM_CATEGORIES[index] if index < len(CONTROL_ITEM_CATEGORIES) else 'G'
+
+def tokenize_template_text(text: str) -> tuple:
+    """Return (placeholder count, (item number, item text) or None) for one paragraph/cell"""
+    placeholders = 0
+    numbered = None
+    for match in TEMPLATE_TOKEN_PATTERN.finditer(text):
+        if match.lastgroup == "item_text":
+            numbered = (int(match.group("item_num")), match.group("item_text").strip())
+        else:
+            placeholders += 1
+    return placeholders, numbered
+
+def scan_template_texts(paragraph_texts: List[str], cell_texts: List[str]) -> tuple:
+    """Collect placeholder fields and numbered control items from document texts"""
+    template_fields = {}
+    control_items = []
+    field_counter = 1
+    
+    for raw_text in paragraph_texts:
+        text = raw_text.strip()
+        if not text:
+            continue
+        
+        placeholders, numbered = tokenize_template_text(text)
+        for _ in range(placeholders):
+            field_name = f"field_{field_counter}"
+            field_counter += 1
+            template_fields[field_name] = {
+                "label": field_name.replace("_", " ").title(),
+                "type": classify_field_type(field_name),
+                "required": True,
+                "original_text": text
+            }
+        
+        if numbered:
+            item_num, item_text = numbered
+            if len(item_text) > 10 and item_num <= 100:  # Reasonable control item
+                control_items.append({
+                    "id": item_num,
+                    "text": item_text,
+                    "category": control_item_category(item_num),
+                    "input_type": "dropdown",
+                    "has_comment": True,
+                    "has_photo": True,
+                    "required": True
+                })
+    
+    for raw_text in cell_texts:
+        cell_text = raw_text.strip()
+        if not cell_text:
+            continue
+        
+        placeholders, _ = tokenize_template_text(cell_text)
+        for _ in range(placeholders):
+            field_name = f"table_field_{field_counter}"
+            field_counter += 1
+            template_fields[field_name] = {
+                "label": field_name.replace("_", " ").title(),
+                "type": "text",
+                "required": True,
+                "original_text": cell_text,
+                "location": "table"
+            }
+    
+    return template_fields, control_items
+
+# ===================== STREAMING DOCX READER =====================
+
+# "docx" builds python-docx's object model; "stream" reads word/document.xml incrementally
+TEMPLATE_PARSE_ENGINES = ("docx", "stream")
+DEFAULT_TEMPLATE_PARSE_ENGINE = os.getenv("TEMPLATE_PARSE_ENGINE", "docx")
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_BODY, W_P, W_R, W_T, W_TAB, W_BR, W_CR = (W_NS + tag for tag in ("body", "p", "r", "t", "tab", "br", "cr"))
+W_TBL, W_TBL_GRID, W_GRID_COL, W_TR, W_TC = (W_NS + tag for tag in ("tbl", "tblGrid", "gridCol", "tr", "tc"))
+W_TC_PR, W_GRID_SPAN, W_VMERGE, W_VAL = (W_NS + tag for tag in ("tcPr", "gridSpan", "vMerge", "val"))
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+def _docx_main_part(archive: zipfile.ZipFile) -> str:
+    """Resolve the main document part from the package relationships (normally word/document.xml)"""
+    try:
+        rels = etree.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels:
+        if rel.get("Type") == OFFICE_DOCUMENT_REL:
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
+def _docx_paragraph_text(p) -> str:
+    # Same rules as python-docx: direct w:r children only, w:tab -> \t, w:br/w:cr -> \n
+    parts = []
+    for r in p.iterchildren(W_R):
+        for child in r:
+            tag = child.tag
+            if tag == W_T:
+                parts.append(child.text or "")
+            elif tag == W_TAB:
+                parts.append("\t")
+            elif tag == W_BR or tag == W_CR:
+                parts.append("\n")
+    return "".join(parts)
 
-@app.on_event("startup")
-async def startup_event():
-    # Create default admin user if doesn't exist
-    admin_exists = await db.users.find_one({"username": "admin"})
-    if not admin_exists:
-        admin_user = {
-            "id": str(uuid.uuid4()),
-            "username": "admin",
-            "email": "admin@royalcert.com",
-            "full_name": "System Administrator",
-            "role": UserRole.ADMIN,
-            "password": get_password_hash("admin123"),
-            "is_active": True,
-            "created_at": datetime.utcnow()
-        }
-        await db.users.insert_one(admin_user)
-        print("✅ Default admin user created: admin/admin123")
-    
-    # Initialize Caraskal template if doesn't exist
-    caraskal_exists = await db.equipment_templates.find_one({"equipment_type": "CARASKAL"})
-    if not caraskal_exists:
-        admin_user = await db.users.find_one({"role": UserRole.ADMIN})
-        if admin_user:
-            caraskal_data = get_caraskal_template()
-            template_dict = caraskal_data.copy()
-            template_dict["id"] = str(uuid.uuid4())
-            template_dict["created_by"] = admin_user["id"]
-            template_dict["is_active"] = True
-            template_dict["created_at"] = datetime.utcnow()
-            template_dict["updated_at"] = datetime.utcnow()
-            
-            await db.equipment_templates.insert_one(template_dict)
-            print("✅ Caraskal template initialized automatically")
+def _docx_table_grid(tbl) -> tuple:
+    """Lay a w:tbl out on its grid exactly like python-docx's Table._cells: (w:tc per grid slot, column count)"""
+    grid = tbl.find(W_TBL_GRID)
+    col_count = len(grid.findall(W_GRID_COL)) if grid is not None else 0
+    trs = tbl.findall(W_TR)
+    slots = []
+    for tr in trs:
+        for tc in tr.iterchildren(W_TC):
+            grid_span, vmerge = 1, None
+            tc_pr = tc.find(W_TC_PR)
+            if tc_pr is not None:
+                span = tc_pr.find(W_GRID_SPAN)
+                if span is not None:
+                    grid_span = int(span.get(W_VAL))
+                merge = tc_pr.find(W_VMERGE)
+                if merge is not None:
+                    vmerge = merge.get(W_VAL, "continue")
+            for span_index in range(grid_span):
+                if vmerge == "continue":
+                    slots.append(slots[-col_count])
+                elif span_index > 0:
+                    slots.append(slots[-1])
+                else:
+                    slots.append(tc)
+    return slots[:len(trs) * col_count], col_count
 
-# ===================== TEMPLATE UPLOAD & WORD PARSING =====================
+def _docx_table_cells(tbl) -> List[dict]:
+    """
+    Visit each physical w:tc once, keyed by element identity. python-docx hands back the same
+    merged cell for every grid slot it covers; here it is read once and keeps its top-left
+    position and row/column span instead.
+    """
+    slots, col_count = _docx_table_grid(tbl)
+    cells = {}
+    for index, tc in enumerate(slots):
+        row, col = divmod(index, col_count)
+        cell = cells.get(tc)
+        if cell is None:
+            cells[tc] = {
+                "text": "\n".join(_docx_paragraph_text(p) for p in tc.iterchildren(W_P)),
+                "row": row,
+                "col": col,
+                "row_span": 1,
+                "col_span": 1
+            }
+        else:
+            cell["row_span"] = max(cell["row_span"], row - cell["row"] + 1)
+            cell["col_span"] = max(cell["col_span"], col - cell["col"] + 1)
+    return list(cells.values())
+
+def iter_docx_blocks(file_content: bytes):
+    """
+    Stream body-level blocks of a .docx in document order without building the object model.
+    Yields ("paragraph", text) and ("table", cells); each block is released once yielded so
+    memory stays bounded by the largest single table.
+    """
+    with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+        with archive.open(_docx_main_part(archive)) as document_xml:
+            for _, elem in etree.iterparse(document_xml, events=("end",), tag=(W_P, W_TBL)):
+                parent = elem.getparent()
+                if parent is None or parent.tag != W_BODY:
+                    continue  # paragraphs inside tables are read with their table
+                if elem.tag == W_P:
+                    yield "paragraph", _docx_paragraph_text(elem)
+                else:
+                    yield "table", _docx_table_cells(elem)
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+def read_docx_content(file_content: bytes, engine: str = "docx") -> tuple:
+    """Return (body paragraph texts, tables as lists of unique cells) for the selected engine"""
+    if engine == "stream":
+        paragraphs, tables = [], []
+        for kind, value in iter_docx_blocks(file_content):
+            (paragraphs if kind == "paragraph" else tables).append(value)
+        return paragraphs, tables
+    
+    doc = Document(io.BytesIO(file_content))
+    paragraphs = [paragraph.text for paragraph in doc.paragraphs]
+    tables = [_docx_table_cells(table._tbl) for table in doc.tables]
+    return paragraphs, tables
+
+# ===================== PDF TEMPLATE READER =====================
+
+# PDF uploads always use this engine, whatever engine was requested for Word documents
+PDF_PARSE_ENGINE = "pdf"
+# Pages per worker task; long reports are split into page ranges parsed in parallel
+PDF_PAGES_PER_CHUNK = int(os.getenv("PDF_PAGES_PER_CHUNK", "4"))
+
+def template_parse_engine_for(filename: str, engine: str) -> str:
+    return PDF_PARSE_ENGINE if filename.lower().endswith('.pdf') else engine
+
+def count_pdf_pages(file_content: bytes) -> int:
+    # PyPDF2 only walks the page tree here, no content streams are decoded
+    return len(PyPDF2.PdfReader(io.BytesIO(file_content)).pages)
+
+def _outside_bboxes(bboxes: List[tuple]):
+    def keep(obj):
+        return not any(
+            x0 <= obj["x0"] and obj["x1"] <= x1 and top <= obj["top"] and obj["bottom"] <= bottom
+            for x0, top, x1, bottom in bboxes
+        )
+    return keep
+
+def read_pdf_pages(file_content: bytes, first_page: int = 0, last_page: Optional[int] = None) -> tuple:
+    """
+    Return (text lines, tables as lists of cells) for pages [first_page, last_page).
+    Text inside table areas is only reported as table cells, like Word body paragraphs vs
+    table cells. Each page's layout objects are released before the next page is read.
+    """
+    lines, tables = [], []
+    if last_page is None:
+        last_page = count_pdf_pages(file_content)
+    page_numbers = list(range(first_page + 1, last_page + 1))  # pdfplumber numbers pages from 1
+    if not page_numbers:
+        return lines, tables
+
+    with pdfplumber.open(io.BytesIO(file_content), pages=page_numbers) as pdf:
+        for page in pdf.pages:
+            found_tables = page.find_tables()
+            text = page.filter(_outside_bboxes([table.bbox for table in found_tables])).extract_text()
+            lines.extend((text or "").splitlines())
+            for table in found_tables:
+                # pdfplumber reports the slots covered by a merged cell as None
+                tables.append([
+                    {"text": text, "row": row, "col": col, "row_span": 1, "col_span": 1}
+                    for row, values in enumerate(table.extract())
+                    for col, text in enumerate(values)
+                    if text is not None
+                ])
+            page.flush_cache()
+    return lines, tables
+
+def timed_pdf_pages_parse(page_content: bytes) -> dict:
+    """Worker entry point: read a PDF holding one page range of a template (see split_pdf_pages)"""
+    cpu_start = time.process_time()
+    lines, tables = read_pdf_pages(page_content)
+    return {
+        "lines": lines,
+        "tables": tables,
+        "cpu_time_ms": round((time.process_time() - cpu_start) * 1000, 2),
+        "worker_pid": os.getpid()
+    }
+
+def pdf_page_chunks(page_count: int) -> List[tuple]:
+    chunk_size = max(1, PDF_PAGES_PER_CHUNK)
+    return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+def split_pdf_pages(file_content: bytes) -> List[bytes]:
+    """
+    Cut a PDF into standalone PDFs of PDF_PAGES_PER_CHUNK pages, so each parse worker is
+    sent and reads only its own pages and the resources they use, not the whole file
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    parts = []
+    for first_page, last_page in pdf_page_chunks(len(reader.pages)):
+        writer = PyPDF2.PdfWriter()
+        for index in range(first_page, last_page):
+            writer.add_page(reader.pages[index])
+        part = io.BytesIO()
+        writer.write(part)
+        parts.append(part.getvalue())
+    return parts
+
+def pdf_template_structure(lines: List[str], tables: List[list]) -> dict:
+    if not any(line.strip() for line in lines) and not tables:
+        raise ValueError("PDF boş veya metin içermiyor")
+    return scan_template_content(lines, tables)
+
+def extract_template_structure(file_content: bytes, engine: str = "docx") -> dict:
+    """Parse the document content; nothing here depends on the filename"""
+    # Read straight from the upload bytes - no temp file on disk
+    if engine == PDF_PARSE_ENGINE:
+        return pdf_template_structure(*read_pdf_pages(file_content))
+    return scan_template_content(*read_docx_content(file_content, engine))
+
+def scan_template_content(paragraph_texts: List[str], tables: List[list]) -> dict:
+    cell_texts = [cell["text"] for table in tables for cell in table]
+    
+    # Placeholder fields and numbered control items - one sweep per text
+    template_fields, control_items = scan_template_texts(paragraph_texts, cell_texts)
+    return {"template_fields": template_fields, "control_items": control_items}
 
 def extract_template_fields_from_word(file_content: bytes, filename: str) -> dict:
     """Extract template fields from Word document - ChatGPT approach!"""
     
     print(f"DEBUG: Extracting template fields from {filename}")
     
-    # Save temporary file
-    temp_path = f"/tmp/{uuid.uuid4()}.docx"
-    with open(temp_path, 'wb') as f:
-        f.write(file_content)
+    return build_word_template_data(extract_template_structure(file_content), filename)
+
+def build_word_template_data(structure: dict, filename: str) -> dict:
+    """Turn a parsed document structure into template data; equipment/template type come from the filename"""
+    template_fields = structure["template_fields"]
+    control_items = structure["control_items"]
+    found_fields = set(template_fields)
+    
+    # Equipment and template type from the keyword registry
+    equipment_type = detect_equipment_type(filename)
+    template_type = detect_template_type(filename)
+    template_name = f"{equipment_type} MUAYENE {'RAPORU' if template_type == 'REPORT' else 'FORMU'}"
     
-    try:
-        doc = Document(temp_path)
-        template_fields = {}
-        control_items = []
-        
-        # 1. Find placeholder fields - ChatGPT style!
-        placeholder_patterns = [
-            r'\{\{([^}]+)\}\}',  # {{field_name}}
-            r'__{3,}',           # ______ (3 or more underscores)
-            r'\[([^\]]+)\]',     # [field_name]
-            r'\$\{([^}]+)\}',    # ${field_name}
-        ]
-        
-        field_counter = 1
-        found_fields = set()
-        
-        # Extract from paragraphs
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if not text:
-                continue
-                
-            # Check for placeholders
-            for pattern in placeholder_patterns:
-                matches = re.findall(pattern, text)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        field_name = match[0].strip()
-                    else:
-                        field_name = f"field_{field_counter}"
-                        field_counter += 1
-                    
-                    if field_name and field_name not in found_fields:
-                        found_fields.add(field_name)
-                        
-                        # Determine field type from name
-                        field_type = "text"
-                        if any(word in field_name.lower() for word in ["tarih", "date"]):
-                            field_type = "date"
-                        elif any(word in field_name.lower() for word in ["email", "eposta"]):
-                            field_type = "email"
-                        elif any(word in field_name.lower() for word in ["telefon", "phone"]):
-                            field_type = "tel"
-                        elif any(word in field_name.lower() for word in ["sayi", "number", "adet"]):
-                            field_type = "number"
-                        
-                        template_fields[field_name] = {
-                            "label": field_name.replace("_", " ").title(),
-                            "type": field_type,
-                            "required": True,
-                            "original_text": text
-                        }
-            
-            # Check if it's a numbered control item
-            numbered_match = re.match(r'^(\d+)[.\)]?\s*(.+)', text)
-            if numbered_match:
-                item_num = int(numbered_match.group(1))
-                item_text = numbered_match.group(2).strip()
-                
-                if len(item_text) > 10 and item_num <= 100:  # Reasonable control item
-                    # Determine category
-                    if item_num <= 10:
-                        category = 'A'
-                    elif item_num <= 20:
-                        category = 'B'
-                    elif item_num <= 30:
-                        category = 'C'
-                    elif item_num <= 40:
-                        category = 'D'
-                    elif item_num <= 50:
-                        category = 'E'
-                    elif item_num <= 60:
-                        category = 'F'
-                    else:
-                        category = 'G'
-                    
-                    control_items.append({
-                        "id": item_num,
-                        "text": item_text,
-                        "category": category,
-                        "input_type": "dropdown",
-                        "has_comment": True,
-                        "has_photo": True,
-                        "required": True
-                    })
-        
-        # Extract from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    cell_text = cell.text.strip()
-                    if not cell_text:
-                        continue
-                    
-                    # Check for placeholders in tables
-                    for pattern in placeholder_patterns:
-                        matches = re.findall(pattern, cell_text)
-                        for match in matches:
-                            if isinstance(match, tuple):
-                                field_name = match[0].strip()
-                            else:
-                                field_name = f"table_field_{field_counter}"
-                                field_counter += 1
-                            
-                            if field_name and field_name not in found_fields:
-                                found_fields.add(field_name)
-                                template_fields[field_name] = {
-                                    "label": field_name.replace("_", " ").title(), 
-                                    "type": "text",
-                                    "required": True,
-                                    "original_text": cell_text,
-                                    "location": "table"
-                                }
-        
-        # Equipment type detection
-        filename_upper = filename.upper()
-        equipment_type = "UNKNOWN"
-        
-        equipment_keywords = {
-            "FORKLIFT": ["FORKLIFT", "FORK", "LİFT"],
-            "CARASKAL": ["CARASKAL", "CARAS", "ASKAL"],
-            "ISKELE": ["ISKELE", "İSKELE", "SCAFF"],  
-            "VINC": ["VINC", "VİNÇ", "CRANE", "KRİK"],
-            "ASANSÖR": ["ASANSÖR", "ASANSOR", "ELEVATöR", "LIFT"],
-            "YANGIN_SÖNDÜRME": ["YANGIN", "SÖNDÜRME", "FIRE", "SPRINKLER", "SULU"],
-            "KAZAN": ["KAZAN", "BOILER", "BUHAR"],
-            "TANK": ["TANK", "DEPO", "REZERVUAR"],
-            "BASINCLI_KABI": ["BASINCLI", "KABI", "PRESSURE", "VESSEL"]
-        }
-        
-        for eq_type, keywords in equipment_keywords.items():
-            if any(keyword in filename_upper for keyword in keywords):
-                equipment_type = eq_type
-                break
-        
-        # Template type
-        template_type = "REPORT" if any(word in filename_upper for word in ["RAPOR", "REPORT"]) else "FORM"
-        template_name = f"{equipment_type} MUAYENE {'RAPORU' if template_type == 'REPORT' else 'FORMU'}"
-        
-        # Group control items by category
-        categories_dict = {}
-        for item in control_items:
-            category = item["category"]
-            if category not in categories_dict:
-                categories_dict[category] = {
-                    "name": category,
-                    "items": []
-                }
-            categories_dict[category]["items"].append(item)
-        
-        # Create categories list
-        categories_list = []
-        for category_code in sorted(categories_dict.keys()):
-            categories_list.append({
-                "code": category_code,
-                "name": category_code,
-                "items": categories_dict[category_code]["items"]
-            })
-        
-        # Build template data - ChatGPT style!
-        template_data = {
-            "name": template_name,
-            "equipment_type": equipment_type,
-            "template_type": template_type,
-            "description": f"{equipment_type} template - {len(found_fields)} alanı ve {len(control_items)} kontrol kriteri",
-            "parsed_from": "WORD_CHATGPT_STYLE",
-            "parse_date": datetime.utcnow().isoformat(),
-            "is_active": True,
-            "total_items": len(control_items),
-            "total_fields": len(found_fields),
-            
-            # Template fields - ChatGPT approach
-            "template_fields": template_fields,
-            
-            # Control items
-            "control_items": control_items,
-            "categories": categories_list,
-            "categories_dict": categories_dict,
-            
-            # Universal structure
-            "general_info": template_fields,  # Use extracted fields
-            "measurement_devices": [],
-            "equipment_info": {},
-            "test_values": {},
-            "test_experiments": [],
-            "defect_explanations": "Tespit edilen kusurlar",
-            "notes": "Notlar",
-            "result_opinion": "Sonuç ve kanaat",
-            "inspector_info": {
-                "name": {"label": "Muayene Personeli", "required": True},
-                "signature": {"label": "İmza", "required": True, "type": "signature"}
-            },
-            "company_official": {
-                "name": {"label": "Firma Yetkilisi", "required": True},
-                "signature": {"label": "İmza", "required": True, "type": "signature"}
+    # Group control items by category
+    categories_dict = {}
+    for item in control_items:
+        category = item["category"]
+        if category not in categories_dict:
+            categories_dict[category] = {
+                "name": category,
+                "items": []
             }
-        }
+        categories_dict[category]["items"].append(item)
+    
+    # Create categories list
+    categories_list = []
+    for category_code in sorted(categories_dict.keys()):
+        categories_list.append({
+            "code": category_code,
+            "name": category_code,
+            "items": categories_dict[category_code]["items"]
+        })
+    
+    # Build template data - ChatGPT style!
+    template_data = {
+        "name": template_name,
+        "equipment_type": equipment_type,
+        "template_type": template_type,
+        "description": f"{equipment_type} template - {len(found_fields)} alanı ve {len(control_items)} kontrol kriteri",
+        "parsed_from": "WORD_CHATGPT_STYLE",
+        "parse_date": datetime.utcnow().isoformat(),
+        "is_active": True,
+        "total_items": len(control_items),
+        "total_fields": len(found_fields),
         
-        print(f"DEBUG: ChatGPT-style extraction completed:")
-        print(f"  - Template: {template_name}")
-        print(f"  - Equipment: {equipment_type}")
-        print(f"  - Fields found: {len(found_fields)}")
-        print(f"  - Control items: {len(control_items)}")
-        print(f"  - Categories: {len(categories_dict)}")
+        # Template fields - ChatGPT approach
+        "template_fields": template_fields,
         
-        return template_data
+        # Control items
+        "control_items": control_items,
+        "categories": categories_list,
+        "categories_dict": categories_dict,
         
-    finally:
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Universal structure
+        "general_info": template_fields,  # Use extracted fields
+        "measurement_devices": [],
+        "equipment_info": {},
+        "test_values": {},
+        "test_experiments": [],
+        "defect_explanations": "Tespit edilen kusurlar",
+        "notes": "Notlar",
+        "result_opinion": "Sonuç ve kanaat",
+        "inspector_info": {
+            "name": {"label": "Muayene Personeli", "required": True},
+            "signature": {"label": "İmza", "required": True, "type": "signature"}
+        },
+        "company_official": {
+            "name": {"label": "Firma Yetkilisi", "required": True},
+            "signature": {"label": "İmza", "required": True, "type": "signature"}
+        }
+    }
+    
+    print(f"DEBUG: ChatGPT-style extraction completed:")
+    print(f"  - Template: {template_name}")
+    print(f"  - Equipment: {equipment_type}")
+    print(f"  - Fields found: {len(found_fields)}")
+    print(f"  - Control items: {len(control_items)}")
+    print(f"  - Categories: {len(categories_dict)}")
+    
+    return template_data
 
-def parse_word_document(file_content: bytes, filename: str) -> dict:
+def parse_word_document(file_content: bytes, filename: str, engine: str = "docx") -> dict:
     """Universal Word document parser for ALL inspection templates"""
     try:
         # Read Word document
-        doc = Document(io.BytesIO(file_content))
+        full_text, raw_tables = read_docx_content(file_content, engine)
         
         # Extract document text
-        full_text = []
-        for paragraph in doc.paragraphs:
-            full_text.append(paragraph.text)
-        
         text = '\n'.join(full_text)
         
         # Extract table data for structured parsing
-        tables = []
-        for table in doc.tables:
-            table_data = []
-            for row in table.rows:
-                row_data = []
-                for cell in row.cells:
-                    row_data.append(cell.text.strip())
-                table_data.append(row_data)
-            tables.append(table_data)
+        tables = [[dict(cell, text=cell["text"].strip()) for cell in table] for table in raw_tables]
         
-        # Determine equipment type and template type from filename
-        equipment_type = "UNKNOWN"
-        template_type = "FORM"  # Default to form
-        
-        filename_upper = filename.upper()
-        
-        # Extract equipment type (ignore MUAYENE, FORMU, RAPORU keywords)
-        if "FORKL" in filename_upper:
-            equipment_type = "FORKLIFT"
-        elif "CARASKAL" in filename_upper:
-            equipment_type = "CARASKAL"
-        elif "ISKELE" in filename_upper or "İSKELE" in filename_upper:
-            equipment_type = "ISKELE"
-        elif "VINC" in filename_upper or "CRANE" in filename_upper:
-            equipment_type = "VINC"
-        elif "ASANSÖR" in filename_upper or "ASANSOR" in filename_upper or "ELEVATOR" in filename_upper:
-            equipment_type = "ASANSÖR"
-        
-        # Determine template type
-        if "RAPOR" in filename_upper:
-            template_type = "REPORT"
-        elif "FORM" in filename_upper:
-            template_type = "FORM"
+        # Determine equipment type and template type from filename (MUAYENE, FORMU, RAPORU are not keywords)
+        equipment_type = detect_equipment_type(filename)
+        template_type = detect_template_type(filename)
 
         print(f"DEBUG: Parsing {equipment_type} {template_type} template from {filename}")
 
@@ -1913,9 +4224,201 @@ def parse_word_document(file_content: bytes, filename: str) -> dict:
     
     return template_data
 
+# ===================== TEMPLATE PARSE WORKERS =====================
+
+TEMPLATE_FILE_EXTENSIONS = ('.docx', '.doc', '.pdf')
+
+# Parsing is CPU bound; run it in worker processes so uploads never block the event loop.
+# 0 parses in a thread of the current process instead (useful for debugging).
+TEMPLATE_PARSE_WORKERS = int(os.getenv("TEMPLATE_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+_template_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_template_parse_pool() -> Optional[ProcessPoolExecutor]:
+    global _template_parse_pool
+    if TEMPLATE_PARSE_WORKERS <= 0:
+        return None
+    if _template_parse_pool is None:
+        _template_parse_pool = ProcessPoolExecutor(max_workers=TEMPLATE_PARSE_WORKERS)
+    return _template_parse_pool
+
+def shutdown_template_parse_pool():
+    global _template_parse_pool
+    if _template_parse_pool is not None:
+        _template_parse_pool.shutdown(wait=False, cancel_futures=True)
+        _template_parse_pool = None
+
+def timed_template_parse(file_content: bytes, engine: str = "docx") -> dict:
+    """Worker entry point: parse an upload's structure and record wall/CPU time of the parse itself"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    structure = extract_template_structure(file_content, engine)
+    return {
+        "structure": structure,
+        "stats": {
+            "wall_time_ms": round((time.perf_counter() - wall_start) * 1000, 2),
+            "cpu_time_ms": round((time.process_time() - cpu_start) * 1000, 2),
+            "file_size": len(file_content),
+            "worker_pid": os.getpid()
+        }
+    }
+
+async def parse_pdf_template_pages(file_content: bytes) -> dict:
+    """Parse a PDF template with its page ranges spread over the template parse pool"""
+    loop = asyncio.get_running_loop()
+    pool = get_template_parse_pool()
+    wall_start = time.perf_counter()
+    page_count = count_pdf_pages(file_content)
+    chunks = await asyncio.to_thread(split_pdf_pages, file_content)
+    
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, timed_pdf_pages_parse, chunk) for chunk in chunks
+    ))
+    # Page ranges come back in order, so fields/items are numbered as in a sequential read
+    lines = [line for part in parts for line in part["lines"]]
+    tables = [table for part in parts for table in part["tables"]]
+    structure = pdf_template_structure(lines, tables)
+    return {
+        "structure": structure,
+        "stats": {
+            "wall_time_ms": round((time.perf_counter() - wall_start) * 1000, 2),
+            "cpu_time_ms": round(sum(part["cpu_time_ms"] for part in parts), 2),
+            "file_size": len(file_content),
+            "pages": page_count,
+            "page_chunks": len(chunks),
+            "worker_pids": sorted({part["worker_pid"] for part in parts})
+        }
+    }
+
+async def parse_template_upload(file_content: bytes, filename: str, engine: str = "docx") -> dict:
+    """Parse an uploaded template off the event loop, reusing a cached parse of identical bytes"""
+    engine = template_parse_engine_for(filename, engine)
+    cache_key = template_parse_cache_key(file_content, engine)
+    lookup_start = time.perf_counter()
+    structure = await get_cached_template_structure(cache_key)
+    
+    if structure is not None:
+        stats = {
+            "cache_hit": True,
+            "engine": engine,
+            "wall_time_ms": round((time.perf_counter() - lookup_start) * 1000, 2),
+            "cpu_time_ms": 0.0,
+            "file_size": len(file_content)
+        }
+    else:
+        loop = asyncio.get_running_loop()
+        pool = get_template_parse_pool()
+        try:
+            if engine == PDF_PARSE_ENGINE:
+                parsed = await parse_pdf_template_pages(file_content)
+            else:
+                parsed = await loop.run_in_executor(pool, timed_template_parse, file_content, engine)
+        except BrokenProcessPool:
+            # A crashed worker poisons the pool; drop it so the next upload gets a fresh one
+            shutdown_template_parse_pool()
+            raise
+        structure = parsed["structure"]
+        stats = dict(parsed["stats"], cache_hit=False, engine=engine)
+        await store_template_structure(cache_key, structure, stats)
+    
+    logging.info(
+        f"Template parse {filename}: wall {stats['wall_time_ms']} ms, cpu {stats['cpu_time_ms']} ms, "
+        f"{stats['file_size']} bytes, cache {'hit' if stats['cache_hit'] else 'miss'}"
+    )
+    template_data = build_word_template_data(structure, filename)
+    if engine == PDF_PARSE_ENGINE:
+        template_data["parsed_from"] = "PDF_PAGES"
+    template_data["parse_stats"] = stats
+    return template_data
+
+# ===================== TEMPLATE PARSE CACHE =====================
+
+# Bump whenever parsing output changes - entries of other versions are never read and get purged
+TEMPLATE_PARSER_VERSION = "3"
+TEMPLATE_PARSE_CACHE_MAX_ENTRIES = int(os.getenv("TEMPLATE_PARSE_CACHE_MAX_ENTRIES", "500"))
+
+def template_parse_cache_key(file_content: bytes, engine: str = "docx") -> str:
+    return f"{hashlib.sha256(file_content).hexdigest()}:{TEMPLATE_PARSER_VERSION}:{engine}"
+
+def resolve_template_parse_engine(engine: Optional[str]) -> str:
+    engine = engine or DEFAULT_TEMPLATE_PARSE_ENGINE
+    if engine not in TEMPLATE_PARSE_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown parse engine '{engine}'. Use one of: {', '.join(TEMPLATE_PARSE_ENGINES)}")
+    return engine
+
+async def get_cached_template_structure(cache_key: str) -> Optional[dict]:
+    try:
+        entry = await db.template_parse_cache.find_one_and_update(
+            {"_id": cache_key},
+            {"$set": {"last_used": datetime.utcnow()}, "$inc": {"hits": 1}},
+            projection={"structure": 1}
+        )
+    except Exception as e:
+        logging.warning(f"Template parse cache lookup failed: {e}")
+        return None
+    return entry["structure"] if entry else None
+
+async def store_template_structure(cache_key: str, structure: dict, stats: dict):
+    """Store a parse result and evict least recently used entries beyond the size bound"""
+    now = datetime.utcnow()
+    try:
+        await db.template_parse_cache.update_one(
+            {"_id": cache_key},
+            {"$setOnInsert": {
+                "structure": structure,
+                "parser_version": TEMPLATE_PARSER_VERSION,
+                "file_size": stats.get("file_size"),
+                "parse_wall_time_ms": stats.get("wall_time_ms"),
+                "created_at": now,
+                "last_used": now,
+                "hits": 0
+            }},
+            upsert=True
+        )
+        excess = await db.template_parse_cache.count_documents({}) - TEMPLATE_PARSE_CACHE_MAX_ENTRIES
+        if excess > 0:
+            stale = await db.template_parse_cache.find({}, {"_id": 1}).sort("last_used", 1).limit(excess).to_list(None)
+            await db.template_parse_cache.delete_many({"_id": {"$in": [entry["_id"] for entry in stale]}})
+    except Exception as e:
+        logging.warning(f"Template parse cache store failed: {e}")
+
+async def purge_stale_template_parse_cache():
+    """Drop entries written by other parser versions (run at startup)"""
+    await db.template_parse_cache.create_index("last_used")
+    result = await db.template_parse_cache.delete_many({"parser_version": {"$ne": TEMPLATE_PARSER_VERSION}})
+    if result.deleted_count:
+        print(f"✅ Template parse cache: removed {result.deleted_count} entries from older parser versions")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_template_parse_pool()
+
+@app.post("/api/equipment-templates/preview")
+async def preview_template_document(
+    file: UploadFile = File(...),
+    engine: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Parse a template document without saving it (served from the parse cache for known files)"""
+    
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can upload templates")
+    
+    if not file.filename.endswith(TEMPLATE_FILE_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Only Word documents (.docx, .doc) and PDF files (.pdf) are supported")
+    
+    engine = resolve_template_parse_engine(engine)
+    try:
+        template_data = await parse_template_upload(await file.read(), file.filename, engine)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Template preview failed: {str(e)}")
+    
+    return {"message": "Template parsed successfully", "template": template_data}
+
 @app.post("/api/equipment-templates/upload")
 async def upload_template_document(
     file: UploadFile = File(...),
+    engine: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     """Upload and parse Word document to create equipment template"""
@@ -1928,6 +4431,8 @@ async def upload_template_document(
     if not file.filename.endswith(('.docx', '.doc', '.pdf')):
         raise HTTPException(status_code=400, detail="Only Word documents (.docx, .doc) and PDF files (.pdf) are supported")
     
+    engine = resolve_template_parse_engine(engine)
+    
     try:
         # Read file content
         file_content = await file.read()
@@ -1939,12 +4444,10 @@ async def upload_template_document(
         
         # Choose parser based on file type
         if file.filename.endswith('.pdf'):
-            # For now, use ChatGPT-style Word parser (can extend to PDF later)
-            print("DEBUG: PDF detected, but using Word parser temporarily")
-            template_data = extract_template_fields_from_word(file_content, file.filename)
+            logging.debug("PDF template upload, parsing pages in parallel with pdfplumber")
         else:
             print("DEBUG: Using ChatGPT-style Word parser")
-            template_data = extract_template_fields_from_word(file_content, file.filename)
+        template_data = await parse_template_upload(file_content, file.filename, engine)
         
         # DEBUG: Check what fields are in template_data
         print(f"DEBUG: template_data keys: {list(template_data.keys())}")
@@ -1954,6 +4457,7 @@ async def upload_template_document(
         
         # Add metadata
         template_data["id"] = str(uuid.uuid4())
+        template_data["version"] = 1
         template_data["created_by"] = current_user.id
         template_data["created_at"] = datetime.utcnow()
         template_data["updated_at"] = datetime.utcnow()
@@ -1994,82 +4498,149 @@ async def upload_template_document(
         print(f"Template upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template upload failed: {str(e)}")
 
+BULK_UPLOAD_MAX_FILES = 50
+
+async def bulk_template_upload_results(uploads: List[tuple], current_user: User, engine: str = "docx"):
+    """
+    Parse (filename, content) uploads in parallel on the template parse pool and yield one
+    result dict per file as soon as it is decided. Existing templates are fetched once up
+    front and every burst of finished parses is inserted with a single insert_many.
+    """
+    existing_keys = set()
+    async for template in db.equipment_templates.find(
+        {"is_active": True}, {"_id": 0, "equipment_type": 1, "template_type": 1}
+    ):
+        existing_keys.add((template.get("equipment_type"), template.get("template_type")))
+
+    tasks = {}
+    for index, (filename, file_content) in enumerate(uploads):
+        if not filename.endswith(TEMPLATE_FILE_EXTENSIONS):
+            yield {
+                "filename": filename,
+                "status": "failed",
+                "error": "Only Word documents (.docx, .doc) and PDF files (.pdf) are supported"
+            }
+            continue
+        task = asyncio.ensure_future(parse_template_upload(file_content, filename, engine))
+        tasks[task] = (index, filename)
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            results = []
+            accepted = []
+            for task in sorted(done, key=lambda t: tasks[t][0]):
+                filename = tasks[task][1]
+                try:
+                    template_data = task.result()
+                except Exception as e:
+                    results.append({"filename": filename, "status": "failed", "error": str(e)})
+                    continue
+
+                key = (template_data["equipment_type"], template_data["template_type"])
+                if key in existing_keys:
+                    results.append({
+                        "filename": filename,
+                        "status": "failed",
+                        "error": f"{template_data['equipment_type']} {template_data['template_type']} template already exists"
+                    })
+                    continue
+                existing_keys.add(key)
+
+                template_data["id"] = str(uuid.uuid4())
+                template_data["version"] = 1
+                template_data["created_by"] = current_user.id
+                template_data["created_at"] = datetime.utcnow()
+                template_data["updated_at"] = datetime.utcnow()
+                accepted.append((filename, template_data))
+
+            failed_indexes = {}
+            if accepted:
+                try:
+                    await db.equipment_templates.insert_many([data for _, data in accepted], ordered=False)
+                except BulkWriteError as e:
+                    failed_indexes = {
+                        error["index"]: error.get("errmsg", "Insert failed")
+                        for error in e.details.get("writeErrors", [])
+                    }
+
+            for position, (filename, template_data) in enumerate(accepted):
+                if position in failed_indexes:
+                    results.append({"filename": filename, "status": "failed", "error": failed_indexes[position]})
+                    continue
+                results.append({
+                    "filename": filename,
+                    "status": "successful",
+                    "template_name": template_data["name"],
+                    "equipment_type": template_data["equipment_type"],
+                    "template_type": template_data["template_type"],
+                    "total_items": template_data["total_items"],
+                    "parse_stats": template_data.get("parse_stats")
+                })
+
+            for result in results:
+                yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
 @app.post("/api/equipment-templates/bulk-upload")
 async def bulk_upload_templates(
     files: List[UploadFile] = File(...),
+    stream: bool = False,
+    engine: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    """Bulk upload multiple Word documents to create equipment templates"""
+    """
+    Bulk upload multiple Word documents to create equipment templates.
+    With ?stream=true (or Accept: application/x-ndjson) per-file results are streamed
+    as NDJSON lines while the remaining files are still being parsed.
+    """
     
     # Check authorization
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Only admins can upload templates")
     
-    if len(files) > 50:
-        raise HTTPException(status_code=400, detail="Maximum 50 files can be uploaded at once")
+    if len(files) > BULK_UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Maximum {BULK_UPLOAD_MAX_FILES} files can be uploaded at once")
+    
+    engine = resolve_template_parse_engine(engine)
+    
+    # Read every upload before responding - the multipart files are closed with the request
+    uploads = [(file.filename, await file.read()) for file in files]
+    
+    if stream or (accept and "application/x-ndjson" in accept):
+        async def ndjson_lines():
+            successful = failed = 0
+            async for result in bulk_template_upload_results(uploads, current_user, engine):
+                if result["status"] == "successful":
+                    successful += 1
+                else:
+                    failed += 1
+                yield json.dumps(dict(result, event="file"), ensure_ascii=False, default=str) + "\n"
+            yield json.dumps({
+                "event": "summary",
+                "message": f"Bulk upload completed. {successful} successful, {failed} failed",
+                "successful": successful,
+                "failed": failed,
+                "total_files": len(uploads)
+            }, ensure_ascii=False) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
     
     results = {
         "successful": [],
         "failed": [],
-        "total_files": len(files)
+        "total_files": len(uploads)
     }
     
-    for file in files:
-        try:
-            # Validate file type - NOW SUPPORTS PDF!
-            if not file.filename.endswith(('.docx', '.doc', '.pdf')):
-                results["failed"].append({
-                    "filename": file.filename,
-                    "error": "Only Word documents (.docx, .doc) and PDF files (.pdf) are supported"
-                })
-                continue
-            
-            # Read and parse file
-            file_content = await file.read()
-            
-            # Choose parser based on file type
-            if file.filename.endswith('.pdf'):
-                # For now, use ChatGPT-style Word parser (can extend to PDF later)
-                template_data = extract_template_fields_from_word(file_content, file.filename)
-            else:
-                template_data = extract_template_fields_from_word(file_content, file.filename)
-            
-            # Add metadata
-            template_data["id"] = str(uuid.uuid4())
-            template_data["created_by"] = current_user.id
-            template_data["created_at"] = datetime.utcnow()
-            template_data["updated_at"] = datetime.utcnow()
-            
-            # Check if template already exists (only active templates)
-            existing_template = await db.equipment_templates.find_one({
-                "equipment_type": template_data["equipment_type"],
-                "template_type": template_data["template_type"],
-                "is_active": True
-            })
-            
-            if existing_template:
-                results["failed"].append({
-                    "filename": file.filename,
-                    "error": f"{template_data['equipment_type']} {template_data['template_type']} template already exists"
-                })
-                continue
-            
-            # Insert template
-            await db.equipment_templates.insert_one(template_data)
-            
-            results["successful"].append({
-                "filename": file.filename,
-                "template_name": template_data["name"],
-                "equipment_type": template_data["equipment_type"],
-                "template_type": template_data["template_type"],
-                "total_items": template_data["total_items"]
-            })
-            
-        except Exception as e:
-            results["failed"].append({
-                "filename": file.filename,
-                "error": str(e)
-            })
+    async for result in bulk_template_upload_results(uploads, current_user, engine):
+        outcome = result.pop("status")
+        result.pop("parse_stats", None)
+        results[outcome].append(result)
     
     return {
         "message": f"Bulk upload completed. {len(results['successful'])} successful, {len(results['failed'])} failed",
@@ -2261,16 +4832,8 @@ def extract_control_items(text: str, tables: list) -> list:
         if len(item_text) < 10:  # Reduced from 15 to 10 to avoid missing short but valid items
             continue
             
-        # Skip common headers and non-control text (SMART FILTERING)
-        skip_patterns = [
-            'GENEL', 'BİLGİLER', 'MUAYENE', 'KONTROL', 'ETİKET', 'TEST', 'FORM', 'RAPOR', 
-            'BAŞLIK', 'TABLE', 'DEĞER', 'DURUM', 'TARİH', 'NO', 'ADI', 'KODU', 'MARKASı',
-            'TİPİ', 'SERİ', 'İMAL', 'YIL', 'KAPASITE', 'YÜKSEKLIK', 'MESAFE', 'ÖLÇÜM',
-            'DEĞERLENDİRME', 'AÇIKLAMA', 'NOT'
-        ]
-        
-        # Skip if item text is primarily a header/label
-        if any(pattern in item_text.upper() for pattern in skip_patterns):
+        # Skip if item text is primarily a header/label (SMART FILTERING)
+        if control_item_skip_words.matches_any(item_text):
             continue
             
         # Skip if text contains primarily numbers/codes/values (not control descriptions)  
@@ -2339,9 +4902,7 @@ def extract_control_items(text: str, tables: list) -> list:
                 for cell_text in row:
                     # Smart table cell filtering for REAL control items - RELAXED FOR ALL 53 ITEMS
                     if (len(cell_text) > 10 and len(cell_text) < 400 and  # RELAXED: Was 20, now 10 
-                        not any(x in cell_text.upper() for x in ['GENEL', 'BİLGİLER', 'MUAYENE', 'TEST', 'ETİKET', 
-                                                                 'KONTROL', 'FORM', 'RAPOR', 'TABLE', 'BAŞLIK',
-                                                                 'NO', 'ADI', 'KODU', 'DURUM', 'TARİH']) and
+                        not control_table_skip_words.matches_any(cell_text) and
                         not cell_text.upper().strip() in ['D', 'U', 'UD', 'U.Y'] and
                         cell_text.count('.') < 10 and  # RELAXED: Was 5, now 10
                         len(re.sub(r'[^a-zA-ZğüşıöçĞÜŞİÖÇ]', '', cell_text)) > 8):  # RELAXED: Was 15, now 8
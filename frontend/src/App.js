@@ -1539,6 +1539,8 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
   const [uploading, setUploading] = useState(false);
   const [importResult, setImportResult] = useState(null);
   const [showResults, setShowResults] = useState(false);
+  const [progress, setProgress] = useState(null);
+  const [force, setForce] = useState(false);
 
   const handleFileSelect = (e) => {
     const selectedFile = e.target.files[0];
@@ -1554,7 +1556,8 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
     }
   };
 
-  const handleUpload = async () => {
+  // forceImport: process every row even if the ledger has seen this file before
+  const handleUpload = async (forceImport) => {
     if (!file) {
       alert('Lütfen bir dosya seçin');
       return;
@@ -1569,12 +1572,26 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
         headers: {
           'Content-Type': 'multipart/form-data',
         },
+        params: { background: true, force: forceImport },
       });
 
-      setImportResult(response.data);
+      // Import runs as a background job; poll its progress until it finishes
+      let job = response.data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = (await api.get(`/jobs/${response.data.job_id}`)).data;
+        setProgress(job);
+      }
+
+      if (job.status === 'failed') {
+        alert('Yükleme hatası: ' + (job.error || 'Bilinmeyen hata'));
+        return;
+      }
+
+      setImportResult(job);
       setShowResults(true);
       
-      if (response.data.successful_imports > 0) {
+      if (job.successful_imports > 0) {
         onSuccess();
       }
     } catch (error) {
@@ -1582,19 +1599,16 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
       alert('Yükleme hatası: ' + (error.response?.data?.detail || 'Bilinmeyen hata'));
     } finally {
       setUploading(false);
+      setProgress(null);
     }
   };
 
   const downloadTemplate = async () => {
     try {
-      const response = await api.get('/customers/bulk-import/template');
-      
-      // Convert hex string back to binary
-      const hexString = response.data.content;
-      const bytes = new Uint8Array(hexString.match(/.{1,2}/g).map(byte => parseInt(byte, 16)));
+      const response = await api.get('/customers/bulk-import/template', { responseType: 'blob' });
       
-      // Create blob and download
-      const blob = new Blob([bytes], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' });
+      // Download the xlsx file as sent by the server
+      const blob = response.data;
       const url = window.URL.createObjectURL(blob);
       const link = document.createElement('a');
       link.href = url;
@@ -1614,6 +1628,7 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
     setFile(null);
     setImportResult(null);
     setShowResults(false);
+    setForce(false);
   };
 
   return (
@@ -1679,6 +1694,19 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
                       Seçilen dosya: <span className="font-medium">{file.name}</span>
                     </div>
                   )}
+
+                  <div className="flex items-center">
+                    <input
+                      id="bulk-import-force"
+                      type="checkbox"
+                      checked={force}
+                      onChange={(e) => setForce(e.target.checked)}
+                      className="mr-2 h-4 w-4 text-red-600 focus:ring-red-500 border-gray-300 rounded"
+                    />
+                    <label htmlFor="bulk-import-force" className="text-sm text-gray-700">
+                      Daha önce içe aktarılmış olsa da tüm satırları yeniden işle
+                    </label>
+                  </div>
                 </div>
               </div>
 
@@ -1691,11 +1719,15 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
                   İptal
                 </button>
                 <button
-                  onClick={handleUpload}
+                  onClick={() => handleUpload(force)}
                   disabled={!file || uploading}
                   className="px-6 py-2 bg-red-900 text-white rounded-md hover:bg-red-800 disabled:opacity-50 disabled:cursor-not-allowed"
                 >
-                  {uploading ? 'Yükleniyor...' : 'Dosyayı Yükle'}
+                  {uploading
+                    ? (progress && progress.progress !== null
+                        ? `Yükleniyor... %${progress.progress}${progress.eta_seconds ? ` (~${Math.ceil(progress.eta_seconds)} sn)` : ''}`
+                        : 'Yükleniyor...')
+                    : 'Dosyayı Yükle'}
                 </button>
               </div>
             </div>
@@ -1719,6 +1751,11 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
                     <div className="text-sm text-red-800">Başarısız</div>
                   </div>
                 </div>
+                {importResult.unchanged_rows > 0 && (
+                  <p className="text-sm text-gray-600">
+                    {importResult.unchanged_rows} satır önceki içe aktarımla aynı olduğu için atlandı
+                  </p>
+                )}
               </div>
 
               {/* Warnings */}
@@ -1748,6 +1785,15 @@ const BulkImportModal = ({ onClose, onSuccess }) => {
               )}
 
               <div className="flex justify-end space-x-3">
+                {importResult.unchanged_rows > 0 && (
+                  <button
+                    onClick={() => handleUpload(true)}
+                    disabled={uploading}
+                    className="px-4 py-2 border border-gray-300 text-gray-700 rounded-md hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                  >
+                    {uploading ? 'Yükleniyor...' : 'Tüm Satırları Yeniden İşle'}
+                  </button>
+                )}
                 <button
                   onClick={resetForm}
                   className="px-4 py-2 border border-gray-300 text-gray-700 rounded-md hover:bg-gray-50"
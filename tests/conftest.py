@@ -0,0 +1,313 @@
+import copy
+import io
+import os
+import sys
+
+# Offline tests import backend/server.py directly; motor connects lazily, so a
+# local URL keeps the import from resolving the production SRV record.
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import pytest
+from gridfs.errors import NoFile
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+
+# Wall-clock benchmarks depend on the machine; they only run when asked for
+RUN_BENCHMARKS = os.getenv("RUN_BENCHMARKS") == "1"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock benchmark, runs only with RUN_BENCHMARKS=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    if RUN_BENCHMARKS:
+        return
+    skip = pytest.mark.skip(reason="wall-clock benchmark; set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def memory_parse_cache(monkeypatch):
+    """Keep the template parse cache in a dict instead of the template_parse_cache collection"""
+    import server
+
+    entries = {}
+
+    async def get_cached(cache_key):
+        return entries.get(cache_key)
+
+    async def store(cache_key, structure, stats):
+        entries.setdefault(cache_key, structure)
+
+    monkeypatch.setattr(server, "get_cached_template_structure", get_cached)
+    monkeypatch.setattr(server, "store_template_structure", store)
+    return entries
+
+
+# ----- In-memory stand-ins for motor collections and GridFS buckets -----
+# Test modules import these (from .conftest import ...) and subclass them when a test
+# needs to count calls or inject write failures.
+
+
+def matches_condition(value, condition):
+    if not isinstance(condition, dict) or not any(key.startswith("$") for key in condition):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$in" and value not in operand:
+            return False
+        if operator == "$ne" and value == operand:
+            return False
+        if operator == "$lt" and (value is None or not value < operand):
+            return False
+        if operator == "$gt" and (value is None or not value > operand):
+            return False
+        if operator == "$type" and operand == "array" and not isinstance(value, list):
+            return False
+        if operator == "$not" and matches_condition(value, operand):
+            return False
+        if operator == "$elemMatch" and not any(
+            isinstance(element, dict) and matches(element, operand) for element in value or []
+        ):
+            return False
+    return True
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, option) for option in condition):
+                return False
+        elif isinstance(condition, dict) and "$exists" in condition:
+            if (key in doc) != condition["$exists"]:
+                return False
+        elif not matches_condition(doc.get(key), condition):
+            return False
+    return True
+
+
+def set_path(doc, path, value):
+    *parents, key = path.split(".")
+    for parent in parents:
+        doc = doc.setdefault(parent, {})
+    doc[key] = value
+
+
+def apply_update(doc, update):
+    for path, value in update.get("$set", {}).items():
+        set_path(doc, path, copy.deepcopy(value))
+    for key, amount in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + amount
+    for key, push in update.get("$push", {}).items():
+        if isinstance(push, dict) and "$each" in push:
+            values = doc.get(key, []) + copy.deepcopy(push["$each"])
+            doc[key] = values[push["$slice"]:] if push.get("$slice", 0) < 0 else values[:push.get("$slice")]
+        else:
+            doc[key] = doc.get(key, []) + [copy.deepcopy(push)]
+    for key, value in update.get("$addToSet", {}).items():
+        values = doc.setdefault(key, [])
+        for item in value["$each"] if isinstance(value, dict) and "$each" in value else [value]:
+            if item not in values:
+                values.append(copy.deepcopy(item))
+
+
+def project(doc, projection):
+    """Apply an inclusion projection (dotted paths one level deep, also into arrays); exclusions are ignored"""
+    if doc is None or not projection:
+        return copy.deepcopy(doc)
+    fields = [path for path, include in projection.items() if include and path != "_id"]
+    if not fields:
+        return copy.deepcopy(doc)
+    projected = {}
+    for path in fields:
+        section, _, key = path.partition(".")
+        value = doc.get(section)
+        if section not in doc:
+            continue
+        if not key:
+            projected[section] = copy.deepcopy(value)
+        elif isinstance(value, list):
+            # "equipments.key" keeps that key of every array element
+            elements = projected.setdefault(section, [{} for _ in value])
+            for element, source in zip(elements, value):
+                if isinstance(source, dict) and key in source:
+                    element[key] = copy.deepcopy(source[key])
+        elif isinstance(value, dict) and key in value:
+            projected.setdefault(section, {})[key] = copy.deepcopy(value[key])
+    return projected
+
+
+class FakeResult:
+    def __init__(self, matched_count=0, modified_count=0, inserted_count=0, upserted_count=0):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.inserted_count = inserted_count
+        self.upserted_count = upserted_count
+
+
+class FakeCursor:
+    def __init__(self, docs, projection=None):
+        self._docs = docs
+        self.projection = projection
+
+    @property
+    def docs(self):
+        return [project(doc, self.projection) for doc in self._docs]
+
+    def sort(self, key, direction=1):
+        # Sorted on the stored documents, before the projection like the server does
+        self._docs = sorted(self._docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=None, unique=()):
+        self.docs = docs if docs is not None else []
+        self.unique = unique
+
+    def _check_unique(self, document):
+        for field in self.unique:
+            if any(doc.get(field) == document.get(field) for doc in self.docs):
+                raise DuplicateKeyError(f"duplicate {field}")
+
+    async def insert_one(self, document):
+        self._check_unique(document)
+        self.docs.append(copy.deepcopy(document))
+
+    async def insert_many(self, documents, ordered=True):
+        for document in documents:
+            await self.insert_one(document)
+
+    async def find_one(self, query, projection=None, sort=None):
+        found = [doc for doc in self.docs if matches(doc, query)]
+        if sort:
+            (key, direction), = sort
+            found.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([doc for doc in self.docs if matches(doc, query or {})], projection)
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        for doc in self.docs:
+            if matches(doc, query):
+                apply_update(doc, update)
+                return project(doc, projection)
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                apply_update(doc, update)
+                return FakeResult(matched_count=1, modified_count=int(doc != before))
+        if upsert:
+            doc = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+            doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+            apply_update(doc, update)
+            self.docs.append(doc)
+            return FakeResult(upserted_count=1)
+        return FakeResult()
+
+    async def update_many(self, query, update):
+        result = FakeResult()
+        for doc in self.docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                apply_update(doc, update)
+                result.matched_count += 1
+                result.modified_count += int(doc != before)
+        return result
+
+    async def bulk_write(self, requests, ordered=True):
+        result = FakeResult()
+        for request in requests:
+            if isinstance(request, InsertOne):
+                await self.insert_one(request._doc)
+                result.inserted_count += 1
+            elif isinstance(request, UpdateOne):
+                outcome = await self.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+                result.matched_count += outcome.matched_count
+                result.modified_count += outcome.modified_count
+                result.upserted_count += outcome.upserted_count
+        return result
+
+    async def delete_one(self, query):
+        for index, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[index]
+                return
+
+    def aggregate(self, pipeline):
+        """$match followed by a {"_id": None} $group of $sum fields"""
+        docs = [doc for doc in self.docs if matches(doc, pipeline[0]["$match"])]
+        if not docs:
+            return FakeCursor([])
+        group = {"_id": None}
+        for field, accumulator in pipeline[1]["$group"].items():
+            if field != "_id":
+                group[field] = sum(doc.get(accumulator["$sum"].lstrip("$"), 0) for doc in docs)
+        return FakeCursor([group])
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+
+class FakeUpload:
+    def __init__(self, files, file_id):
+        self.files = files
+        self.file_id = file_id
+        self.buffer = io.BytesIO()
+
+    async def write(self, block):
+        self.buffer.write(block)
+
+    async def close(self):
+        self.files[self.file_id] = self.buffer.getvalue()
+
+
+class FakeDownload:
+    def __init__(self, content, chunk_size):
+        self.content = io.BytesIO(content)
+        self.chunk_size = chunk_size
+
+    async def readchunk(self):
+        return self.content.read(self.chunk_size)
+
+
+class FakeBucket:
+    def __init__(self, chunk_size=1024):
+        self.files = {}
+        self.chunk_size = chunk_size
+
+    def open_upload_stream_with_id(self, file_id, filename):
+        return FakeUpload(self.files, file_id)
+
+    async def open_download_stream(self, file_id):
+        if file_id not in self.files:
+            raise NoFile(file_id)
+        return FakeDownload(self.files[file_id], self.chunk_size)
+
+    async def delete(self, file_id):
+        if self.files.pop(file_id, None) is None:
+            raise NoFile(file_id)
@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import server
+
+from .conftest import FakeCollection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeTemplates(FakeCollection):
+    def __init__(self, existing):
+        super().__init__(existing)
+        self.insert_calls = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls.append(list(docs))
+
+
+class FakeDB:
+    def __init__(self, templates):
+        self.equipment_templates = templates
+
+
+def test_parallel_bulk_upload_dedupes_in_memory_and_batches_inserts(monkeypatch, memory_parse_cache):
+    templates = FakeTemplates([{"equipment_type": "CARASKAL", "template_type": "FORM", "is_active": True}])
+    monkeypatch.setattr(server, "db", FakeDB(templates))
+    with open(os.path.join(ROOT, "forklift_test.docx"), "rb") as f:
+        content = f.read()
+    uploads = [
+        ("FORKLIFT MUAYENE FORMU.docx", content),
+        ("FORKLIFT FORM KOPYA.docx", content),
+        ("CARASKAL MUAYENE FORMU.docx", content),
+        ("FORKLIFT MUAYENE RAPORU.docx", content),
+        ("notes.txt", b"x"),
+    ]
+    user = server.User(username="admin", email="a@b.c", full_name="Admin", role="admin")
+
+    async def collect():
+        return [result async for result in server.bulk_template_upload_results(uploads, user)]
+
+    try:
+        results = asyncio.run(collect())
+    finally:
+        server.shutdown_template_parse_pool()
+
+    by_name = {result["filename"]: result for result in results}
+    assert len(results) == len(uploads)
+    assert by_name["notes.txt"]["status"] == "failed"
+    assert by_name["CARASKAL MUAYENE FORMU.docx"]["status"] == "failed"
+    assert by_name["FORKLIFT MUAYENE RAPORU.docx"]["status"] == "successful"
+    forklift_forms = [by_name["FORKLIFT MUAYENE FORMU.docx"], by_name["FORKLIFT FORM KOPYA.docx"]]
+    assert sorted(result["status"] for result in forklift_forms) == ["failed", "successful"]
+
+    inserted = [doc for call in templates.insert_calls for doc in call]
+    assert len(inserted) == 2
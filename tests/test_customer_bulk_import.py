@@ -0,0 +1,392 @@
+import asyncio
+import random
+import time
+import tracemalloc
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import server
+from server import BULK_IMPORT_COLUMNS, prepare_import_rows
+
+from .conftest import FakeCollection
+
+
+def legacy_prepare_rows(df):
+    """The per-row iterrows/clean_value normalization that prepare_import_rows replaced"""
+    rows, warnings = [], []
+    for index, row in df.iterrows():
+        customer_name = str(row.get('Müşteri Adı', '')).strip()
+        customer_address = str(row.get('Müşteri Adresi', '')).strip()
+        if not customer_name or customer_name == 'nan' or customer_name == '-':
+            warnings.append((index + 2, f"Satır {index + 2}: Müşteri adı boş, atlanıyor"))
+            continue
+        if not customer_address or customer_address == 'nan' or customer_address == '-':
+            warnings.append((index + 2, f"Satır {index + 2}: Müşteri adresi boş, atlanıyor"))
+            continue
+
+        def clean_value(val):
+            if pd.isna(val) or str(val).strip() in ['', 'nan', '-']:
+                return None
+            return str(val).strip()
+
+        equipment_info = {}
+        if clean_value(row.get('Muayene Alanı')) or clean_value(row.get('Muayene Alt Alanı')):
+            equipment_info = {field: clean_value(row.get(column))
+                              for field, column in server.BULK_IMPORT_EQUIPMENT_FIELDS.items()}
+        rows.append((index + 2, customer_name, customer_address, equipment_info))
+    return rows, warnings
+
+
+def import_frame(rows, seed=3):
+    rng = random.Random(seed)
+    messy = ["", "  ", "nan", "-", " - ", np.nan]
+    data = []
+    for index in range(rows):
+        def value(text):
+            return rng.choice(messy) if rng.random() < 0.15 else f"  {text} "
+        data.append([
+            value("Kaldırma ve İndirme Ekipmanları"), value(rng.choice(["CARASKAL", "İSKELE", "FORKLIFT"])),
+            value("PERİYODİK"), value("TSE EN 280"),
+            pd.Timestamp("2025-01-15") if rng.random() < 0.5 else value("2025-01-15"),
+            value("Zorunlu Alan"), value(f"Firma {index % 97} Ltd. Şti."), value("İstanbul, Türkiye"),
+            value("Mehmet Yılmaz"), value("İstanbul"), rng.choice([2024, 2025.5, np.nan]), value("Ali Koç"),
+        ])
+    return pd.DataFrame(data, columns=BULK_IMPORT_COLUMNS)
+
+
+def test_vectorized_cleaning_matches_row_loop():
+    df = import_frame(2000)
+    rows, warnings = prepare_import_rows(df)
+    legacy_rows, legacy_warnings = legacy_prepare_rows(df)
+
+    assert rows == legacy_rows
+    assert sorted(warnings) == legacy_warnings
+    assert warnings and any(not row[3] for row in rows)
+
+
+def test_datetime_columns_keep_timestamp_text():
+    df = import_frame(20)
+    df['Muayene Tarihi'] = pd.to_datetime("2025-03-01")
+    rows, _ = prepare_import_rows(df)
+    equipment = [row[3] for row in rows if row[3]]
+    assert equipment and all(info["muayene_tarihi"] == "2025-03-01 00:00:00" for info in equipment)
+
+
+@pytest.mark.benchmark
+def test_benchmark_vectorized_cleaning_20k_rows():
+    df = import_frame(20000)
+
+    start = time.perf_counter()
+    prepare_import_rows(df)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_prepare_rows(df)
+    legacy = time.perf_counter() - start
+
+    print(f"\n20k rows: column-wise {vectorized * 1000:.0f} ms, iterrows {legacy * 1000:.0f} ms")
+    assert vectorized * 3 < legacy
+
+
+class FakeCustomers(FakeCollection):
+    def __init__(self, docs, fail_update_of=None):
+        super().__init__([dict(doc, **server.company_name_key_fields(doc["company_name"])) for doc in docs])
+        self.fail_update_of = fail_update_of
+        self.find_calls = []
+        self.bulk_calls = []
+
+    def find(self, query=None, projection=None):
+        self.find_calls.append(query)
+        return super().find(query, projection)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_calls.append((list(requests), ordered))
+        failing = [
+            index for index, request in enumerate(requests)
+            if isinstance(request, UpdateOne) and request._filter.get("id") == self.fail_update_of
+        ]
+        result = await super().bulk_write([request for index, request in enumerate(requests) if index not in failing])
+        if failing:
+            raise BulkWriteError({
+                "writeErrors": [{"index": index, "errmsg": "boom"} for index in failing],
+                "nModified": result.modified_count
+            })
+        return result
+
+
+class FakeDB:
+    def __init__(self, customers):
+        self.customers = customers
+
+
+def equipment(alani, alt):
+    return {field: None for field in server.BULK_IMPORT_EQUIPMENT_FIELDS} | {"muayene_alani": alani, "muayene_alt_alani": alt}
+
+
+def test_import_prefetches_once_and_bulk_writes_in_chunks(monkeypatch):
+    customers = FakeCustomers([
+        {"id": "c1", "company_name": "ABC Ltd.", "equipments": [equipment("Kaldırma", "CARASKAL")]},
+        {"id": "c2", "company_name": "Bozuk A.Ş.", "equipments": []},
+    ], fail_update_of="c2")
+    monkeypatch.setattr(server, "db", FakeDB(customers))
+    monkeypatch.setattr(server, "BULK_IMPORT_WRITE_CHUNK", 2)
+    rows = [
+        (2, "ABC Ltd.", "İstanbul", equipment("Kaldırma", "CARASKAL")),   # already there
+        (3, "ABC Ltd.", "İstanbul", equipment("Kaldırma", "FORKLIFT")),   # $push
+        (4, "Yeni Firma", "Ankara", equipment("İş Güvenliği", "İSKELE")),  # insert
+        (5, "Yeni Firma", "Ankara", equipment("İş Güvenliği", "İSKELE")),  # same file duplicate
+        (6, "Yeni Firma", "Ankara", equipment("Kaldırma", "VINC")),        # folded into the insert
+        (7, "Bozuk A.Ş.", "İzmir", equipment("Kaldırma", "VINC")),         # write fails
+        (8, "ABC Ltd.", "İstanbul", {}),
+    ]
+    user = server.User(username="planlama", email="p@b.c", full_name="Planlama", role="planlama_uzmani")
+
+    successful, errors, warnings = asyncio.run(server.write_customer_import(rows, user.id))
+
+    assert len(customers.find_calls) == 1
+    assert [len(requests) for requests, _ in customers.bulk_calls] == [2, 1]
+    assert all(ordered is False for _, ordered in customers.bulk_calls)
+    inserted = [request._doc for requests, _ in customers.bulk_calls for request in requests
+                if isinstance(request, InsertOne)]
+    assert len(inserted) == 1
+    assert [eq["muayene_alt_alani"] for eq in inserted[0]["equipments"]] == ["İSKELE", "VINC"]
+    assert all(eq["key"] == server.equipment_key(eq) for eq in inserted[0]["equipments"])
+
+    assert successful == 6
+    assert [(error["row"], error["error"]) for error in errors] == [(7, "boom")]
+    assert sorted(row for row, _ in warnings) == [2, 3, 5, 6]
+
+
+def test_equipment_merge_is_a_single_conditional_push():
+    first = equipment("Kaldırma", "CARASKAL")
+    key = server.equipment_key(first)
+    assert key == server.equipment_key(dict(first, referans="TS 498"))  # only area/sub-area count
+    assert key != server.equipment_key(equipment("Kaldırma", "VINC"))
+
+    entry = {"key": key, **first}
+    operation = server.equipment_merge_operation("c1", entry)
+    assert operation._doc == {"$push": {"equipments": entry}}
+    assert operation._filter["id"] == "c1"
+    conditions = operation._filter["equipments"]["$not"]["$elemMatch"]["$or"]
+    assert conditions[0] == {"key": key}
+    assert conditions[1] == {"key": {"$exists": False}, "muayene_alani": "Kaldırma", "muayene_alt_alani": "CARASKAL"}
+
+
+def test_merge_warnings_follow_what_the_write_changed(monkeypatch):
+    customers = FakeCustomers([
+        {"id": "c1", "company_name": "ABC Ltd.", "equipments": []},
+        {"id": "c2", "company_name": "Eski Kayıt A.Ş.", "equipments": None},
+    ])
+    monkeypatch.setattr(server, "db", FakeDB(customers))
+    asyncio.run(server.ensure_customer_equipment_arrays())
+    assert customers.docs[1]["equipments"] == []
+
+    bulk_write = customers.bulk_write
+    racing = equipment("Kaldırma", "CARASKAL")
+
+    async def concurrent_import_lands_first(requests, ordered=True):
+        customers.docs[0]["equipments"].append({"key": server.equipment_key(racing), **racing})
+        return await bulk_write(requests, ordered)
+
+    monkeypatch.setattr(customers, "bulk_write", concurrent_import_lands_first)
+    rows = [
+        (2, "ABC Ltd.", "İstanbul", racing),
+        (3, "ABC Ltd.", "İstanbul", equipment("Kaldırma", "FORKLIFT")),
+        (4, "Eski Kayıt A.Ş.", "İzmir", equipment("Kaldırma", "VINC")),
+    ]
+
+    successful, errors, warnings = asyncio.run(server.write_customer_import(rows, "user-1"))
+
+    assert successful == 3 and not errors
+    assert sorted(warnings) == [
+        (2, "Satır 2: Müşteri ve ekipman bilgisi zaten mevcut"),
+        (3, "Satır 3: Müşteri mevcut, yeni ekipman bilgisi eklendi"),
+        (4, "Satır 4: Müşteri mevcut, yeni ekipman bilgisi eklendi"),
+    ]
+    assert [eq["muayene_alt_alani"] for eq in customers.docs[0]["equipments"]] == ["CARASKAL", "FORKLIFT"]
+    assert [eq["muayene_alt_alani"] for eq in customers.docs[1]["equipments"]] == ["VINC"]
+
+
+def text_frame(rows):
+    df = import_frame(rows)
+    df['Rapor Onay Tarihi'] = "2025-01-20"  # keep every column text so both readers agree on it
+    return df
+
+
+def streamed_rows(path, filename, chunk_rows):
+    rows, warnings = [], []
+    for frame, _ in server.iter_import_frames(path, filename, chunk_rows):
+        chunk_rows_, chunk_warnings = prepare_import_rows(frame)
+        rows += chunk_rows_
+        warnings += chunk_warnings
+    return rows, sorted(warnings)
+
+
+def test_streamed_chunks_match_whole_file_read(tmp_path):
+    df = text_frame(1000)
+    csv_path = tmp_path / "liste.csv"
+    xlsx_path = tmp_path / "liste.xlsx"
+    df.to_csv(csv_path, index=False)
+    df.to_excel(xlsx_path, index=False, engine='openpyxl')
+
+    for path, whole in [
+        (csv_path, pd.read_csv(csv_path)),
+        (xlsx_path, pd.read_excel(xlsx_path, engine='openpyxl')),
+    ]:
+        rows, warnings = prepare_import_rows(whole)
+        assert streamed_rows(str(path), path.name, 64) == (rows, sorted(warnings)), path.name
+
+
+def test_xlsx_stream_numbers_sheet_rows_and_resumes(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(BULK_IMPORT_COLUMNS)
+    for index in range(6):
+        if index == 2:
+            sheet.append([None] * 12)  # blank row in the middle of the data
+        sheet.append(["Kaldırma", f"ALT {index}"] + ["x"] * 4 + [f"Firma {index}", "Ankara"] + ["x"] * 4)
+    path = tmp_path / "liste.xlsx"
+    workbook.save(path)
+
+    chunks = list(server.iter_import_frames(str(path), path.name, chunk_rows=2))
+    assert [list(frame.index + 2) for frame, _ in chunks] == [[2, 3], [5, 6], [7, 8]]
+    assert [position for _, position in chunks] == [2, 5, 7]
+
+    resumed = list(server.iter_import_frames(str(path), path.name, chunk_rows=2, skip_rows=5))
+    assert [list(frame.index + 2) for frame, _ in resumed] == [[7, 8]]
+    assert server.estimate_import_rows(str(path), path.name) == 7
+
+    csv_path = tmp_path / "liste.csv"
+    text_frame(10).to_csv(csv_path, index=False)
+    resumed = list(server.iter_import_frames(str(csv_path), csv_path.name, chunk_rows=4, skip_rows=6))
+    assert [(list(frame.index), position) for frame, position in resumed] == [([6, 7], 8), ([8, 9], 10)]
+    assert server.estimate_import_rows(str(csv_path), csv_path.name) == 10
+
+
+def test_streamed_csv_peak_memory_stays_flat(tmp_path):
+    def peak(rows):
+        path = tmp_path / f"liste_{rows}.csv"
+        text_frame(rows).to_csv(path, index=False)
+        tracemalloc.start()
+        try:
+            for frame, _ in server.iter_import_frames(str(path), path.name, chunk_rows=1000):
+                prepare_import_rows(frame)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(4000), peak(32000)
+    print(f"\nstreamed CSV peak: 4k rows {small / 1024:.0f} KiB, 32k rows {large / 1024:.0f} KiB")
+    assert large < small * 1.5
+
+
+def test_dry_run_diff_carries_new_customers_across_chunks(tmp_path, monkeypatch):
+    customers = FakeCustomers([
+        {"id": "c1", "company_name": "ABC Ltd.", "equipments": [equipment("Kaldırma", "CARASKAL")]},
+    ])
+    monkeypatch.setattr(server, "db", FakeDB(customers))
+    monkeypatch.setattr(server, "IMPORT_READ_CHUNK_ROWS", 2)
+    sheet = text_frame(5)
+    sheet['Müşteri Adresi'] = "İstanbul"
+    sheet['Muayene Alanı'] = "Kaldırma"
+    sheet['Müşteri Adı'] = ["ABC Ltd.", "ABC Ltd.", "Yeni Firma", "Yeni Firma", None]
+    sheet['Muayene Alt Alanı'] = ["CARASKAL", "FORKLIFT", "İSKELE", "İSKELE", "VINC"]
+    path = tmp_path / "liste.csv"
+    sheet.to_csv(path, index=False)
+
+    diff = asyncio.run(server.diff_customer_import(str(path), path.name))
+
+    assert customers.bulk_calls == []
+    # "Yeni Firma" is new in the second chunk and only looked up once
+    assert [sorted(query["company_name_key"]["$in"]) for query in customers.find_calls] == [["abc"], ["yeni firma"]]
+    assert (diff.total_rows, diff.new_customers, diff.new_equipments, diff.unchanged_rows, diff.skipped_rows) == (5, 1, 2, 2, 1)
+    assert [change["row"] for change in diff.new_equipment_list] == [3, 4]
+    assert diff.new_customer_list == [{"row": 4, "company_name": "Yeni Firma", "address": "İstanbul"}]
+
+
+def test_dry_run_response_is_documented_and_returned_as_diff(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "db", FakeDB(FakeCustomers([])))
+    schema = server.app.openapi()["paths"]["/api/customers/bulk-import"]["post"]["responses"]["200"]
+    refs = {option["$ref"].rsplit("/", 1)[-1] for option in schema["content"]["application/json"]["schema"]["anyOf"]}
+    assert refs == {"BulkImportResult", "BulkImportDiff"}
+
+    sheet = text_frame(3)
+    sheet['Müşteri Adresi'] = "İstanbul"
+    sheet['Müşteri Adı'] = "Yeni Firma"
+    path = tmp_path / "liste.csv"
+    sheet.to_csv(path, index=False)
+    user = server.User(username="planlama", email="p@b.c", full_name="Planlama", role="planlama_uzmani")
+    with open(path, "rb") as f:
+        upload = server.UploadFile(file=f, filename="liste.csv")
+        diff = asyncio.run(server.bulk_import_customers(upload, False, True, False, user))
+    assert isinstance(diff, server.BulkImportDiff) and diff.dry_run
+    assert (diff.total_rows, diff.new_customers) == (3, 1)
+
+
+@pytest.mark.benchmark
+def test_benchmark_dry_run_10k_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "db", FakeDB(FakeCustomers([
+        {"id": f"c{index}", "company_name": f"Firma {index} Ltd. Şti.", "equipments": [equipment("Kaldırma ve İndirme Ekipmanları", "CARASKAL")]}
+        for index in range(0, 97, 2)
+    ])))
+    path = tmp_path / "liste.csv"
+    text_frame(10000).to_csv(path, index=False)
+
+    start = time.perf_counter()
+    diff = asyncio.run(server.diff_customer_import(str(path), path.name))
+    elapsed = time.perf_counter() - start
+
+    print(f"\n10k row dry run: {elapsed * 1000:.0f} ms, {diff.new_customers} new customers, "
+          f"{diff.new_equipments} new equipment, {diff.unchanged_rows} unchanged")
+    assert diff.total_rows == 10000
+    assert diff.new_customers + diff.unchanged_rows + diff.skipped_rows <= 10000
+    assert elapsed < 1.0
+
+
+def test_template_download_streams_cached_xlsx(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "_bulk_import_template", None)
+    user = server.User(username="planlama", email="p@b.c", full_name="Planlama", role="planlama_uzmani")
+
+    async def download():
+        response = await server.download_bulk_import_template(user)
+        return response, b"".join([block async for block in response.body_iterator])
+
+    response, content = asyncio.run(download())
+    assert response.media_type == server.XLSX_MEDIA_TYPE
+    assert response.headers["content-disposition"] == 'attachment; filename="musteri_listesi_template.xlsx"'
+    assert int(response.headers["content-length"]) == len(content)
+    assert server.bulk_import_template() is server.bulk_import_template()
+
+    path = tmp_path / "template.xlsx"
+    path.write_bytes(content)
+    frames = list(server.iter_import_frames(str(path), path.name))
+    rows, warnings = prepare_import_rows(frames[0][0])
+    assert [(row, name) for row, name, _, _ in rows] == [(2, "ABC İnşaat Ltd. Şti."), (3, "XYZ Yapı A.Ş.")]
+    assert rows[0][3]["muayene_alt_alani"] == "CARASKAL" and not warnings
+
+
+def test_import_matches_customers_by_normalized_name(monkeypatch):
+    customers = FakeCustomers([
+        {"id": "c1", "company_name": "ABC İnşaat Ltd. Şti.", "equipments": []},
+    ])
+    monkeypatch.setattr(server, "db", FakeDB(customers))
+    rows = [
+        (2, "ABC INSAAT LTD STI", "İstanbul", equipment("Kaldırma", "CARASKAL")),
+        (3, "Yeni Yapı A.Ş.", "Ankara", {}),
+        (4, "YENI YAPI AS", "Ankara", equipment("Kaldırma", "VINC")),
+    ]
+
+    successful, errors, warnings = asyncio.run(server.write_customer_import(rows, "user-1"))
+
+    assert successful == 3 and not errors
+    requests = [request for batch, _ in customers.bulk_calls for request in batch]
+    assert [type(request) for request in requests] == [UpdateOne, InsertOne]
+    assert requests[0]._filter["id"] == "c1"
+    assert requests[1]._doc["company_name_key"] == "yeni yapi"
+    assert len(requests[1]._doc["equipments"]) == 1
+    assert "Satır 2: 'ABC INSAAT LTD STI' mevcut müşteri 'ABC İnşaat Ltd. Şti.' ile eşleştirildi" in [message for _, message in warnings]
@@ -0,0 +1,80 @@
+import random
+import time
+
+import pytest
+
+import server
+from server import CompanyNameIndex, normalize_company_name
+
+
+def test_turkish_spellings_and_legal_suffixes_share_a_key():
+    assert normalize_company_name("ABC İnşaat Ltd. Şti.") == "abc insaat"
+    assert normalize_company_name("ABC INSAAT LTD STI") == "abc insaat"
+    assert normalize_company_name("abc inşaat limited şirketi") == "abc insaat"
+    assert normalize_company_name("XYZ Yapı A.Ş.") == normalize_company_name("XYZ YAPI AŞ") == "xyz yapi"
+    assert normalize_company_name("Çelik Döküm San. ve Tic. A.Ş.") == "celik dokum"
+    assert normalize_company_name("Güneş-Enerji (Ankara)") == "gunes enerji ankara"
+    # A name made only of a legal word keeps it
+    assert normalize_company_name("A.Ş.") == "a s"
+    assert normalize_company_name("ABC Ltd.") != normalize_company_name("ABD Ltd.")
+
+
+def test_trade_words_are_kept_unless_a_legal_form_follows():
+    assert normalize_company_name("Demir Sanayi") != normalize_company_name("Demir Ticaret")
+    assert normalize_company_name("Demir Sanayi") == "demir sanayi"
+    assert normalize_company_name("Öz Kom") == "oz kom"
+    assert normalize_company_name("Demir Ticaret Ltd. Şti.") == "demir ticaret"
+    assert normalize_company_name("Demir San. ve Tic. Ltd. Şti.") == normalize_company_name("DEMİR SANAYİ VE TİCARET A.Ş.") == "demir"
+    assert normalize_company_name("Öz Kom. Şti.") == "oz"
+
+
+def test_names_without_latin_letters_only_match_themselves():
+    assert normalize_company_name("ООО Ромашка") == "=ООО Ромашка"
+    assert normalize_company_name("ООО  Ромашка ") == normalize_company_name("ООО Ромашка")
+    assert normalize_company_name("شركة النور") != normalize_company_name("ООО Ромашка")
+    assert normalize_company_name("   ") == ""
+
+    rows = [
+        (2, "ООО Ромашка", "Moskova", {}),
+        (3, "شركة النور", "Dubai", {}),
+        (4, "ООО Ромашка", "Moskova", {}),
+    ]
+    customers = {}
+    pending, unchanged, _ = server.plan_customer_import(rows, customers, "user-1")
+    assert [write["document"]["company_name"] for write in pending] == ["ООО Ромашка", "شركة النور"]
+    assert unchanged == [4]
+
+
+def synthetic_names(count, seed=5):
+    rng = random.Random(seed)
+    words = ["Anadolu", "Marmara", "Ege", "Yıldız", "Özgür", "Kuzey", "Demir", "Çelik", "Işık", "Güven",
+             "Mavi", "Doğu", "Batı", "Ufuk", "Zirve", "Köprü", "Teknik", "Makine", "Vinç", "Yapı"]
+    suffixes = ["Ltd. Şti.", "A.Ş.", "San. ve Tic. Ltd. Şti.", "İnşaat A.Ş.", ""]
+    return [f"{rng.choice(words)} {rng.choice(words)} {index} {rng.choice(suffixes)}".strip() for index in range(count)]
+
+
+def test_fuzzy_candidates_find_near_duplicates():
+    index = CompanyNameIndex()
+    for position, name in enumerate(["ABC İnşaat Ltd. Şti.", "ABD Yapı A.Ş.", "Marmara Vinç San. ve Tic. A.Ş."]):
+        index.add(f"c{position}", name)
+
+    assert index.candidates("A.B.C. INSAAT")[0][1:] == ("c0", "ABC İnşaat Ltd. Şti.")
+    assert index.candidates("Marmara Vinc")[0][1] == "c2"
+    assert index.candidates("Tamamen Farklı Bir Firma") == []
+
+
+@pytest.mark.benchmark
+def test_benchmark_candidate_lookup_over_100k_customers():
+    names = synthetic_names(100000)
+    index = CompanyNameIndex()
+    for position, name in enumerate(names):
+        index.add(f"c{position}", name)
+
+    queries = [names[position].upper().replace("İ", "I").replace(".", "") for position in range(0, 100000, 1000)]
+    start = time.perf_counter()
+    results = [index.candidates(query, limit=3) for query in queries]
+    elapsed = time.perf_counter() - start
+
+    print(f"\n100k customers: {elapsed / len(queries) * 1000:.1f} ms per fuzzy lookup")
+    assert all(result and result[0][1] == f"c{position * 1000}" for position, result in enumerate(results))
+    assert elapsed / len(queries) < 0.25
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from fastapi import Response
+
+import server
+from server import (
+    CompiledFormValidator,
+    InspectionFormResult,
+    get_caraskal_template,
+    get_form_validator,
+)
+
+from .conftest import FakeCollection
+
+
+def caraskal_template():
+    template = get_caraskal_template()
+    template["id"] = "caraskal"
+    template["updated_at"] = "v1"
+    return template
+
+
+def full_submission(template):
+    results = []
+    for category in template["categories"]:
+        for item in category["items"]:
+            value = "U" if item["input_type"] == "dropdown" else "1250"
+            results.append(InspectionFormResult(item_id=item["id"], category=category["code"], value=value))
+    return results
+
+
+def test_valid_submission_has_no_errors():
+    template = caraskal_template()
+    assert CompiledFormValidator(template).validate(full_submission(template)) == []
+
+
+def test_structured_errors():
+    template = caraskal_template()
+    results = full_submission(template)[2:]  # items 1 and 2 missing
+    results[0] = InspectionFormResult(item_id=3, category="B", value="U")
+    results[1] = InspectionFormResult(item_id=4, category="A", value="OK")
+    results.append(InspectionFormResult(item_id=999, category="A", value="U"))
+    results.append(InspectionFormResult(item_id=5, category="A", value="UY"))
+
+    errors = CompiledFormValidator(template).validate(results)
+    codes = {(error["item_id"], error["code"]) for error in errors}
+
+    assert codes == {
+        (3, "category_mismatch"),
+        (4, "invalid_value"),
+        (999, "unknown_item"),
+        (5, "duplicate_item"),
+        (1, "missing_required"),
+        (2, "missing_required"),
+    }
+
+
+def test_validator_compiled_once_per_template_version():
+    template = caraskal_template()
+    first = get_form_validator(template)
+    assert get_form_validator(dict(template)) is first
+    assert get_form_validator(dict(template, updated_at="v2")) is not first
+
+
+class FakeDB:
+    def __init__(self):
+        template = dict(caraskal_template(), id="tpl-caraskal", version=1, is_active=True)
+        self.equipment_templates = FakeCollection([template])
+        self.inspections = FakeCollection([server.Inspection(
+            id="insp-1", customer_id="c1", equipment_info={"equipment_type": "CARASKAL"},
+            inspector_id="u-denetci", planned_date=datetime(2025, 3, 1), created_by="planlama"
+        ).dict()])
+
+
+def test_saved_forms_store_canonical_dropdown_values(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(server, "db", fake)
+    user = server.User(username="teknik", email="t@b.c", full_name="Teknik", role="teknik_yonetici")
+    results = full_submission(caraskal_template())
+    results[0].value = "UY"
+    form = server.InspectionFormData(general_info={}, equipment_info={}, form_results=results)
+
+    asyncio.run(server.save_inspection_form("insp-1", form, Response(), False, None, user))
+    stored = fake.inspections.docs[0]["report_data"]["form_results"]
+    assert stored[0]["value"] == "U.Y" and stored[1]["value"] == "U"
+
+    edited = {"form_data": {"1": {"value": "UY", "comment": "eski"}, "2": {"value": "UD"}}}
+    asyncio.run(server.update_inspection_form("insp-1", edited, Response(), False, None, user))
+    assert fake.inspections.docs[0]["report_data"]["form_data"] == {
+        "1": {"value": "U.Y", "comment": "eski"}, "2": {"value": "UD"}
+    }
+
+
+@pytest.mark.benchmark
+def test_benchmark_caraskal_validation():
+    template = caraskal_template()
+    submission = full_submission(template)
+    rounds = 2000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        CompiledFormValidator(template).validate(submission)
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        get_form_validator(template).validate(submission)
+    cached = time.perf_counter() - start
+
+    per_call_ms = cached / rounds * 1000
+    print(f"\nCARASKAL ({len(submission)} items): compiled {per_call_ms:.3f} ms/save, "
+          f"re-walking template {uncached / rounds * 1000:.3f} ms/save")
+    assert per_call_ms < 1.0
+    assert cached < uncached
@@ -0,0 +1,242 @@
+import asyncio
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import UploadFile
+
+import server
+from server import BULK_IMPORT_COLUMNS
+
+from .conftest import FakeBucket, FakeCollection
+
+
+class FakeDB:
+    def __init__(self):
+        self.jobs = FakeCollection()
+        self.import_ledger = FakeCollection()
+        self.customers = FakeCollection()
+        self.job_files = FakeBucket(chunk_size=7)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(server, "db", fake)
+    monkeypatch.setattr(server, "job_files_bucket", lambda: fake.job_files)
+    monkeypatch.setattr(server, "IMPORT_JOB_CHUNK_ROWS", 3)
+    return fake
+
+
+def import_csv(rows=10):
+    lines = [",".join(BULK_IMPORT_COLUMNS)]
+    for index in range(rows):
+        name = "" if index == 4 else f"Firma {index % 4}"
+        lines.append(f"Kaldırma,ALT {index},PERİYODİK,TS 498,2025-01-15,Zorunlu,{name},İstanbul,Ali,İstanbul,,")
+    return "\n".join(lines).encode("utf-8")
+
+
+def upload(content, filename="liste.csv"):
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+def test_job_runs_in_chunks_and_reports_progress(fake_db):
+    async def scenario():
+        job = await server.create_import_job(upload(import_csv()), "user-1")
+        await server.run_import_job(job["id"])
+        return job["id"]
+
+    job_id = asyncio.run(scenario())
+    job = fake_db.jobs.docs[0]
+
+    assert job["status"] == "completed"
+    assert (job["total_rows"], job["processed_rows"]) == (10, 10)
+    assert job["successful_imports"] == 9 and job["failed_imports"] == 0
+    assert job["warnings"][0] == "Satır 6: Müşteri adı boş, atlanıyor"
+    assert fake_db.job_files.files == {}  # the upload is dropped once the job finished
+    assert len(fake_db.customers.docs) == 4
+    assert all(customer["imported_by"] == "user-1" for customer in fake_db.customers.docs)
+
+    view = server.import_job_progress(job)
+    assert view["id"] == job_id and view["progress"] == 100.0 and view["eta_seconds"] == 0
+    assert view["rows_per_second"] is not None
+    assert "lease_until" not in view and "run_id" not in view
+
+
+def test_job_resumes_after_restart_from_last_chunk(fake_db, monkeypatch):
+    write_customer_import = server.write_customer_import
+    calls = []
+
+    async def dies_on_second_chunk(rows, imported_by):
+        calls.append([row[0] for row in rows])
+        if len(calls) == 2:
+            raise asyncio.CancelledError  # the process went away mid-chunk
+        return await write_customer_import(rows, imported_by)
+
+    monkeypatch.setattr(server, "write_customer_import", dies_on_second_chunk)
+    job = asyncio.run(server.create_import_job(upload(import_csv()), "user-1"))
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(server.run_import_job(job["id"]))
+
+    stored = fake_db.jobs.docs[0]
+    assert stored["status"] == "running" and stored["processed_rows"] == 3
+    assert stored["total_rows"] == 10  # estimated from the line count before parsing
+
+    # Another worker may not take the job while the lease is held
+    assert asyncio.run(server.claim_import_job(job["id"])) is None
+
+    stored["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+    async def restart():
+        await server.resume_import_jobs()
+        await asyncio.gather(*server._import_job_tasks)
+
+    asyncio.run(restart())
+
+    stored = fake_db.jobs.docs[0]
+    assert calls[2:] == [[5, 7], [8, 9, 10], [11]]
+    assert stored["status"] == "completed"
+    assert (stored["processed_rows"], stored["successful_imports"]) == (10, 9)
+    assert stored["run_start_rows"] == 3
+    assert stored["warnings"].count("Satır 6: Müşteri adı boş, atlanıyor") == 1
+
+
+def test_progress_reports_rate_and_eta():
+    started = datetime(2025, 1, 1, 12, 0, 0)
+    job = {
+        "id": "job-1", "status": "running", "total_rows": 1000, "processed_rows": 400,
+        "run_start_rows": 200, "run_started_at": started, "finished_at": None
+    }
+    view = server.import_job_progress(job, now=started + timedelta(seconds=10))
+    assert view["rows_per_second"] == 20.0
+    assert view["eta_seconds"] == 30.0
+    assert view["progress"] == 40.0
+
+
+def test_reuploads_only_process_changed_rows(fake_db, monkeypatch):
+    write_customer_import = server.write_customer_import
+    written = []
+
+    async def recording(rows, imported_by):
+        written.append([row[0] for row in rows])
+        return await write_customer_import(rows, imported_by)
+
+    monkeypatch.setattr(server, "write_customer_import", recording)
+
+    async def import_job(content, force=False):
+        job = await server.create_import_job(upload(content), "user-1", force)
+        await server.run_import_job(job["id"])
+        return next(doc for doc in fake_db.jobs.docs if doc["id"] == job["id"])
+
+    first = asyncio.run(import_job(import_csv()))
+    assert first["unchanged_rows"] == 0 and sum(map(len, written)) == 9
+    assert fake_db.import_ledger.docs[0]["complete"] and fake_db.import_ledger.docs[0]["rows"] == 9
+
+    # Same bytes again: answered from the ledger without reading the file
+    written.clear()
+    again = asyncio.run(import_job(import_csv()))
+    assert written == [] and again["status"] == "completed"
+    assert (again["unchanged_rows"], again["processed_rows"]) == (9, 10)
+
+    # Edited copy with the same name: only the changed row is written
+    edited = import_csv().replace(b"ALT 7,", b"ALT 7 YEN\xc4\xb0,")
+    changed = asyncio.run(import_job(edited))
+    assert written == [[9]]
+    assert (changed["successful_imports"], changed["unchanged_rows"]) == (1, 8)
+
+    # force bypasses the ledger
+    written.clear()
+    forced = asyncio.run(import_job(edited, force=True))
+    assert sum(map(len, written)) == 9 and forced["unchanged_rows"] == 0
+
+
+def test_sync_import_skips_rows_recorded_in_ledger(fake_db):
+    user = server.User(username="planlama", email="p@b.c", full_name="Planlama", role="planlama_uzmani")
+
+    def run(content):
+        return asyncio.run(server.bulk_import_customers(
+            file=upload(content), background=False, dry_run=False, force=False, current_user=user
+        ))
+
+    first = run(import_csv())
+    assert (first.successful_imports, first.unchanged_rows) == (9, 0)
+
+    second = run(import_csv())
+    assert (second.successful_imports, second.unchanged_rows) == (0, 9)
+    assert second.warnings == ["Bu dosya daha önce içe aktarıldı, değişen satır yok"]
+
+    third = run(import_csv().replace(b"Firma 1,", b"Firma 5,"))
+    assert (third.successful_imports, third.unchanged_rows) == (3, 6)
+    assert len(fake_db.import_ledger.docs) == 2
+
+
+def test_reupload_retries_rows_that_failed(fake_db, monkeypatch):
+    user = server.User(username="planlama", email="p@b.c", full_name="Planlama", role="planlama_uzmani")
+    write_customer_import = server.write_customer_import
+    written = []
+    failing = {"row": 9}
+
+    async def fails_once(rows, imported_by):
+        failed = [row for row in rows if row[0] == failing.get("row")]
+        if failed:
+            del failing["row"]
+            rows = [row for row in rows if row not in failed]
+        written.append([row[0] for row in rows])
+        successful, errors, warnings = await write_customer_import(rows, imported_by)
+        errors += [{"row": row[0], "error": "Yazma hatası", "data": {}} for row in failed]
+        return successful, errors, warnings
+
+    monkeypatch.setattr(server, "write_customer_import", fails_once)
+
+    def run_sync(content):
+        return asyncio.run(server.bulk_import_customers(
+            file=upload(content), background=False, dry_run=False, force=False, current_user=user
+        ))
+
+    first = run_sync(import_csv())
+    assert (first.successful_imports, first.failed_imports) == (8, 1)
+
+    # Same bytes: the failed row is written, the rest is answered from the ledger
+    written.clear()
+    second = run_sync(import_csv())
+    assert written == [[9]]
+    assert (second.successful_imports, second.failed_imports, second.unchanged_rows) == (1, 0, 8)
+
+    # Once every row went through, the same bytes short-circuit again
+    written.clear()
+    third = run_sync(import_csv())
+    assert written == [] and third.unchanged_rows == 9
+
+    async def import_job(content):
+        job = await server.create_import_job(upload(content), user.id)
+        await server.run_import_job(job["id"])
+        return next(doc for doc in fake_db.jobs.docs if doc["id"] == job["id"])
+
+    edited = import_csv().replace(b"ALT 3,", b"ALT 3 YEN\xc4\xb0,")
+    failing["row"] = 5
+    failed_job = asyncio.run(import_job(edited))
+    assert (failed_job["successful_imports"], failed_job["failed_imports"]) == (0, 1)
+
+    written.clear()
+    retried = asyncio.run(import_job(edited))
+    assert written == [[5]]
+    assert (retried["successful_imports"], retried["failed_imports"], retried["unchanged_rows"]) == (1, 0, 8)
+
+
+def test_ledger_prefers_the_exact_file_and_only_the_uploaders_own_same_name_imports(fake_db):
+    def run(content, username):
+        user = server.User(username=username, email=f"{username}@b.c", full_name=username, role="planlama_uzmani")
+        return asyncio.run(server.bulk_import_customers(
+            file=upload(content), background=False, dry_run=False, force=False, current_user=user
+        ))
+
+    first = run(import_csv(), "ayse")
+    assert first.unchanged_rows == 0
+
+    # Another planner's copy of the same template is not compared against ayse's import
+    other = run(import_csv().replace(b"ALT 7,", b"ALT 7 YEN\xc4\xb0,"), "mehmet")
+    assert (other.successful_imports, other.unchanged_rows) == (9, 0)
+
+    # The exact file wins over the newer import that only shares its name
+    again = run(import_csv(), "ayse")
+    assert (again.successful_imports, again.unchanged_rows) == (0, 9)
+    assert again.warnings == ["Bu dosya daha önce içe aktarıldı, değişen satır yok"]
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError
+
+import server
+
+from .conftest import FakeCollection, FakeCursor
+
+
+class FakeCustomers(FakeCollection):
+    def __init__(self, docs):
+        super().__init__(docs)
+        self.find_calls = 0
+
+    def find(self, query=None, projection=None):
+        self.find_calls += 1
+        return super().find(query, projection)
+
+
+class FakeInspections(FakeCollection):
+    def __init__(self, docs, fail_serial=None):
+        super().__init__(docs)
+        self.fail_serial = fail_serial
+        self.aggregate_calls = 0
+        self.insert_calls = []
+
+    def aggregate(self, pipeline):
+        self.aggregate_calls += 1
+        match = pipeline[0]["$match"]
+        groups = {}
+        for doc in self.docs:
+            if doc["customer_id"] in match["customer_id"]["$in"] and doc["status"] in match["status"]["$in"]:
+                info = doc["equipment_info"]
+                identity = {"customer_id": doc["customer_id"], "equipment_type": info.get("equipment_type"),
+                            "serial_number": info.get("serial_number"), "equipment_key": info.get("equipment_key")}
+                groups[tuple(identity.values())] = {"_id": identity}
+        return FakeCursor(list(groups.values()))
+
+    async def insert_many(self, documents, ordered=True):
+        self.insert_calls.append((len(documents), ordered))
+        errors = []
+        for index, document in enumerate(documents):
+            if document["equipment_info"]["serial_number"] == self.fail_serial:
+                errors.append({"index": index, "errmsg": "boom"})
+            else:
+                document["_id"] = object()
+                self.docs.append(document)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+class FakeDB:
+    def __init__(self, customers, inspections):
+        self.customers = FakeCustomers(customers)
+        self.inspections = FakeInspections(inspections, fail_serial="BOZUK")
+        self.equipment_templates = FakeCollection([
+            {"id": "tpl-c", "version": 3, "equipment_type": "CARASKAL", "is_active": True},
+        ])
+
+
+def equipment(alt, serial=None, keyed=True):
+    entry = {"muayene_alani": "Kaldırma", "muayene_alt_alani": alt}
+    if serial:
+        entry["serial_number"] = serial
+    if keyed:
+        entry = {"key": server.equipment_key(entry), **entry}
+    return entry
+
+
+def planner():
+    return server.User(username="planlama", email="p@b.c", full_name="Planlama", role="planlama_uzmani")
+
+
+def test_batch_skips_active_pairs_and_inserts_the_rest_in_bulk(monkeypatch):
+    customers = [
+        {"id": "c1", "equipments": [equipment("CARASKAL"), equipment("FORKLIFT"), equipment("VINC", keyed=False)]},
+        {"id": "c2", "equipments": [equipment("CARASKAL", serial="SN-1"), equipment("İSKELE", serial="BOZUK")]},
+    ]
+    active = [
+        # planned earlier from the same equipment record
+        {"customer_id": "c1", "status": "beklemede",
+         "equipment_info": {"equipment_type": "FORKLIFT", "equipment_key": server.equipment_key(equipment("FORKLIFT"))}},
+        # created through the single form with the same serial number
+        {"customer_id": "c2", "status": "devam_ediyor",
+         "equipment_info": {"equipment_type": "CARASKAL", "serial_number": "SN-1"}},
+        # finished inspections do not block a new one
+        {"customer_id": "c1", "status": "onaylandi",
+         "equipment_info": {"equipment_type": "CARASKAL", "equipment_key": server.equipment_key(equipment("CARASKAL"))}},
+    ]
+    fake = FakeDB(customers, active)
+    monkeypatch.setattr(server, "db", fake)
+    monkeypatch.setattr(server, "INSPECTION_BATCH_WRITE_CHUNK", 2)
+
+    batch = server.InspectionBatchCreate(
+        items=[
+            {"customer_id": "c1"},
+            {"customer_id": "c2"},
+            {"customer_id": "c1", "equipment_keys": [server.equipment_key(equipment("CARASKAL")), "yok"],
+             "inspector_id": "denetci-2"},
+            {"customer_id": "c9"},
+        ],
+        inspector_id="denetci-1",
+        planned_date=datetime(2025, 3, 1),
+    )
+    result = asyncio.run(server.create_inspections_batch(batch, planner()))
+
+    assert fake.customers.find_calls == 1 and fake.inspections.aggregate_calls == 1
+    assert fake.inspections.insert_calls == [(2, False), (1, False)]
+    assert result.requested == 8
+    assert [(entry["item"], entry["reason"]) for entry in result.skipped] == [
+        (0, "active_inspection_exists"), (1, "active_inspection_exists"), (1, "write_failed"),
+        (2, "equipment_not_found"), (2, "active_inspection_exists"), (3, "customer_not_found"),
+    ]
+
+    created = {inspection.equipment_info["equipment_type"]: inspection for inspection in result.inspections}
+    assert sorted(created) == ["CARASKAL", "VINC"] and result.created == 2
+    assert created["CARASKAL"].template_id == "tpl-c" and created["CARASKAL"].template_version == 3
+    assert created["VINC"].template_id is None
+    assert all(inspection.inspector_id == "denetci-1" and inspection.status == "beklemede"
+               for inspection in result.inspections)
+    assert created["VINC"].equipment_info["equipment_key"] == server.equipment_key(equipment("VINC"))
@@ -0,0 +1,236 @@
+import asyncio
+import io
+import time
+from datetime import datetime
+
+import pdfplumber
+import pytest
+from fastapi import HTTPException
+from PyPDF2 import PdfReader
+
+import server
+
+from .conftest import FakeBucket, FakeCollection
+
+
+def caraskal_items():
+    return [item for category in server.get_caraskal_template()["categories"] for item in category["items"]]
+
+
+def approved_inspection(status="onaylandi"):
+    values = ["U", "UD", "U.Y"]
+    return {
+        "id": "3f1c2a9e-insp", "customer_id": "c1", "inspector_id": "u-denetci", "approved_by": "u-teknik",
+        "status": status, "planned_date": datetime(2025, 3, 1), "approved_at": datetime(2025, 3, 5),
+        "equipment_info": {"equipment_type": "CARASKAL", "serial_number": "CR-2024-001", "capacity": "2 ton"},
+        "report_data": {
+            "general_info": {"muayene_tarihi": "2025-03-03", "muayene_turu": "PERİYODİK"},
+            "equipment_info": {"marka": "Demag"},
+            "measurement_tools": [{"adi": "Dinamometre", "seri_no": "DN-7"}],
+            "form_results": [
+                {"item_id": item["id"], "category": item["category"], "value": values[item["id"] % 3],
+                 "comment": "Zincir aşınmış, değiştirilmeli" if item["id"] % 3 == 1 else None}
+                for item in caraskal_items()
+            ],
+            "defects": "Kanca emniyet mandalı kırık; zincir aşınması sınırda.",
+            "conclusion": "SAKINCALI - Kusurlar giderilmeden kullanılmamalıdır.",
+        },
+        "version": 4, "created_by": "planlama", "created_at": datetime(2025, 2, 1), "updated_at": datetime(2025, 3, 5),
+    }
+
+
+def report_context(inspection=None):
+    template = dict(server.get_caraskal_template(), id="tpl-1", name="CARASKAL MUAYENE FORMU")
+    customer = {"id": "c1", "company_name": "Yıldız Çelik İnşaat A.Ş.", "address": "İzmir", "contact_person": "Şule Işık"}
+    users = {"u-denetci": {"full_name": "Mehmet Yılmaz"}, "u-teknik": {"full_name": "Ali Koç"}}
+    return server.build_report_context(inspection or approved_inspection(), customer, template, users)
+
+
+def render(context):
+    output = io.BytesIO()
+    server.render_inspection_report(output, context)
+    return output.getvalue()
+
+
+def test_report_contains_every_section_and_control_item():
+    context = report_context()
+    assert len([row for row in context["control_rows"] if "id" in row]) == 48
+    assert context["totals"] == {"U": 16, "UD": 16, "U.Y": 16}
+
+    content = render(context)
+    assert content.startswith(b"%PDF")
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        text = "\n".join(page.extract_text() for page in pdf.pages)
+    for expected in ["CARASKAL MUAYENE RAPORU", "1. GENEL BİLGİLER", "Yıldız Çelik İnşaat A.Ş.", "CR-2024-001",
+                     "4. KONTROL LİSTESİ", "Acil durdurma butonu", "Kanca emniyet mandalı kırık",
+                     "SAKINCALI", "Mehmet Yılmaz", "Ali Koç", "Uygun (U): 16"]:
+        assert expected in text, expected
+    assert len(PdfReader(io.BytesIO(content)).pages) >= 2
+
+
+def test_form_data_map_results_are_rendered_too():
+    inspection = approved_inspection()
+    inspection["report_data"] = {"form_data": {"1": {"value": "UY", "comment": "eski istemci"}, "2": {"value": "U"}}}
+    context = report_context(inspection)
+    by_id = {row["id"]: row for row in context["control_rows"] if "id" in row}
+    assert by_id[1]["value"] == "U.Y" and by_id[1]["comment"] == "eski istemci"
+    assert by_id[2]["value"] == "U" and by_id[3]["value"] is None
+
+
+class FakeDB:
+    def __init__(self, *inspections):
+        self.inspections = FakeCollection(list(inspections))
+        self.customers = FakeCollection([{"id": "c1", "company_name": "Yıldız Çelik İnşaat A.Ş.", "address": "İzmir"}])
+        self.users = FakeCollection([{"id": "u-denetci", "full_name": "Mehmet Yılmaz"}])
+        self.equipment_templates = FakeCollection([
+            dict(server.get_caraskal_template(), id="tpl-1", is_active=True, version=1)
+        ])
+        self.equipment_template_versions = FakeCollection()
+        self.report_artifacts = FakeCollection(unique=("cache_key",))
+        self.report_files = FakeBucket()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(*inspections):
+        fake = FakeDB(*inspections)
+        monkeypatch.setattr(server, "db", fake)
+        monkeypatch.setattr(server, "report_files_bucket", lambda: fake.report_files)
+        return fake
+    return install
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    original = server.render_inspection_report
+
+    def counting_render(output, context):
+        calls.append(context["report_no"])
+        original(output, context)
+
+    monkeypatch.setattr(server, "render_inspection_report", counting_render)
+    return calls
+
+
+def manager():
+    return server.User(username="teknik", email="t@b.c", full_name="Teknik", role="teknik_yonetici")
+
+
+def download(inspection_id, draft=False):
+    async def run():
+        response = await server.download_inspection_report(inspection_id, draft, manager())
+        return response, b"".join([block async for block in response.body_iterator])
+    return asyncio.run(run())
+
+
+def test_endpoint_streams_approved_reports_only(fake_db, monkeypatch):
+    fake_db(approved_inspection())
+    monkeypatch.setattr(server, "REPORT_STREAM_BLOCK_BYTES", 4096)
+
+    response, content = download("3f1c2a9e-insp")
+    assert response.media_type == "application/pdf"
+    assert response.headers["content-disposition"] == 'attachment; filename="rapor_3F1C2A9E.pdf"'
+    assert int(response.headers["content-length"]) == len(content) and content.startswith(b"%PDF")
+
+    fake_db(approved_inspection(status="rapor_yazildi"))
+    with pytest.raises(HTTPException) as error:
+        download("3f1c2a9e-insp")
+    assert error.value.status_code == 409
+
+
+def test_repeat_downloads_stream_the_stored_artifact(fake_db, renders):
+    fake = fake_db(approved_inspection())
+
+    first_response, first = download("3f1c2a9e-insp")
+    second_response, second = download("3f1c2a9e-insp")
+    assert renders == ["3F1C2A9E"]
+    assert second == first
+    assert second_response.headers["content-length"] == first_response.headers["content-length"]
+    assert second_response.headers["content-disposition"] == first_response.headers["content-disposition"]
+    assert len(fake.report_artifacts.docs) == 1 and len(fake.report_files.files) == 1
+
+
+def test_modified_inspection_misses_and_replaces_its_artifact(fake_db, renders):
+    fake = fake_db(approved_inspection())
+    download("3f1c2a9e-insp")
+    old_key = fake.report_artifacts.docs[0]["cache_key"]
+
+    inspection = fake.inspections.docs[0]
+    inspection["report_data"]["conclusion"] = "UYGUN - Revize edildi."
+    inspection.update(version=5, updated_at=datetime(2025, 3, 9))
+    _, content = download("3f1c2a9e-insp")
+
+    assert renders == ["3F1C2A9E", "3F1C2A9E"]
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        assert "Revize edildi" in "".join(page.extract_text() for page in pdf.pages)
+    new_key = server.report_cache_key(inspection, asyncio.run(server.load_report_context(inspection)), "pdf")
+    assert new_key != old_key
+    assert [doc["cache_key"] for doc in fake.report_artifacts.docs] == [new_key]
+    assert len(fake.report_files.files) == 1
+
+
+def test_customer_and_user_edits_miss_the_stored_artifact(fake_db, renders):
+    fake = fake_db(approved_inspection())
+    download("3f1c2a9e-insp")
+
+    fake.customers.docs[0]["company_name"] = "Yıldız Çelik Yapı A.Ş."
+    download("3f1c2a9e-insp")
+    fake.users.docs[0]["full_name"] = "Mehmet Yılmaz Kaya"
+    _, content = download("3f1c2a9e-insp")
+
+    assert renders == ["3F1C2A9E"] * 3
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        text = "".join(page.extract_text() for page in pdf.pages)
+    assert "Yıldız Çelik Yapı" in text and "Mehmet Yılmaz Kaya" in text
+    assert len(fake.report_artifacts.docs) == 1 and len(fake.report_files.files) == 1
+
+
+def test_report_is_served_when_storing_it_fails(fake_db, renders, monkeypatch, caplog):
+    fake = fake_db(approved_inspection())
+
+    def unavailable(file_id, filename):
+        raise RuntimeError("GridFS unavailable")
+
+    monkeypatch.setattr(fake.report_files, "open_upload_stream_with_id", unavailable)
+    response, content = download("3f1c2a9e-insp")
+
+    assert content.startswith(b"%PDF") and int(response.headers["content-length"]) == len(content)
+    assert fake.report_artifacts.docs == [] and "rendered report not cached" in caplog.text
+
+
+def test_drafts_are_marked_and_evicted_least_recently_used_first(fake_db, renders, monkeypatch):
+    drafts = [dict(approved_inspection(status="rapor_yazildi"), id=f"draft-{index}") for index in range(3)]
+    fake = fake_db(approved_inspection(), *drafts)
+
+    _, content = download("draft-0", draft=True)
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        assert "(TASLAK)" in pdf.pages[0].extract_text()
+    draft_size = fake.report_artifacts.docs[0]["size"]
+
+    # Room for two drafts; approved reports do not count against the cap
+    monkeypatch.setattr(server, "REPORT_DRAFT_CACHE_MAX_BYTES", 2 * draft_size + draft_size // 2)
+    download("3f1c2a9e-insp")
+    download("draft-1", draft=True)
+    download("draft-0", draft=True)  # cache hit, draft-1 is now the least recently used
+    download("draft-2", draft=True)
+
+    assert sorted(doc["inspection_id"] for doc in fake.report_artifacts.docs) == ["3f1c2a9e-insp", "draft-0", "draft-2"]
+    assert len(fake.report_files.files) == 3
+    assert renders == ["DRAFT-0", "3F1C2A9E", "DRAFT-1", "DRAFT-2"]
+
+
+@pytest.mark.benchmark
+def test_benchmark_caraskal_report_render():
+    context = report_context()
+    render(context)  # font registration and warm-up
+
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        content = render(context)
+        timings.append(time.perf_counter() - start)
+
+    print(f"\nCARASKAL report, {len(context['control_rows'])} rows: best {min(timings) * 1000:.1f} ms, "
+          f"{len(content) / 1024:.0f} KiB, {len(PdfReader(io.BytesIO(content)).pages)} pages")
+    assert min(timings) < 1.0
@@ -0,0 +1,81 @@
+import random
+import time
+
+import server
+from server import (
+    CONTROL_ITEM_SKIP_WORDS,
+    CONTROL_TABLE_SKIP_WORDS,
+    EQUIPMENT_TYPE_KEYWORDS,
+    TEMPLATE_TYPE_KEYWORDS,
+    KeywordAutomaton,
+    KeywordClassifier,
+    detect_equipment_type,
+    detect_template_type,
+)
+
+
+def legacy_equipment_type(filename, registry=EQUIPMENT_TYPE_KEYWORDS):
+    """The any() loop over the keyword dict that the classifier replaced"""
+    filename_upper = filename.upper()
+    for eq_type, keywords in registry.items():
+        if any(keyword in filename_upper for keyword in keywords):
+            return eq_type
+    return "UNKNOWN"
+
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton([("HE", 1), ("SHE", 2), ("HIS", 3), ("HERS", 4)])
+    matches = [(end, keyword) for end, keyword, _ in automaton.iter_matches("USHERS")]
+    assert matches == [(3, "SHE"), (3, "HE"), (5, "HERS")]
+
+
+def test_filename_classification_matches_keyword_loops():
+    filenames = [
+        "FORKLIFT MUAYENE FORMU.docx", "CARASKAL MUAYENE RAPORU.docx", "İSKELE FORMU.pdf",
+        "vinç muayene raporu.docx", "Asansör Report.docx", "yangın söndürme formu.docx",
+        "buhar kazanı.docx", "BASINCLI KAP.docx", "liste.docx", "elevator lift report.docx",
+    ]
+    for filename in filenames:
+        assert detect_equipment_type(filename) == legacy_equipment_type(filename), filename
+    assert detect_template_type("CARASKAL MUAYENE RAPORU.docx") == "REPORT"
+    assert detect_template_type("caraskal report.docx") == "REPORT"
+    assert detect_template_type("CARASKAL MUAYENE FORMU.docx") == "FORM"
+
+
+def test_registry_keywords_are_upper_case():
+    # Text is upper-cased before matching, so a keyword with lower-case letters never matches
+    keywords = CONTROL_ITEM_SKIP_WORDS + CONTROL_TABLE_SKIP_WORDS + [
+        keyword for registry in (EQUIPMENT_TYPE_KEYWORDS, TEMPLATE_TYPE_KEYWORDS)
+        for keywords in registry.values() for keyword in keywords
+    ]
+    assert [keyword for keyword in keywords if keyword != keyword.upper()] == []
+    assert server.control_item_skip_words.matches_any("Markası")
+
+
+def test_skip_words_match_any_substring():
+    rng = random.Random(7)
+    words = CONTROL_ITEM_SKIP_WORDS + ["Halat", "zincir", "kanca", "aşınma", "fren", "kumanda", "ışık"]
+    for _ in range(500):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        expected = any(word in line.upper() for word in CONTROL_ITEM_SKIP_WORDS)
+        assert server.control_item_skip_words.matches_any(line) == expected, line
+
+
+def test_benchmark_sixty_equipment_types_single_pass():
+    # 60 types x 4 keywords; the automaton pass cost should not follow the keyword count
+    registry = {f"TYPE_{index}": [f"EKIPMAN{index}X", f"CIHAZ{index}Y", f"KW{index}Z", f"ALT{index}W"]
+                for index in range(60)}
+    classifier = KeywordClassifier(registry)
+    filenames = [f"MUAYENE RAPORU {index} CIHAZ{index % 60}Y SAHA.docx" for index in range(2000)]
+
+    start = time.perf_counter()
+    automaton_results = [classifier.classify(name, "UNKNOWN") for name in filenames]
+    automaton_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_results = [legacy_equipment_type(name, registry) for name in filenames]
+    legacy_time = time.perf_counter() - start
+
+    print(f"\n60 types / 240 keywords, 2000 filenames: automaton {automaton_time * 1000:.1f} ms, "
+          f"any() loops {legacy_time * 1000:.1f} ms")
+    assert automaton_results == legacy_results
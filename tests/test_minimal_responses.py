@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException, Response
+
+import server
+from server import wants_minimal_response
+
+from .conftest import FakeCollection
+
+
+def test_prefer_header_parsing():
+    assert wants_minimal_response("return=minimal", False)
+    assert wants_minimal_response("respond-async, Return=Minimal", False)
+    assert wants_minimal_response("return=minimal; handling=lenient", False)
+    assert wants_minimal_response("handling=strict, return = \"minimal\" ;foo", False)
+    assert not wants_minimal_response("return=representation", False)
+    assert not wants_minimal_response("handling=lenient; return=minimal", False)
+    assert not wants_minimal_response(None, False)
+
+
+def test_query_flag_enables_minimal_mode():
+    assert wants_minimal_response(None, True)
+
+
+class RecordingInspections(FakeCollection):
+    def __init__(self, docs):
+        super().__init__(docs)
+        self.calls = []
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        self.calls.append((projection, return_document))
+        return await super().find_one_and_update(query, update, projection, return_document)
+
+
+class FakeDB:
+    def __init__(self):
+        self.inspections = RecordingInspections([server.Inspection(
+            id="insp-1", customer_id="c1", equipment_info={"equipment_type": "CARASKAL"}, inspector_id="u-denetci",
+            planned_date=datetime(2025, 3, 1), created_by="planlama", version=4,
+            report_data={"form_data": {"1": {"value": "U"}}, "last_saved": "2025-03-01T09:00:00"}
+        ).dict()])
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(server, "db", fake)
+    return fake
+
+
+MANAGER = server.User(username="teknik", email="t@b.c", full_name="Teknik", role="teknik_yonetici")
+
+
+def save(inspection_id, prefer=None, minimal=False, is_draft=True):
+    form = {"form_data": {"1": {"value": "UD"}}, "is_draft": is_draft, "last_saved": "2025-03-02T10:00:00"}
+    response = Response()
+    body = asyncio.run(server.update_inspection_form(inspection_id, form, response, minimal, prefer, MANAGER))
+    return body, response
+
+
+def test_minimal_save_returns_only_the_server_delta(fake_db):
+    body, response = save("insp-1", prefer="return=minimal; handling=lenient", is_draft=False)
+
+    assert response.headers["Preference-Applied"] == "return=minimal"
+    assert response.headers["Vary"] == "Prefer"
+    projection, return_document = fake_db.inspections.calls[0]
+    assert projection == server.MINIMAL_INSPECTION_PROJECTION
+    assert return_document == server.ReturnDocument.AFTER
+
+    delta = body["inspection"]
+    assert set(delta) == {"id", "version", "status", "updated_at", "completed_at", "last_saved", "saved_by"}
+    assert (delta["id"], delta["version"], delta["status"]) == ("insp-1", 5, "rapor_yazildi")
+    assert (delta["last_saved"], delta["saved_by"]) == ("2025-03-02T10:00:00", MANAGER.id)
+    assert fake_db.inspections.docs[0]["report_data"]["form_data"] == {"1": {"value": "UD"}}
+
+
+def test_full_save_varies_on_prefer_without_applying_it(fake_db):
+    body, response = save("insp-1")
+
+    assert response.headers["Vary"] == "Prefer"
+    assert "Preference-Applied" not in response.headers
+    assert isinstance(body["inspection"], server.Inspection) and body["inspection"].version == 5
+    assert fake_db.inspections.calls == []
+
+
+def test_minimal_save_of_a_missing_inspection_is_404(fake_db, monkeypatch):
+    async def deleted_after_read(query, projection=None, sort=None):
+        # The authorization read passes, the inspection is gone by the time of the write
+        return {"id": query["id"]}
+
+    monkeypatch.setattr(fake_db.inspections, "find_one", deleted_after_read)
+    with pytest.raises(HTTPException) as error:
+        save("insp-2", minimal=True)
+    assert error.value.status_code == 404
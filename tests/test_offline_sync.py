@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime
+
+import server
+from server import SyncOperation, resolve_sync_operations
+
+from .conftest import FakeCollection, FakeCursor
+
+
+def make_op(op_id, inspection_id, last_saved, **fields):
+    return SyncOperation(op_id=op_id, inspection_id=inspection_id, last_saved=last_saved, **fields)
+
+
+def test_newer_fields_applied_older_fields_rejected():
+    inspections = {
+        "insp-1": {
+            "id": "insp-1",
+            "report_data": {
+                "last_saved": "2025-01-10T08:00:00",
+                "field_saved_at": {"form_data": {"3": datetime(2025, 1, 10, 12, 0)}}
+            }
+        }
+    }
+    op = make_op(
+        "op-1", "insp-1", "2025-01-10T10:00:00Z",
+        form_data={"1": {"value": "U"}, "3": {"value": "UD"}}
+    )
+
+    results, updates = resolve_sync_operations([op], inspections, "user-1", "sync-1")
+
+    assert results[0].status == "partial"
+    assert results[0].applied == ["form_data.1"]
+    assert results[0].rejected == ["form_data.3"]
+    update = updates["insp-1"]._doc["$set"]
+    assert update["report_data.form_data.1"] == {"value": "U"}
+    assert "report_data.form_data.3" not in update
+    assert update["report_data.field_saved_at.form_data.1"] == datetime(2025, 1, 10, 10, 0)
+    assert updates["insp-1"]._doc["$inc"] == {"version": 1}
+    assert update["report_data.sync_id"] == "sync-1"
+
+
+def test_batch_merges_many_inspections_into_one_update_each():
+    inspections = {
+        "a": {"id": "a", "version": 3, "report_data": {}},
+        "b": {"id": "b", "report_data": None},
+    }
+    ops = [
+        make_op("2", "a", "2025-02-01T10:05:00", form_data={"1": {"value": "UD"}}),
+        make_op("1", "a", "2025-02-01T10:00:00", form_data={"1": {"value": "U"}, "2": {"value": "U"}}),
+        make_op("3", "b", "2025-02-01T11:00:00", general_info={"rapor_no": "R-1"}, is_draft=False),
+        make_op("4", "missing", "2025-02-01T11:00:00", form_data={"1": {"value": "U"}}),
+    ]
+
+    results, updates = resolve_sync_operations(ops, inspections, "user-1", "sync-1")
+
+    assert [r.op_id for r in results] == ["2", "1", "3", "4"]
+    assert [r.status for r in results] == ["applied", "applied", "applied", "not_found"]
+    by_id = {inspection_id: u._doc["$set"] for inspection_id, u in updates.items()}
+    assert len(updates) == 2
+    # Each write only lands on the version the merge was computed from
+    assert updates["a"]._filter == {"id": "a", "version": 3}
+    assert updates["b"]._filter == {"id": "b", "version": {"$exists": False}}
+    # The later edit of item 1 wins regardless of queue order
+    assert by_id["a"]["report_data.form_data.1"] == {"value": "UD"}
+    assert by_id["a"]["report_data.form_data.2"] == {"value": "U"}
+    # A null report_data is written whole instead of through dotted paths
+    assert by_id["b"]["report_data"]["general_info"] == {"rapor_no": "R-1"}
+    assert by_id["b"]["report_data"]["is_draft"] is False
+    assert by_id["b"]["status"] == "rapor_yazildi"
+
+
+def test_unsafe_field_keys_are_invalid_not_conflicts():
+    inspections = {"a": {"id": "a", "report_data": {}}}
+    op = make_op("1", "a", "2025-02-01T10:00:00", general_info={"$where": 1, "a.b": 2})
+    mixed = make_op("2", "a", "2025-02-01T10:00:00", general_info={"$where": 1, "rapor_no": "R-1"})
+
+    results, updates = resolve_sync_operations([op], inspections, "user-1", "sync-1")
+    assert results[0].status == "invalid"
+    assert results[0].invalid == ["general_info.$where", "general_info.a.b"] and results[0].rejected == []
+    assert updates == {}
+
+    results, updates = resolve_sync_operations([mixed], inspections, "user-1", "sync-1")
+    assert results[0].status == "partial"
+    assert (results[0].applied, results[0].invalid) == (["general_info.rapor_no"], ["general_info.$where"])
+
+
+class FakeInspections(FakeCollection):
+    def aggregate(self, pipeline):
+        ids = pipeline[0]["$match"]["id"]["$in"]
+        rows = []
+        for doc in self.docs:
+            if doc["id"] in ids:
+                report_data = doc.get("report_data")
+                row = {"id": doc["id"], "report_missing": report_data is None}
+                if "version" in doc:
+                    row["version"] = doc["version"]
+                if report_data:
+                    row.update(last_saved=report_data.get("last_saved"), field_saved_at=report_data.get("field_saved_at"))
+                rows.append(row)
+        return FakeCursor(rows)
+
+
+class FakeDB:
+    def __init__(self, inspections):
+        self.inspections = inspections
+
+
+def test_write_racing_a_concurrent_save_is_reported_as_conflict(monkeypatch):
+    inspections = FakeInspections([
+        {"id": "a", "version": 2, "status": "devam_ediyor", "report_data": {"form_data": {"1": {"value": "U"}}}},
+        {"id": "b", "version": 7, "status": "devam_ediyor", "report_data": {}},
+    ])
+    bulk_write = inspections.bulk_write
+    bulk_calls = []
+
+    async def save_lands_first(requests, ordered=True):
+        # Another device saves "a" between the sync's read and its write
+        bulk_calls.append([request._filter["id"] for request in requests])
+        await inspections.update_one({"id": "a"}, {"$set": {"report_data.form_data": {"1": {"value": "UD"}}}, "$inc": {"version": 1}})
+        return await bulk_write(requests, ordered)
+
+    monkeypatch.setattr(inspections, "bulk_write", save_lands_first)
+    monkeypatch.setattr(server, "db", FakeDB(inspections))
+    user = server.User(username="denetci", email="d@b.c", full_name="Denetçi", role="teknik_yonetici")
+    request = server.SyncRequest(operations=[
+        make_op("1", "a", "2025-02-01T10:00:00", form_data={"1": {"value": "U.Y"}}),
+        make_op("2", "b", "2025-02-01T10:00:00", form_data={"1": {"value": "U"}}),
+    ])
+
+    response = asyncio.run(server.sync_offline_operations(request, user))
+
+    assert [(r.status, r.applied, r.rejected) for r in response.results] == [
+        ("conflict", [], ["form_data.1"]),
+        ("applied", ["form_data.1"], []),
+    ]
+    assert inspections.docs[0]["report_data"]["form_data"] == {"1": {"value": "UD"}}
+    assert inspections.docs[1]["report_data"]["form_data"] == {"1": {"value": "U"}}
+    assert inspections.docs[1]["version"] == 8
+    assert bulk_calls == [["a", "b"]]
+    assert response.versions["a"]["version"] == 3
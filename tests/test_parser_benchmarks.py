@@ -0,0 +1,179 @@
+"""
+Offline parser benchmarks over a template corpus: synthetic FORM/RAPOR documents of growing
+size plus the bundled forklift templates. Each parser entry point is timed (best of a few
+runs) and its peak Python heap is measured with tracemalloc; both are compared with
+tests/parser_benchmark_baseline.json and the test fails when a measurement exceeds its
+baseline by more than the tolerance.
+
+The baseline holds absolute timings from one machine, so the suite is skipped unless
+benchmarks are requested:
+    RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_parser_benchmarks.py
+
+Refresh the baseline after an intentional change, on the machine that runs the benchmarks, with
+    RUN_BENCHMARKS=1 PARSER_BENCHMARK_UPDATE=1 python -m pytest -q tests/test_parser_benchmarks.py
+"""
+import io
+import json
+import os
+import time
+import tracemalloc
+import zipfile
+
+import pytest
+from docx import Document
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_benchmark_baseline.json")
+
+TIME_TOLERANCE = float(os.getenv("PARSER_BENCHMARK_TIME_TOLERANCE", "2.0"))
+MEMORY_TOLERANCE = float(os.getenv("PARSER_BENCHMARK_MEMORY_TOLERANCE", "1.25"))
+# Absolute slack so sub-millisecond / few-KiB measurements don't fail on noise
+TIME_SLACK_MS = 5
+MEMORY_SLACK_KIB = 64
+UPDATE_BASELINE = os.getenv("PARSER_BENCHMARK_UPDATE") == "1"
+TIMING_RUNS = 3
+
+pytestmark = pytest.mark.benchmark
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+REPORT_COLUMNS = ["No", "Kontrol Kriteri", "U", "UD", "U.Y", "Açıklama"]
+
+
+def paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def cell(text, grid_span=None, v_merge=None):
+    properties = ""
+    if grid_span:
+        properties += f'<w:gridSpan w:val="{grid_span}"/>'
+    if v_merge:
+        properties += '<w:vMerge w:val="restart"/>' if v_merge == "restart" else "<w:vMerge/>"
+    properties = f"<w:tcPr>{properties}</w:tcPr>" if properties else ""
+    return f"<w:tc>{properties}{paragraph(text)}</w:tc>"
+
+
+def synthetic_template(control_items, table_rows, template_type="FORM"):
+    """
+    A FORM/RAPOR document in the shape of our templates: general info placeholders,
+    numbered control items, and a result table whose header spans the full width and
+    whose group column is merged vertically every five rows
+    """
+    body = [
+        paragraph(f"GENEL BİLGİLER - {template_type}"),
+        paragraph("Firma Adı: {{firma_adi}} Muayene Tarihi: [muayene_tarihi]"),
+        paragraph("Telefon: ${telefon} E-posta: ______"),
+    ]
+    for item in range(1, control_items + 1):
+        body.append(paragraph(f"{item}. Halat, zincir ve kanca aşınması gözle incelenir ({item})"))
+
+    cols = len(REPORT_COLUMNS)
+    rows = ['<w:tr>' + cell("SONUÇ TABLOSU [rapor_no]", grid_span=cols) + '</w:tr>',
+            '<w:tr>' + ''.join(cell(title) for title in REPORT_COLUMNS) + '</w:tr>']
+    for row in range(table_rows):
+        group = cell(f"Grup {row // 5 + 1}", v_merge="restart" if row % 5 == 0 else "continue")
+        rest = [f"Kriter {row + 1} için bağlantı elemanları yerinde", "U", "", "", f"[aciklama_{row + 1}]"]
+        rows.append('<w:tr>' + group + ''.join(cell(text) for text in rest) + '</w:tr>')
+    body.append('<w:tbl><w:tblGrid>' + '<w:gridCol/>' * cols + '</w:tblGrid>' + ''.join(rows) + '</w:tbl>')
+    body.append(paragraph("Muayene Personeli: [personel] İmza: ______"))
+
+    document_xml = f'<?xml version="1.0" encoding="UTF-8"?><w:document {W_NS}><w:body>{"".join(body)}</w:body></w:document>'
+    base = io.BytesIO()
+    Document().save(base)
+    output = io.BytesIO()
+    with zipfile.ZipFile(base) as source, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for entry in source.infolist():
+            data = document_xml.encode("utf-8") if entry.filename == "word/document.xml" else source.read(entry)
+            target.writestr(entry, data)
+    return output.getvalue()
+
+
+def load_corpus_document(name):
+    synthetic = {
+        "CARASKAL MUAYENE FORMU 10.docx": (10, 5, "FORM"),
+        "VINC MUAYENE FORMU 100.docx": (100, 20, "FORM"),
+        "ISKELE MUAYENE RAPORU 500.docx": (500, 60, "RAPOR"),
+    }
+    if name in synthetic:
+        return synthetic_template(*synthetic[name])
+    with open(os.path.join(ROOT, name), "rb") as f:
+        return f.read()
+
+
+CORPUS = [
+    "CARASKAL MUAYENE FORMU 10.docx",
+    "VINC MUAYENE FORMU 100.docx",
+    "ISKELE MUAYENE RAPORU 500.docx",
+    "forklift_test.docx",
+    "test_forklift.docx",
+]
+
+
+def parser_calls(name, content):
+    paragraphs, tables = server.read_docx_content(content)
+    text = "\n".join(paragraphs)
+    table_rows = []
+    for table in tables:
+        rows = {}
+        for cell in table:
+            rows.setdefault(cell["row"], []).append(cell["text"].strip())
+        table_rows.append(list(rows.values()))
+    return {
+        "extract_template_fields_from_word": lambda: server.extract_template_fields_from_word(content, name),
+        "parse_word_document": lambda: server.parse_word_document(content, name),
+        "extract_control_items": lambda: server.extract_control_items(text, table_rows),
+    }
+
+
+def measure(call):
+    best = None
+    for _ in range(TIMING_RUNS):
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ms": round(best * 1000, 2), "peak_kib": round(peak / 1024, 1)}
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_parser_benchmark_against_baseline(name):
+    measurements = {
+        function: measure(call)
+        for function, call in parser_calls(name, load_corpus_document(name)).items()
+    }
+    for function, result in measurements.items():
+        print(f"\n{name} {function}: {result['ms']} ms, peak {result['peak_kib']} KiB")
+
+    baseline = load_baseline()
+    if UPDATE_BASELINE:
+        baseline[name] = measurements
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        return
+
+    assert name in baseline, f"No baseline for {name}; run with PARSER_BENCHMARK_UPDATE=1"
+    regressions = []
+    for function, result in measurements.items():
+        expected = baseline[name][function]
+        if result["ms"] > expected["ms"] * TIME_TOLERANCE + TIME_SLACK_MS:
+            regressions.append(f"{function}: {result['ms']} ms vs baseline {expected['ms']} ms")
+        if result["peak_kib"] > expected["peak_kib"] * MEMORY_TOLERANCE + MEMORY_SLACK_KIB:
+            regressions.append(f"{function}: peak {result['peak_kib']} KiB vs baseline {expected['peak_kib']} KiB")
+    assert not regressions, "; ".join(regressions)
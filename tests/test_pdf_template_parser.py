@@ -0,0 +1,69 @@
+import asyncio
+import io
+import os
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+import server
+
+
+def multi_page_pdf(pages=10, items_per_page=5):
+    styles = getSampleStyleSheet()
+    story = []
+    for page in range(pages):
+        for offset in range(1, items_per_page + 1):
+            item = page * items_per_page + offset
+            story.append(Paragraph(f"{item}. Kontrol maddesi {item} gözle kontrol edilir", styles["Normal"]))
+        story.append(Paragraph("Muayene tarihi {{tarih}} imza ______", styles["Normal"]))
+        table = Table([["Marka", "[marka]"], ["Seri No", "[seri_no]"]])
+        table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black)]))
+        story.append(table)
+        story.append(PageBreak())
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
+
+def test_pdf_pages_keep_table_text_out_of_body_lines():
+    lines, tables = server.read_pdf_pages(multi_page_pdf(pages=2), 1, 2)
+
+    assert lines[0] == "6. Kontrol maddesi 6 gözle kontrol edilir"
+    assert not any("[marka]" in line for line in lines)
+    assert [[(cell["row"], cell["col"], cell["text"]) for cell in table] for table in tables] == [
+        [(0, 0, "Marka"), (0, 1, "[marka]"), (1, 0, "Seri No"), (1, 1, "[seri_no]")]
+    ]
+
+
+def test_split_pdf_parts_hold_only_their_own_pages(monkeypatch):
+    monkeypatch.setattr(server, "PDF_PAGES_PER_CHUNK", 3)
+    content = multi_page_pdf()
+
+    parts = server.split_pdf_pages(content)
+
+    assert [server.count_pdf_pages(part) for part in parts] == [3, 3, 3, 1]
+    for (first_page, last_page), part in zip(server.pdf_page_chunks(10), parts):
+        assert server.read_pdf_pages(part) == server.read_pdf_pages(content, first_page, last_page)
+
+
+def test_pdf_upload_parses_page_ranges_in_parallel(memory_parse_cache, monkeypatch):
+    monkeypatch.setattr(server, "PDF_PAGES_PER_CHUNK", 3)
+    content = multi_page_pdf()
+    try:
+        template_data = asyncio.run(server.parse_template_upload(content, "CARASKAL MUAYENE FORMU.pdf", "stream"))
+    finally:
+        server.shutdown_template_parse_pool()
+
+    stats = template_data["parse_stats"]
+    assert stats["engine"] == "pdf" and stats["pages"] == 10 and stats["page_chunks"] == 4
+    assert os.getpid() not in stats["worker_pids"]
+    assert template_data["equipment_type"] == "CARASKAL"
+    assert template_data["parsed_from"] == "PDF_PAGES"
+    assert [item["id"] for item in template_data["control_items"]] == list(range(1, 51))
+
+    # Same numbering of fields and items as one sequential read of the whole file
+    sequential = server.extract_template_structure(content, "pdf")
+    assert template_data["template_fields"] == sequential["template_fields"]
+    assert template_data["control_items"] == sequential["control_items"]
@@ -0,0 +1,157 @@
+import io
+import os
+import subprocess
+import sys
+import time
+import zipfile
+
+import pytest
+from docx import Document
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = ["forklift_test.docx", "test_forklift.docx"]
+
+# Runs each engine in a fresh interpreter; VmHWM is reset right before the parse so the
+# delta covers the parse only (libxml2 allocations are invisible to tracemalloc)
+PEAK_MEMORY_SCRIPT = """
+import sys
+import server
+
+def status(field):
+    for line in open("/proc/self/status"):
+        if line.startswith(field):
+            return int(line.split()[1])
+
+content = open(sys.argv[2], "rb").read()
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+before = status("VmRSS:")
+server.extract_template_structure(content, sys.argv[1])
+print(status("VmHWM:") - before)
+"""
+
+
+def merged_table_document():
+    doc = Document()
+    doc.add_paragraph("1. Kumandalar ve işaretlemeleri {{tarih}}\tkontrol")
+    paragraph = doc.add_paragraph("Satır")
+    paragraph.add_run().add_break()
+    paragraph.add_run("devamı ______")
+    table = doc.add_table(rows=4, cols=4)
+    table.cell(0, 0).merge(table.cell(0, 2))
+    table.cell(1, 1).merge(table.cell(3, 1))
+    table.cell(2, 2).merge(table.cell(3, 3))
+    for row in range(4):
+        for col in range(4):
+            table.cell(row, col).text += f"r{row}c{col} [alan_{row}{col}]"
+    table.cell(0, 3).add_table(rows=1, cols=1).cell(0, 0).text = "iç tablo"
+    doc.add_paragraph("2. Son kontrol maddesi metni")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def large_table_document(rows=200, cols=6):
+    """A long report table written straight into document.xml (python-docx is too slow to build it)"""
+    w = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    cell = '<w:tc><w:p><w:r><w:t>{}</w:t></w:r></w:p></w:tc>'
+    body = ['<w:tbl><w:tblGrid>', '<w:gridCol/>' * cols, '</w:tblGrid>']
+    for row in range(rows):
+        body.append('<w:tr>' + ''.join(cell.format(f"{row + 1}. Kontrol maddesi {col} [deger]") for col in range(cols)) + '</w:tr>')
+    body.append('</w:tbl>')
+    document_xml = f'<?xml version="1.0" encoding="UTF-8"?><w:document {w}><w:body>{"".join(body)}</w:body></w:document>'
+
+    base = io.BytesIO()
+    Document().save(base)
+    output = io.BytesIO()
+    with zipfile.ZipFile(base) as source, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = document_xml.encode("utf-8") if item.filename == "word/document.xml" else source.read(item)
+            target.writestr(item, data)
+    return output.getvalue()
+
+
+def corpus():
+    documents = {"merged_table.docx": merged_table_document()}
+    for name in FIXTURES:
+        with open(os.path.join(ROOT, name), "rb") as f:
+            documents[name] = f.read()
+    return documents
+
+
+def test_stream_engine_matches_python_docx():
+    for name, content in corpus().items():
+        assert server.read_docx_content(content, "stream") == server.read_docx_content(content, "docx"), name
+        assert server.extract_template_structure(content, "stream") == server.extract_template_structure(content, "docx")
+
+
+def test_merged_cells_are_visited_once_with_position_and_span():
+    for name, content in corpus().items():
+        doc = Document(io.BytesIO(content))
+        for engine in server.TEMPLATE_PARSE_ENGINES:
+            _, tables = server.read_docx_content(content, engine)
+            assert len(tables) == len(doc.tables)
+            for table, cells in zip(doc.tables, tables):
+                grid = [row.cells for row in table.rows]
+                distinct = {id(cell._tc): cell.text for row in grid for cell in row}
+                assert sorted(cell["text"] for cell in cells) == sorted(distinct.values()), name
+                assert all(grid[cell["row"]][cell["col"]].text == cell["text"] for cell in cells)
+
+    _, tables = server.read_docx_content(merged_table_document(), "stream")
+    spans = {(cell["row"], cell["col"]): (cell["row_span"], cell["col_span"]) for cell in tables[0]}
+    assert spans == {
+        (0, 0): (1, 3), (0, 3): (1, 1),
+        (1, 0): (1, 1), (1, 1): (3, 1), (1, 2): (1, 1), (1, 3): (1, 1),
+        (2, 0): (1, 1), (2, 2): (2, 2),
+        (3, 0): (1, 1),
+    }
+
+
+def benchmark_documents(tmp_path):
+    documents = {name: os.path.join(ROOT, name) for name in FIXTURES}
+    large_path = tmp_path / "large_report.docx"
+    large_path.write_bytes(large_table_document())
+    documents["large_report.docx (200x6 table)"] = str(large_path)
+    return documents
+
+
+def test_stream_engine_peak_memory(tmp_path):
+    if not os.path.exists("/proc/self/clear_refs"):
+        pytest.skip("peak memory probe needs Linux /proc")
+
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, "backend"))
+    for name, path in benchmark_documents(tmp_path).items():
+        peaks = {}
+        for engine in server.TEMPLATE_PARSE_ENGINES:
+            output = subprocess.run(
+                [sys.executable, "-c", PEAK_MEMORY_SCRIPT, engine, path],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            peaks[engine] = int(output.strip().splitlines()[-1])
+        assert peaks["stream"] <= peaks["docx"], (name, peaks)
+
+
+@pytest.mark.benchmark
+def test_benchmark_stream_engine_time(tmp_path):
+    totals = dict.fromkeys(server.TEMPLATE_PARSE_ENGINES, 0.0)
+    for name, path in benchmark_documents(tmp_path).items():
+        with open(path, "rb") as f:
+            content = f.read()
+
+        timings = {}
+        for engine in server.TEMPLATE_PARSE_ENGINES:
+            runs = []
+            for _ in range(7):
+                start = time.perf_counter()
+                server.extract_template_structure(content, engine)
+                runs.append(time.perf_counter() - start)
+            timings[engine] = min(runs)
+            totals[engine] += timings[engine]
+
+        print(f"\n{name}: docx {timings['docx'] * 1000:.0f} ms, stream {timings['stream'] * 1000:.0f} ms")
+
+    # Both engines share the cell traversal since merged cells are read once; the
+    # streaming reader still skips building python-docx's object tree
+    assert totals["stream"] < totals["docx"] * 0.9
@@ -0,0 +1,36 @@
+import asyncio
+import os
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_repeat_upload_skips_parsing(monkeypatch, memory_parse_cache):
+    monkeypatch.setattr(server, "TEMPLATE_PARSE_WORKERS", 0)
+    with open(os.path.join(ROOT, "forklift_test.docx"), "rb") as f:
+        content = f.read()
+
+    first = asyncio.run(server.parse_template_upload(content, "FORKLIFT MUAYENE FORMU.docx"))
+
+    def no_parse(file_content):
+        raise AssertionError("python-docx should not run for a cached upload")
+
+    monkeypatch.setattr(server, "extract_template_structure", no_parse)
+    # Same bytes under another name: cached structure, filename-driven fields recomputed
+    second = asyncio.run(server.parse_template_upload(content, "FORKLIFT MUAYENE RAPORU.docx"))
+
+    assert first["parse_stats"]["cache_hit"] is False
+    assert second["parse_stats"]["cache_hit"] is True
+    assert second["template_type"] == "REPORT"
+    assert second["control_items"] == first["control_items"]
+    assert second["template_fields"] == first["template_fields"]
+
+
+def test_cache_key_tracks_content_and_parser_version(monkeypatch):
+    key = server.template_parse_cache_key(b"abc")
+    assert key == server.template_parse_cache_key(b"abc")
+    assert key != server.template_parse_cache_key(b"abd")
+
+    monkeypatch.setattr(server, "TEMPLATE_PARSER_VERSION", "next")
+    assert server.template_parse_cache_key(b"abc") != key
@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_fixture(name):
+    with open(os.path.join(ROOT, name), "rb") as f:
+        return f.read()
+
+
+def test_parse_runs_in_worker_process_and_records_timings(memory_parse_cache):
+    content = read_fixture("forklift_test.docx")
+    try:
+        template_data = asyncio.run(server.parse_template_upload(content, "FORKLIFT MUAYENE FORMU.docx"))
+    finally:
+        server.shutdown_template_parse_pool()
+
+    stats = template_data["parse_stats"]
+    assert template_data["equipment_type"] == "FORKLIFT"
+    assert stats["cache_hit"] is False
+    assert stats["worker_pid"] != os.getpid()
+    assert stats["wall_time_ms"] > 0 and stats["cpu_time_ms"] > 0
+    assert stats["file_size"] == len(content)
+
+
+def test_parse_reads_from_memory_without_temp_files(monkeypatch):
+    content = read_fixture("test_forklift.docx")
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("parser touched the filesystem")
+
+    monkeypatch.setattr("builtins.open", no_disk)
+    parsed = server.timed_template_parse(content)
+
+    assert parsed["stats"]["file_size"] == len(content)
+    assert parsed["structure"]["template_fields"] == {}
@@ -0,0 +1,101 @@
+import os
+import re
+import time
+
+import pytest
+from docx import Document
+
+from server import scan_template_texts, tokenize_template_text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = ["forklift_test.docx", "test_forklift.docx"]
+
+LEGACY_PLACEHOLDER_PATTERNS = [r'\{\{([^}]+)\}\}', r'__{3,}', r'\[([^\]]+)\]', r'\$\{([^}]+)\}']
+
+
+def legacy_scan(paragraph_texts, cell_texts):
+    """The four-findall + numbered-regex scan the tokenizer replaced, kept as a reference"""
+    fields, items, counter = {}, [], 1
+    for raw in paragraph_texts:
+        text = raw.strip()
+        if not text:
+            continue
+        for pattern in LEGACY_PLACEHOLDER_PATTERNS:
+            for _ in re.findall(pattern, text):
+                name = f"field_{counter}"
+                counter += 1
+                lower = name.lower()
+                field_type = "text"
+                if any(word in lower for word in ["tarih", "date"]):
+                    field_type = "date"
+                elif any(word in lower for word in ["email", "eposta"]):
+                    field_type = "email"
+                elif any(word in lower for word in ["telefon", "phone"]):
+                    field_type = "tel"
+                elif any(word in lower for word in ["sayi", "number", "adet"]):
+                    field_type = "number"
+                fields[name] = {"label": name.replace("_", " ").title(), "type": field_type,
+                                "required": True, "original_text": text}
+        numbered = re.match(r'^(\d+)[.\)]?\s*(.+)', text)
+        if numbered:
+            num, item_text = int(numbered.group(1)), numbered.group(2).strip()
+            if len(item_text) > 10 and num <= 100:
+                category = "ABCDEFG"[min(6, max(0, (num - 1) // 10))]
+                items.append({"id": num, "text": item_text, "category": category, "input_type": "dropdown",
+                              "has_comment": True, "has_photo": True, "required": True})
+    for raw in cell_texts:
+        text = raw.strip()
+        if not text:
+            continue
+        for pattern in LEGACY_PLACEHOLDER_PATTERNS:
+            for _ in re.findall(pattern, text):
+                name = f"table_field_{counter}"
+                counter += 1
+                fields[name] = {"label": name.replace("_", " ").title(), "type": "text",
+                                "required": True, "original_text": text, "location": "table"}
+    return fields, items
+
+
+def fixture_texts(name):
+    doc = Document(os.path.join(ROOT, name))
+    paragraphs = [p.text for p in doc.paragraphs]
+    cells = [cell.text for table in doc.tables for row in table.rows for cell in row.cells]
+    # The bundled forms keep everything in tables; add paragraph-style lines with
+    # placeholders and numbered items so both sweeps are exercised
+    paragraphs += [f"{cell.strip()} Tarih: ______ Firma: {{{{firma_adi}}}} [imza]" for cell in cells]
+    return paragraphs, cells
+
+
+def test_tokenizer_emits_items_and_placeholders_in_one_sweep():
+    assert tokenize_template_text("12. Kanca emniyet mandalı {{durum}} ____ ${not}") == (
+        3, (12, "Kanca emniyet mandalı {{durum}} ____ ${not}")
+    )
+    assert tokenize_template_text("Rapor No: [rapor_no]") == (1, None)
+
+
+def test_tokenizer_matches_legacy_scan_on_fixtures():
+    for name in FIXTURES:
+        paragraphs, cells = fixture_texts(name)
+        assert scan_template_texts(paragraphs, cells) == legacy_scan(paragraphs, cells)
+
+
+@pytest.mark.benchmark
+def test_benchmark_tokenizer_on_fixtures():
+    for name in FIXTURES:
+        paragraphs, cells = fixture_texts(name)
+        rounds = 5
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            legacy_scan(paragraphs, cells)
+        legacy = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            scan_template_texts(paragraphs, cells)
+        tokenized = (time.perf_counter() - start) / rounds
+
+        print(f"\n{name}: {len(paragraphs)} paragraphs, {len(cells)} cells - "
+              f"legacy {legacy * 1000:.1f} ms, tokenizer {tokenized * 1000:.1f} ms "
+              f"({legacy / tokenized:.1f}x)")
+        assert tokenized < legacy
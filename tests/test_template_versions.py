@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+from .conftest import FakeCollection
+
+
+class CountingCollection(FakeCollection):
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.reads = 0
+
+    async def find_one(self, query, projection=None, sort=None):
+        self.reads += 1
+        return await super().find_one(query, projection, sort)
+
+
+class FakeDB:
+    def __init__(self, templates):
+        self.equipment_templates = CountingCollection(templates)
+        self.equipment_template_versions = CountingCollection()
+
+
+def legacy_template():
+    template = server.get_caraskal_template()
+    template.update({"id": "tpl-1", "name": "CARASKAL MUAYENE FORMU", "created_by": "admin",
+                     "is_active": True, "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1)})
+    return template
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDB([legacy_template()])
+    monkeypatch.setattr(server, "db", fake)
+    monkeypatch.setattr(server, "_template_version_cache", server.OrderedDict())
+    return fake
+
+
+def admin():
+    return server.User(username="admin", email="a@b.c", full_name="Admin", role="admin")
+
+
+def edited_template(description):
+    template = legacy_template()
+    template["description"] = description
+    return server.EquipmentTemplateCreate(**template)
+
+
+def test_update_snapshots_previous_version_and_stores_diff(fake_db):
+    updated = asyncio.run(server.update_equipment_template("tpl-1", edited_template("Yeni açıklama"), admin()))
+
+    assert updated.version == 2
+    versions = {entry["version"]: entry for entry in fake_db.equipment_template_versions.docs}
+    assert versions[1]["snapshot"]["description"] == "Caraskal Muayene Formu ve Raporu"
+    assert versions[1]["diff"] is None
+    assert versions[2]["diff"] == {"changed": {"description": "Yeni açıklama"}, "removed": []}
+
+    asyncio.run(server.update_equipment_template("tpl-1", edited_template("Üçüncü"), admin()))
+    assert sorted(entry["version"] for entry in fake_db.equipment_template_versions.docs) == [1, 2, 3]
+
+
+def test_concurrent_update_is_rejected(fake_db, monkeypatch):
+    original = fake_db.equipment_templates.find_one
+
+    async def stale_read(query, projection=None):
+        doc = await original(query, projection)
+        # Another admin saves between our read and our write
+        fake_db.equipment_templates.docs[0]["version"] = 5
+        return doc
+
+    monkeypatch.setattr(fake_db.equipment_templates, "find_one", stale_read)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.update_equipment_template("tpl-1", edited_template("Çakışma"), admin()))
+    assert error.value.status_code == 409
+
+
+def test_pinned_inspection_keeps_its_version_and_is_cached(fake_db):
+    inspection = {"id": "insp-1", "equipment_info": {"equipment_type": "CARASKAL"},
+                  "template_id": "tpl-1", "template_version": 1}
+
+    # Before any change version 1 is read from the live template
+    assert asyncio.run(server.get_inspection_template(inspection))["description"] == "Caraskal Muayene Formu ve Raporu"
+
+    asyncio.run(server.update_equipment_template("tpl-1", edited_template("Değişti"), admin()))
+    pinned = asyncio.run(server.get_inspection_template(inspection))
+    assert pinned["description"] == "Caraskal Muayene Formu ve Raporu"
+
+    reads = fake_db.equipment_template_versions.reads + fake_db.equipment_templates.reads
+    asyncio.run(server.get_template_version("tpl-1", 2))
+    asyncio.run(server.get_template_version("tpl-1", 2))
+    assert fake_db.equipment_template_versions.reads + fake_db.equipment_templates.reads == reads + 1